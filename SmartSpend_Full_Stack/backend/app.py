@@ -2,13 +2,14 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from passlib.hash import bcrypt
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
 import certifi, os
+import click
 from bson import ObjectId
+from recurrence import next_due_from
 
 load_dotenv()
 
@@ -40,6 +41,7 @@ expenses = db.expenses
 bills = db.bills
 insights = db.insights
 goals = db.goals
+current_balance = db.current_balance
 
 # Indexes
 try:
@@ -47,6 +49,7 @@ try:
     transactions.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
     expenses.create_index([("user_id", ASCENDING), ("date", DESCENDING)])
     bills.create_index([("user_id", ASCENDING), ("status", ASCENDING), ("next_due", ASCENDING)])
+    current_balance.create_index([("user_id", ASCENDING)], unique=True)
     print("✅ MongoDB connected and indexes ensured")
 except Exception as e:
     print("❌ MongoDB connection/index error:", e)
@@ -54,10 +57,30 @@ except Exception as e:
 ts = URLSafeTimedSerializer(JWT_SECRET)
 now = lambda : datetime.utcnow()
 
+# Balance ledger: one current_balance doc per user, bumped with $inc on every write.
+# `flask --app app reconcile` rebuilds it from the raw income/expenses collections.
+def ledger_inc(user_id, income_amt=0.0, expense_amt=0.0):
+    current_balance.update_one(
+        {"user_id": user_id},
+        {"$inc": {"income_total": float(income_amt), "expense_total": float(expense_amt)}, "$set": {"updated_at": now()}},
+        upsert=True)
+
+def _sum_by_user(coll, user_id=None):
+    match = {"user_id": user_id} if user_id else {}
+    return {r["_id"]: float(r["total"] or 0) for r in coll.aggregate([{"$match": match}, {"$group": {"_id": "$user_id", "total": {"$sum": "$amt"}}}])}
+
+def rebuild_ledger(user_id=None):
+    inc, exp = _sum_by_user(income, user_id), _sum_by_user(expenses, user_id)
+    uids = set(inc) | set(exp) | ({user_id} if user_id else set())
+    ops = [UpdateOne({"user_id": uid}, {"$set": {"income_total": inc.get(uid, 0.0), "expense_total": exp.get(uid, 0.0), "updated_at": now()}}, upsert=True) for uid in uids]
+    if ops: current_balance.bulk_write(ops, ordered=False)
+    if not user_id:
+        current_balance.delete_many({"user_id": {"$nin": list(uids)}})
+    return len(uids)
+
 def compute_current_balance(user_id):
-    inc_sum = sum(float(x.get("amt",0)) for x in income.find({"user_id":user_id}))
-    exp_sum = sum(float(x.get("amt",0)) for x in expenses.find({"user_id":user_id}))
-    return round(inc_sum - exp_sum, 2)
+    led = current_balance.find_one({"user_id": user_id}, {"_id": 0, "income_total": 1, "expense_total": 1}) or {}
+    return round(led.get("income_total", 0.0) - led.get("expense_total", 0.0), 2)
 
 def compute_burn_rate(user_id, days=30):
     since = now() - timedelta(days=days)
@@ -100,7 +123,7 @@ def signup_page2_income():
     email = (data.get("email") or "").lower().strip()
     u = users.find_one({"email":email})
     if not u: return jsonify({"error":"User not found"}), 404
-    income.insert_one({
+    inc = {
         "user_id": str(u["_id"]),
         "amt": float(data.get("amt",0)),
         "pay_frequency": data.get("pay_frequency","monthly"),
@@ -108,7 +131,9 @@ def signup_page2_income():
         "anchor_biweekly": data.get("anchor_biweekly"),
         "monthly_date": data.get("monthly_date"),
         "created_at": now()
-    })
+    }
+    income.insert_one(inc)
+    ledger_inc(inc["user_id"], income_amt=inc["amt"])
     token = URLSafeTimedSerializer(JWT_SECRET).dumps(email, salt="verify-email")
     link = f"/auth/verify/{token}"
     print(f"[VERIFY LINK] Send this link to {email}: {link}")
@@ -252,6 +277,7 @@ def add_income():
         "created_at": now()
     }
     res = income.insert_one(inc)
+    ledger_inc(user_id, income_amt=inc["amt"])
     return jsonify({"ok":True, "id": str(res.inserted_id)})
 
 @app.post("/expenses")
@@ -273,18 +299,12 @@ def add_expense():
         "created_at": now(),
     }
     res = expenses.insert_one(e)
+    ledger_inc(user_id, expense_amt=e["amt"])
 
     if e["allele_frequency"] == "need_recurrence":
         cadence = data.get("cadence","monthly")
         cur_date = datetime.fromisoformat(e["date"]).date()
-        if cadence == "weekly":
-            next_due = (cur_date + timedelta(days=7)).isoformat()
-        elif cadence == "biweekly":
-            next_due = (cur_date + timedelta(days=14)).isoformat()
-        elif cadence == "monthly":
-            next_due = (cur_date + relativedelta(months=1)).isoformat()
-        else:
-            next_due = (cur_date + relativedelta(months=1)).isoformat()
+        next_due = next_due_from(cadence, cur_date.isoformat())
         bills.insert_one({
             "user_id": user_id,
             "name": data.get("bill_name","Bill"),
@@ -294,6 +314,7 @@ def add_expense():
             "status": "active",
             "last_paid": e["date"],
             "next_due": next_due,
+            "anchor_day": cur_date.day,  # month cadences keep landing on this day, clamped to short months
             "notes": data.get("note",""),
             "created_at": now()
         })
@@ -358,5 +379,13 @@ def delete_bill(bid):
     except Exception:
         return jsonify({"error":"Invalid bill id"}), 400
 
+# -------- Maintenance --------
+@app.cli.command("reconcile")
+@click.option("--user", "user_id", default=None, help="Only rebuild this user's ledger.")
+def reconcile(user_id):
+    """Rebuild the current_balance ledger from income and expenses."""
+    n = rebuild_ledger(user_id)
+    print(f"[RECONCILE] ledger rebuilt for {n} users")
+
 if __name__ == "__main__":
     app.run(host=os.getenv("APP_HOST","0.0.0.0"), port=int(os.getenv("APP_PORT","5000")), debug=os.getenv("APP_DEBUG","true")=="true")
@@ -1,13 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_app_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from passlib.hash import bcrypt
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, UpdateOne, ReturnDocument, ASCENDING, DESCENDING, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta, date
 import os
+import re
+import math
+import time
+import threading
+from collections import OrderedDict
+import json
+import base64
+import click
 from bson import ObjectId
+from forecast import forecast_user
+from recurrence import next_due_from, bill_events
+import patterns
+from cashflow import PAY_FREQUENCIES, payday_amounts, daily_amounts, simulate, runway_days
 
 # ---------------- Config ----------------
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
@@ -15,13 +27,25 @@ DB_NAME = os.getenv("DB_NAME", "smartspend")
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "*")
 TOKEN_SALT = os.getenv("TOKEN_SALT", "verify-email")
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "1024"))
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+DASHBOARD_CACHE_PERSIST = os.getenv("DASHBOARD_CACHE_PERSIST", "false") == "true"
+COUNT_MONGO_COMMANDS = os.getenv("COUNT_MONGO_COMMANDS", "false") == "true"
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True, origins=[FRONTEND_ORIGIN] if FRONTEND_ORIGIN!="*" else "*")
 app.config["JWT_SECRET_KEY"] = JWT_SECRET
 jwt = JWTManager(app)
 
-client = MongoClient(MONGO_URI)
+# Counts the Mongo commands each request issues and reports them in the X-Mongo-Commands header,
+# so regressions like a handler re-reading the same collection show up in dev.
+class CommandCounter(monitoring.CommandListener):
+    def started(self, event):
+        if has_app_context(): g.mongo_commands = g.get("mongo_commands", 0) + 1
+    def succeeded(self, event): pass
+    def failed(self, event): pass
+
+client = MongoClient(MONGO_URI, event_listeners=[CommandCounter()] if COUNT_MONGO_COMMANDS else [])
 db = client[DB_NAME]
 
 # ---------------- Collections ----------------
@@ -36,6 +60,7 @@ notifications = db.notifications
 achievements = db.achievements
 forecast = db.forecast_groundtruth
 flags = db.flag_patterns
+pattern_state = db.pattern_state
 dashboard = db.dashboard
 current_balance = db.current_balance
 perday = db.perday
@@ -44,9 +69,23 @@ accumulate = db.accumulate
 
 # Indexes
 users.create_index([("email", ASCENDING)], unique=True)
-transactions.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+transactions.create_index([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
 expenses.create_index([("transaction_id", ASCENDING)])
+expenses.create_index([("user_id", ASCENDING), ("date", ASCENDING)])
 bills.create_index([("user_id", ASCENDING), ("status", ASCENDING), ("next_due", ASCENDING)])
+bills.create_index([("user_id", ASCENDING), ("name_lower", ASCENDING)])
+current_balance.create_index([("user_id", ASCENDING)], unique=True)
+income.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+dashboard.create_index([("user_id", ASCENDING)], unique=True)
+forecast.create_index([("user_id", ASCENDING), ("as_of", DESCENDING)], unique=True)
+perday.create_index([("user_id", ASCENDING), ("day", ASCENDING)], unique=True)
+month.create_index([("user_id", ASCENDING), ("month", ASCENDING), ("allele_frequency", ASCENDING), ("mood", ASCENDING)], unique=True)
+pattern_state.create_index([("user_id", ASCENDING)], unique=True)
+flags.create_index([("user_id", ASCENDING), ("type", ASCENDING), ("key", ASCENDING)], unique=True)
+flags.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+month.create_index([("updated_at", ASCENDING)])
+insights.create_index([("user_id", ASCENDING), ("rank", ASCENDING)])
+insights.create_index([("user_id", ASCENDING), ("code", ASCENDING)], unique=True)
 
 ts = URLSafeTimedSerializer(JWT_SECRET)
 now = lambda : datetime.utcnow()
@@ -58,36 +97,165 @@ def send_verification_link(email, token):
     print(f"[VERIFY] Send this link to {email}: {verify_url}")
     return verify_url
 
+# ---------------- Balance ledger ----------------
+# current_balance holds one doc per user: {user_id, income_total, expense_total, updated_at}.
+# Writes bump it with $inc; `flask --app app reconcile` rebuilds it from the raw collections.
+def ledger_op(user_id, income_amt=0.0, expense_amt=0.0):
+    return UpdateOne(
+        {"user_id": user_id},
+        {"$inc": {"income_total": float(income_amt), "expense_total": float(expense_amt)}, "$set": {"updated_at": now()}},
+        upsert=True)
+
+def _sum_by_user(coll, user_id=None):
+    match = {"user_id": user_id} if user_id else {}
+    return {r["_id"]: float(r["total"] or 0) for r in coll.aggregate([{"$match": match}, {"$group": {"_id": "$user_id", "total": {"$sum": "$amt"}}}])}
+
+def rebuild_ledger(user_id=None):
+    inc, exp = _sum_by_user(income, user_id), _sum_by_user(expenses, user_id)
+    uids = set(inc) | set(exp) | ({user_id} if user_id else set())
+    ops = [UpdateOne({"user_id": uid}, {"$set": {"income_total": inc.get(uid, 0.0), "expense_total": exp.get(uid, 0.0), "updated_at": now()}}, upsert=True) for uid in uids]
+    if ops: current_balance.bulk_write(ops, ordered=False)
+    if not user_id:
+        current_balance.delete_many({"user_id": {"$nin": list(uids)}})
+    return len(uids)
+
+LEDGER_FIELDS = {"_id": 0, "income_total": 1, "expense_total": 1}
+
+def ledger_balance(led):
+    return (led or {}).get("income_total", 0.0) - (led or {}).get("expense_total", 0.0)
+
 def compute_current_balance(user_id):
-    inc_sum = sum(float(x.get("amt",0)) for x in income.find({"user_id":user_id}))
-    exp_sum = sum(float(x.get("amt",0)) for x in expenses.find({"user_id":user_id}))
-    return inc_sum - exp_sum
+    return ledger_balance(current_balance.find_one({"user_id": user_id}, LEDGER_FIELDS))
+
+# ---------------- Daily rollups ----------------
+# perday holds one doc per user and spend day: {user_id, day (BSON date, midnight UTC), total, count, recurring, updated_at}.
+# Days whose expenses were all deleted keep a count of 0 and are ignored by readers.
+def day_start(value):
+    # expenses.date and perday.day are native dates at midnight; accepts a date, datetime or ISO string
+    if isinstance(value, datetime): return datetime.combine(value.date(), datetime.min.time())
+    if isinstance(value, date): return datetime.combine(value, datetime.min.time())
+    try:
+        return datetime.fromisoformat(str(value)[:10])
+    except Exception:
+        return None
+
+# server-side equivalent of day_start, tolerant of rows the date migration hasn't reached yet
+EXPENSE_DAY_EXPR = {"$dateTrunc": {"date": {"$convert": {"input": "$date", "to": "date", "onError": None, "onNull": None}}, "unit": "day"}}
+
+def rollup_ops(docs, sign=1):
+    # sign=1 applies expense docs to the derived aggregates, sign=-1 reverts them.
+    # Amounts are summed per ledger/perday/month key first, so a batch costs one write per collection.
+    # perday also tracks need_recurrence spend as `recurring`, so forecasts can separate bills from discretionary spend
+    # Returns {collection name: [UpdateOne]}; rollup_expenses (and asgi_app) run them as unordered bulk writes.
+    ledger, days, cells = {}, {}, {}
+    for e in docs:
+        amt = sign * float(e.get("amt", 0))
+        uid, day = e["user_id"], day_start(e.get("date"))
+        ledger[uid] = ledger.get(uid, 0.0) + amt
+        if not day: continue
+        tot, n, rec = days.get((uid, day), (0.0, 0, 0.0))
+        days[(uid, day)] = (tot + amt, n + sign, rec + (amt if e.get("allele_frequency") == "need_recurrence" else 0.0))
+        key = (uid, day.strftime("%Y-%m"), e.get("allele_frequency"), e.get("mood"))
+        tot, n = cells.get(key, (0.0, 0))
+        cells[key] = (tot + amt, n + sign)
+    stamp = now()
+    return {
+        current_balance.name: [ledger_op(uid, expense_amt=amt) for uid, amt in ledger.items()],
+        perday.name: [UpdateOne({"user_id": uid, "day": day}, {"$inc": {"total": tot, "count": n, "recurring": rec}, "$set": {"updated_at": stamp}}, upsert=True)
+                      for (uid, day), (tot, n, rec) in days.items()],
+        month.name: [month_op(uid, mon, allele, mood, tot, n) for (uid, mon, allele, mood), (tot, n) in cells.items()],
+    }
+
+def income_rollup_ops(inc):
+    return {current_balance.name: [ledger_op(inc["user_id"], income_amt=inc["amt"])],
+            month.name: [month_op(inc["user_id"], inc["created_at"].strftime("%Y-%m"), INCOME_KEY, None, inc["amt"])]}
+
+def apply_ops(ops):
+    for name, batch in ops.items():
+        if batch: db[name].bulk_write(batch, ordered=False)
+
+def rollup_expenses(docs, sign=1):
+    apply_ops(rollup_ops(docs, sign))
+
+def rollup_expense(e, sign=1):
+    rollup_expenses([e], sign)
+
+def rollup_income(inc):
+    apply_ops(income_rollup_ops(inc))
+
+def rebuild_perday(user_id=None):
+    match = {"user_id": user_id} if user_id else {}
+    perday.delete_many(match)
+    expenses.aggregate([
+        {"$match": match},
+        {"$addFields": {"day": EXPENSE_DAY_EXPR}},
+        {"$match": {"day": {"$ne": None}}},
+        {"$group": {"_id": {"user_id": "$user_id", "day": "$day"}, "total": {"$sum": "$amt"}, "count": {"$sum": 1},
+                    "recurring": {"$sum": {"$cond": [{"$eq": ["$allele_frequency", "need_recurrence"]}, "$amt", 0]}}}},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "day": "$_id.day", "total": 1, "count": 1, "recurring": 1, "updated_at": now()}},
+        {"$merge": {"into": perday.name, "on": ["user_id", "day"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+
+# ---------------- Month cube ----------------
+# month holds {user_id, month:"YYYY-MM", allele_frequency, mood, total, count}. Expenses land in
+# their need/wants/guilts/need_recurrence cell; income is filed under allele_frequency "income".
+INCOME_KEY = "income"
+EXPENSE_CATS = ["need", "wants", "guilts", "need_recurrence"]
 
-def compute_burn_rate(user_id, days=30):
-    since = now() - timedelta(days=days)
+def month_op(user_id, mon, allele, mood, amt, n=1):
+    return UpdateOne(
+        {"user_id": user_id, "month": mon, "allele_frequency": allele, "mood": mood},
+        {"$inc": {"total": float(amt), "count": n}, "$set": {"updated_at": now()}},
+        upsert=True)
+
+def rebuild_month(user_id=None):
+    match = {"user_id": user_id} if user_id else {}
+    exp_rows = expenses.aggregate([
+        {"$match": match},
+        {"$addFields": {"day": EXPENSE_DAY_EXPR}},
+        {"$match": {"day": {"$ne": None}}},
+        {"$group": {"_id": {"user_id": "$user_id", "month": {"$dateToString": {"format": "%Y-%m", "date": "$day"}}, "allele_frequency": {"$ifNull": ["$allele_frequency", None]}, "mood": {"$ifNull": ["$mood", None]}},
+                    "total": {"$sum": "$amt"}, "count": {"$sum": 1}}},
+    ])
+    inc_rows = income.aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"user_id": "$user_id", "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}}, "allele_frequency": INCOME_KEY, "mood": None},
+                    "total": {"$sum": "$amt"}, "count": {"$sum": 1}}},
+    ])
+    month.delete_many(match)
+    ops = [UpdateOne(r["_id"], {"$set": {"total": float(r["total"] or 0), "count": r["count"], "updated_at": now()}}, upsert=True)
+           for rows in (exp_rows, inc_rows) for r in rows]
+    if ops: month.bulk_write(ops, ordered=False)
+
+MONTH_TOTAL_FIELDS = {"_id":0, "allele_frequency":1, "total":1}
+
+def month_query(user_id, mon=None, allele=None, mood=None):
+    q = {"user_id": user_id, "count": {"$gt": 0}}
+    if mon: q["month"] = mon
+    if allele: q["allele_frequency"] = allele
+    if mood: q["mood"] = mood
+    return q
+
+def sum_cells(cells):
     totals = {}
-    for e in expenses.find({"user_id":user_id}):
-        try:
-            d = datetime.fromisoformat(e.get("date")).date()
-        except Exception:
-            continue
-        if d >= since.date():
-            key = d.isoformat()
-            totals[key] = totals.get(key, 0.0) + float(e.get("amt",0))
+    for c in cells:
+        totals[c.get("allele_frequency")] = totals.get(c.get("allele_frequency"), 0.0) + float(c.get("total", 0))
+    return totals
+
+def month_totals(user_id, mon=None, allele=None, mood=None):
+    return sum_cells(month.find(month_query(user_id, mon, allele, mood), MONTH_TOTAL_FIELDS))
+
+def compute_burn_rate(history, days=30):
+    # average over spend days in the last `days` days of perday docs already read by the caller
+    since = day_start(now() - timedelta(days=days))
+    totals = [float(d["total"]) for d in history if d["day"] >= since and d.get("count", 0) > 0]
     if not totals: return 0.0
-    return sum(totals.values()) / len(totals)
+    return sum(totals) / len(totals)
 
-def days_left(user_id):
-    br = compute_burn_rate(user_id)
-    bal = compute_current_balance(user_id)
-    return 365 if br <= 0 else round(bal/br, 2)
+def name_key(name):
+    # bills.name_lower: the search key behind the (user_id, name_lower) index
+    return (name or "").strip().lower()
 
-def next_due_from(cadence, date_iso):
-    d = datetime.fromisoformat(date_iso).date()
-    if cadence == "weekly": return (d + timedelta(days=7)).isoformat()
-    if cadence == "biweekly": return (d + timedelta(days=14)).isoformat()
-    if cadence == "monthly": return (d + relativedelta(months=1)).isoformat()
-    return (d + relativedelta(months=1)).isoformat()
 
 # ---------------- Auth ----------------
 @app.post("/auth/signup_page1")
@@ -107,15 +275,22 @@ def signup_page2_income():
     email = (data.get("email") or "").lower().strip()
     u = users.find_one({"email":email})
     if not u: return jsonify({"error":"User not found"}), 404
-    income.insert_one({
+    try:
+        amt = parse_amt(data.get("amt",0))
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    inc = {
         "user_id": str(u["_id"]),
-        "amt": float(data.get("amt",0)),
+        "amt": amt,
         "pay_frequency": data.get("pay_frequency","monthly"),
         "weekly_days": data.get("weekly_days"),
         "anchor_biweekly": data.get("anchor_biweekly"),
         "monthly_date": data.get("monthly_date"),
         "created_at": now()
-    })
+    }
+    income.insert_one(inc)
+    rollup_income(inc)
+    invalidate_summary(inc["user_id"])
     token = ts.dumps(email, salt=TOKEN_SALT)
     link = send_verification_link(email, token)
     return jsonify({"ok":True, "verify_link": link})
@@ -148,17 +323,125 @@ def login():
 @app.get("/dashboard/summary")
 @jwt_required()
 def dashboard_summary():
-    user_id = get_jwt_identity()
-    bal = compute_current_balance(user_id)
-    br = compute_burn_rate(user_id)
-    dl = days_left(user_id)
-    today = now().date(); next7 = today + timedelta(days=7)
-    ups = list(bills.find({"user_id":user_id, "status":"active", "next_due":{"$gte": today.isoformat(), "$lte": next7.isoformat()}}, {"_id":0}).limit(10))
+    return jsonify(cached_summary(get_jwt_identity()))
+
+# One read per input: ledger, perday window, bills in the cash-flow horizon, pay schedule, month cube (SUMMARY_MAX_COMMANDS).
+# A persisted cache miss adds the dashboard read and the store.
+SUMMARY_MAX_COMMANDS = 5
+PERSISTED_CACHE_COMMANDS = 2
+
+def build_summary(user_id):
+    return summary_payload(cashflow_snapshot(user_id, CASHFLOW_HORIZON), month_totals(user_id))
+
+def summary_payload(snap, totals):
+    sim = simulate_cashflow(snap, CASHFLOW_HORIZON)
+    today, next7 = snap["today"].date().isoformat(), (snap["today"] + timedelta(days=7)).date().isoformat()
+    ups = sorted((b for b in snap["bills"] if today <= b.get("next_due", "") <= next7), key=lambda b: b["next_due"])[:10]
     cat_map = {"need":0.0,"wants":0.0,"guilts":0.0,"need_recurrence":0.0}
-    for e in expenses.find({"user_id":user_id}):
-        cat = e.get("allele_frequency","need")
-        cat_map[cat] = cat_map.get(cat,0.0) + float(e.get("amt",0))
-    return jsonify({"current_balance": bal, "burn_rate": br, "days_left": dl, "upcoming_bills": ups, "nwg": cat_map})
+    for cat, total in totals.items():
+        if cat != INCOME_KEY: cat_map[cat] = cat_map.get(cat,0.0) + total
+    return {"current_balance": snap["balance"], "burn_rate": compute_burn_rate(snap["history"]), "days_left": float(runway_days(sim)),
+            "upcoming_bills": ups, "nwg": cat_map, "cashflow": cashflow_brief(sim, snap["today"])}
+
+# ---------------- Dashboard cache ----------------
+# Bounded LRU of summary payloads keyed by user. Entries are good for the current day and at most
+# DASHBOARD_CACHE_TTL seconds; every write endpoint calls invalidate_summary for its user. With
+# DASHBOARD_CACHE_PERSIST=true the dashboard collection is the cache instead, shared by every worker (see below).
+summary_cache = OrderedDict()  # user_id -> {"gen", "day", "at", "summary"}; summary None marks an invalidation
+cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "persisted_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+# Race guard without per-user state outside the LRU: every invalidation takes the next write_seq and records it in
+# the user's entry. A summary is stored only if no invalidation for that user is newer than the write_seq seen
+# before building it. Evicted entries take their generation with them, so evicted_seq (the newest generation
+# evicted) stands in for them.
+write_seq = 0
+evicted_seq = 0
+
+def _cache_set(user_id, entry):
+    # caller holds cache_lock
+    global evicted_seq
+    summary_cache[user_id] = entry
+    summary_cache.move_to_end(user_id)
+    while len(summary_cache) > DASHBOARD_CACHE_SIZE:
+        _, old = summary_cache.popitem(last=False)
+        evicted_seq = max(evicted_seq, old["gen"])
+        cache_stats["evictions"] += 1
+
+def _cache_get(user_id, day):
+    # (cached summary or None, write_seq to pass to _cache_store)
+    with cache_lock:
+        hit = summary_cache.get(user_id)
+        if hit and hit["summary"] is not None and hit["day"] == day and time.monotonic() - hit["at"] < DASHBOARD_CACHE_TTL:
+            summary_cache.move_to_end(user_id)
+            cache_stats["hits"] += 1
+            return hit["summary"], None
+        return None, write_seq
+
+def _cache_store(user_id, day, seen, summary):
+    with cache_lock:
+        entry = summary_cache.get(user_id)
+        gen = entry["gen"] if entry else evicted_seq
+        # a write landed while we were computing: serve the result but don't cache it
+        if gen > seen: return False
+        _cache_set(user_id, {"gen": gen, "day": day, "at": time.monotonic(), "summary": summary})
+    return True
+
+def _cache_count(stat):
+    with cache_lock: cache_stats[stat] += 1
+
+# Persisted entries: one dashboard document per user holding a write `version`. Every write bumps the version and
+# drops the summary in a single update, whatever worker it runs on. A summary is only stored against the version it
+# was built from, so a worker can't put back a summary that another worker's write has already invalidated.
+def persisted_hit(doc, day):
+    built = doc.get("built_at")
+    return (doc.get("summary") is not None and doc.get("day") == day and built is not None
+            and (now() - built).total_seconds() < DASHBOARD_CACHE_TTL)
+
+def persist_update(user_id, doc, day, summary):
+    # (filter, update) for update_one(..., upsert=True). If the version moved on since `doc` was read the filter
+    # misses and the upsert hits the unique user_id index: DuplicateKeyError means "not stored".
+    version = (doc or {}).get("version")
+    return ({"user_id": user_id, "version": version},
+            {"$set": {"version": version or 0, "day": day, "summary": summary, "built_at": now()}})
+
+PERSIST_INVALIDATE = {"$inc": {"version": 1}, "$unset": {"summary": ""}}
+
+def persisted_summary(user_id, day):
+    doc = dashboard.find_one({"user_id": user_id}, {"_id": 0})
+    if doc and persisted_hit(doc, day):
+        _cache_count("persisted_hits")
+        return doc["summary"]
+    _cache_count("misses")
+    summary = build_summary(user_id)
+    try:
+        dashboard.update_one(*persist_update(user_id, doc, day, summary), upsert=True)
+    except DuplicateKeyError:
+        pass
+    return summary
+
+def cached_summary(user_id):
+    day = now().date().isoformat()
+    if DASHBOARD_CACHE_PERSIST: return persisted_summary(user_id, day)
+    summary, gen = _cache_get(user_id, day)
+    if summary is not None: return summary
+    _cache_count("misses")
+    summary = build_summary(user_id)
+    _cache_store(user_id, day, gen, summary)
+    return summary
+
+def _cache_drop(user_id):
+    global write_seq
+    with cache_lock:
+        write_seq += 1
+        _cache_set(user_id, {"gen": write_seq, "summary": None})
+        cache_stats["invalidations"] += 1
+
+def invalidate_summary(user_id):
+    # every write endpoint calls this: it also marks today's precomputed forecast (forecast_job.py) stale
+    _cache_drop(user_id)
+    if DASHBOARD_CACHE_PERSIST:
+        dashboard.update_one({"user_id": user_id}, PERSIST_INVALIDATE, upsert=True)
+    forecast.update_one(*stale_forecast(user_id))
 
 # ---------------- Transactions ----------------
 @app.post("/transactions")
@@ -173,74 +456,103 @@ def add_transaction():
         "merchant": data.get("merchant"),
         "created_at": now()
     }
-    res = transactions.insert_one(t)
+    res = transactions.insert_one(dict(t))  # a copy, so the ObjectId _id stays out of the response
     t["id"] = str(res.inserted_id)
     return jsonify({"ok":True, "transaction": t})
 
+TXN_SORTS = {"date_up": ("created_at", ASCENDING), "date_down": ("created_at", DESCENDING),
+             "amt_up": ("amt", ASCENDING), "amt_down": ("amt", DESCENDING)}
+TXN_RANGES = {"7days":7, "30days":30, "90days":90}
+TXN_PAGE_DEFAULT, TXN_PAGE_MAX = 50, 200
+
+def encode_cursor(value, oid):
+    if isinstance(value, datetime): value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, str(oid)]).encode()).decode()
+
+def decode_cursor(key, cursor):
+    value, oid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if key == "created_at": value = datetime.fromisoformat(value)
+    elif isinstance(value, bool) or not isinstance(value, (int, float)): raise ValueError("amount cursor must be a number")
+    return value, ObjectId(oid)
+
+def keyset_match(key, direction, value, oid):
+    op = "$gt" if direction == ASCENDING else "$lt"
+    return {"$match": {"$or": [{key: {op: value}}, {key: value, "_id": {op: oid}}]}}
+
 @app.get("/transactions")
 @jwt_required()
 def list_transactions():
     user_id = get_jwt_identity()
-    merchant = request.args.get("merchant")
-    category = request.args.get("category")
-    mood = request.args.get("mood")
-    amt_min = request.args.get("amt_min", type=float)
-    amt_max = request.args.get("amt_max", type=float)
-    range_days = request.args.get("range", default="all")
-    sort = request.args.get("sort")
-
-    exp_map = {str(e["_id"]): e for e in expenses.find({"user_id":user_id})}
-    items = []
-    for t in transactions.find({"user_id":user_id}):
-        exp = None
-        if t.get("expense_id"):
-            exp = exp_map.get(str(t.get("expense_id")))
-        row = {
-            "id": str(t["_id"]), "created_at": t.get("created_at"),
-            "merchant": (exp or {}).get("merchant"),
-            "category": (exp or {}).get("allele_frequency"),
-            "mood": (exp or {}).get("mood"),
-            "amt": float((exp or {}).get("amt",0))
-        }
-        items.append(row)
-
-    def row_dt(row):
-        ca = row.get("created_at")
-        if isinstance(ca, str):
-            try: return datetime.fromisoformat(ca.replace("Z",""))
-            except: return now()
-        return ca or now()
-
-    def in_range(row):
-        if range_days == "all": return True
-        days = {"7days":7, "30days":30, "90days":90}.get(range_days, None)
-        if not days: return True
-        return (now() - row_dt(row)).days <= days
-
-    filtered = []
-    for row in items:
-        if merchant and (not (row.get("merchant") or "").lower().startswith(merchant.lower())): continue
-        if category and row.get("category")!=category: continue
-        if mood and row.get("mood")!=mood: continue
-        if amt_min is not None and row.get("amt",0)<amt_min: continue
-        if amt_max is not None and row.get("amt",0)>amt_max: continue
-        if not in_range(row): continue
-        filtered.append(row)
-
-    if sort == "date_up":
-        filtered.sort(key=row_dt)
-    elif sort == "date_down":
-        filtered.sort(key=row_dt, reverse=True)
-    elif sort == "amt_up":
-        filtered.sort(key=lambda x: x.get("amt",0))
-    elif sort == "amt_down":
-        filtered.sort(key=lambda x: x.get("amt",0), reverse=True)
-
-    month_start = now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_txn = [r for r in filtered if row_dt(r) >= month_start]
-    income_sum = sum(x.get("amt",0) for x in month_txn if x.get("category") is None)
-    expense_sum = sum(x.get("amt",0) for x in month_txn if x.get("category") in {"need","need_recurrence","wants","guilts"})
-    return jsonify({"ok":True, "items": filtered, "rollup": {"income": income_sum, "expense": expense_sum, "net": income_sum - expense_sum}})
+    try:
+        q = transactions_query(user_id, request.args)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    rows = list(transactions.aggregate(q["pipeline"]))
+    # `rollup` is this month's totals from the cube, narrowed by category/mood only: it does not follow the
+    # merchant/amount/range filters or the page, so it is not a sum of the returned rows
+    return jsonify(transactions_page(q, rows, month_totals(user_id, now().strftime("%Y-%m"), q["category"], q["mood"])))
+
+def transactions_query(user_id, args):
+    # GET /transactions filters -> {"pipeline", "key", "limit", "category", "mood"}; raises ValueError on a bad cursor
+    merchant = args.get("merchant")
+    category = args.get("category")
+    mood = args.get("mood")
+    amt_min = args.get("amt_min", type=float)
+    amt_max = args.get("amt_max", type=float)
+    range_days = args.get("range", default="all")
+    sort = args.get("sort")
+    cursor = args.get("cursor")
+    limit = max(1, min(args.get("limit", TXN_PAGE_DEFAULT, type=int), TXN_PAGE_MAX))
+
+    key, direction = TXN_SORTS.get(sort, TXN_SORTS["date_down"])
+    try:
+        after = decode_cursor(key, cursor) if cursor else None
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    match = {"user_id": user_id}
+    days = TXN_RANGES.get(range_days)
+    if days: match["created_at"] = {"$gt": now() - timedelta(days=days+1)}
+    exp_match = {}
+    if merchant: exp_match["exp.merchant"] = {"$regex": "^" + re.escape(merchant), "$options": "i"}
+    if category: exp_match["exp.allele_frequency"] = category
+    if mood: exp_match["exp.mood"] = mood
+    amt_match = {}
+    if amt_min is not None: amt_match["$gte"] = amt_min
+    if amt_max is not None: amt_match["$lte"] = amt_max
+
+    join = [
+        {"$lookup": {"from": expenses.name,
+                     "let": {"eid": {"$convert": {"input": "$expense_id", "to": "objectId", "onError": None, "onNull": None}}},
+                     "pipeline": [{"$match": {"user_id": user_id, "$expr": {"$eq": ["$_id", "$$eid"]}}}, {"$limit": 1}],
+                     "as": "exp"}},
+        {"$unwind": {"path": "$exp", "preserveNullAndEmptyArrays": True}},
+        {"$addFields": {"amt": {"$toDouble": {"$ifNull": ["$exp.amt", 0]}}}},
+    ]
+    if exp_match: join.append({"$match": exp_match})
+    if amt_match: join.append({"$match": {"amt": amt_match}})
+    page = []
+    if after: page.append(keyset_match(key, direction, *after))
+    page += [{"$sort": {key: direction, "_id": direction}}, {"$limit": limit + 1}]
+    # date sorts walk the (user_id, created_at, _id) index and join only until the page is full;
+    # amount sorts need the joined amount first
+    pipe = [{"$match": match}] + (page[:-1] + join + page[-1:] if key == "created_at" else join + page)
+    pipe.append({"$project": {"created_at": 1, "amt": 1,
+                              "merchant": {"$ifNull": ["$exp.merchant", None]},
+                              "category": {"$ifNull": ["$exp.allele_frequency", None]},
+                              "mood": {"$ifNull": ["$exp.mood", None]}}})
+    return {"pipeline": pipe, "key": key, "limit": limit, "category": category, "mood": mood}
+
+def transactions_page(q, rows, cube):
+    key, limit = q["key"], q["limit"]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].get(key), rows[-1]["_id"])
+    items = [{"id": str(t.pop("_id")), **t} for t in rows]
+    income_sum = cube.get(INCOME_KEY, 0.0)
+    expense_sum = sum(cube.get(c, 0.0) for c in EXPENSE_CATS)
+    return {"ok":True, "items": items, "next_cursor": next_cursor, "rollup": {"income": income_sum, "expense": expense_sum, "net": income_sum - expense_sum}}
 
 # ---------------- Income & Expenses ----------------
 @app.post("/income")
@@ -248,9 +560,13 @@ def list_transactions():
 def add_income():
     user_id = get_jwt_identity()
     data = request.get_json()
+    try:
+        amt = parse_amt(data.get("amt",0))
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
     inc = {
         "user_id": user_id,
-        "amt": float(data.get("amt",0)),
+        "amt": amt,
         "pay_frequency": data.get("pay_frequency","others"),
         "weekly_days": data.get("weekly_days"),
         "anchor_biweekly": data.get("anchor_biweekly"),
@@ -259,67 +575,205 @@ def add_income():
         "created_at": now()
     }
     res = income.insert_one(inc)
+    rollup_income(inc)
+    invalidate_summary(user_id)
     return jsonify({"ok":True, "id": str(res.inserted_id)})
 
-@app.post("/expenses")
-@jwt_required()
-def add_expense():
-    user_id = get_jwt_identity()
-    data = request.get_json()
+EXPENSE_CATEGORIES = {"need", "wants", "guilts", "need_recurrence"}
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
+
+def parse_amt(value):
+    # amounts go straight into the $inc rollups, so NaN/inf would poison the ledger until a reconcile
+    try:
+        amt = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid amt")
+    if not math.isfinite(amt): raise ValueError("Invalid amt")
+    return amt
+
+def build_expense(user_id, data):
+    # validates one POST /expenses payload; raises ValueError with a client-facing message
+    if not isinstance(data, dict): raise ValueError("Row must be an object")
     allele = data.get("category")  # need / wants / guilts
+    if allele is not None and allele not in EXPENSE_CATEGORIES: raise ValueError("Invalid category")
     is_rec = bool(data.get("need_recurrence", False))
-    e = {
+    day = day_start(data.get("date") or now())
+    if not day: raise ValueError("Invalid date")
+    amt = parse_amt(data.get("amt",0))
+    return {
         "user_id": user_id,
         "transaction_id": data.get("transaction_id"),
-        "amt": float(data.get("amt",0)),
+        "amt": amt,
         "allele_frequency": "need_recurrence" if allele=="need" and is_rec else allele,
-        "date": data.get("date", now().date().isoformat()),
+        "date": day,
         "time": data.get("time", now().strftime("%H:%M")),
         "merchant": data.get("merchant",""),
         "mood": data.get("mood","neutral"),
         "created_at": now(),
     }
-    res = expenses.insert_one(e)
 
-    if e["allele_frequency"] == "need_recurrence":
-        cadence = data.get("cadence","monthly")
-        cur_date = datetime.fromisoformat(e["date"]).date()
-        if cadence == "weekly":
-            next_due = (cur_date + timedelta(days=7)).isoformat()
-        elif cadence == "biweekly":
-            next_due = (cur_date + timedelta(days=14)).isoformat()
-        elif cadence == "monthly":
-            next_due = (cur_date + relativedelta(months=1)).isoformat()
-        else:
-            next_due = (cur_date + relativedelta(months=1)).isoformat()
-        bills.insert_one({
-            "user_id": user_id,
-            "name": data.get("bill_name","Bill"),
-            "amt": e["amt"],
-            "category": data.get("bill_category","Misc"),
-            "cadence": cadence,
-            "status": "active",
-            "last_paid": e["date"],
-            "next_due": next_due,
-            "notes": data.get("note",""),
-            "created_at": now()
-        })
+def build_recurring_bill(e, data):
+    if e["allele_frequency"] != "need_recurrence": return None
+    cadence = data.get("cadence","monthly")
+    cur_date = e["date"].date().isoformat()
+    return {
+        "user_id": e["user_id"],
+        "name": data.get("bill_name","Bill"),
+        "name_lower": name_key(data.get("bill_name","Bill")),
+        "amt": e["amt"],
+        "category": data.get("bill_category","Misc"),
+        "cadence": cadence,
+        "status": "active",
+        "last_paid": cur_date,
+        "next_due": next_due_from(cadence, cur_date),
+        "anchor_day": e["date"].day,  # month cadences keep landing on this day, clamped to short months
+        "notes": data.get("note",""),
+        "created_at": now()
+    }
 
+@app.post("/expenses")
+@jwt_required()
+def add_expense():
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    try:
+        e = build_expense(user_id, data)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    res = expenses.insert_one(e)
+    rollup_expense(e)
+    patterns.detect(pattern_state, flags, [e])
+    bill = build_recurring_bill(e, data)
+    if bill: bills.insert_one(bill)
+    invalidate_summary(user_id)
     return jsonify({"ok":True, "id": str(res.inserted_id)})
 
+def bulk_expenses(user_id, rows):
+    # (expense docs, their row numbers, [{"row", "error"}] for the rows that didn't validate)
+    docs, src, errors = [], [], []
+    for i, row in enumerate(rows):
+        try:
+            docs.append(build_expense(user_id, row)); src.append(i)
+        except ValueError as ex:
+            errors.append({"row": i, "error": str(ex)})
+    return docs, src, errors
+
+def bulk_bills(ok, rows):
+    # recurring bills for the inserted (expense, row number) pairs, and their row numbers
+    made = [(b, i) for b, i in ((build_recurring_bill(d, rows[i]), i) for d, i in ok) if b]
+    return [b for b, _ in made], [i for _, i in made]
+
+def bulk_failures(bwe, src, errors, prefix=""):
+    # reports each failed insert of an unordered insert_many against its row; returns the failed indexes
+    failed = set()
+    for w in bwe.details.get("writeErrors", []):
+        failed.add(w["index"])
+        errors.append({"row": src[w["index"]], "error": prefix + w.get("errmsg", "write failed")})
+    return failed
+
+@app.post("/expenses/bulk")
+@jwt_required()
+def add_expenses_bulk():
+    # body: {"rows": [<POST /expenses payload>, ...]}; rows are validated and written independently
+    user_id = get_jwt_identity()
+    body = request.get_json(silent=True)
+    rows = body.get("rows") if isinstance(body, dict) else None
+    if not isinstance(rows, list) or not rows: return jsonify({"error":"rows must be a non-empty list"}), 400
+    if len(rows) > BULK_MAX_ROWS: return jsonify({"error":f"At most {BULK_MAX_ROWS} rows per request"}), 413
+    started = time.perf_counter()
+
+    docs, src, errors = bulk_expenses(user_id, rows)
+    failed = set()
+    if docs:
+        try:
+            expenses.insert_many(docs, ordered=False)
+        except BulkWriteError as bwe:
+            failed = bulk_failures(bwe, src, errors)
+    ok = [(d, i) for j, (d, i) in enumerate(zip(docs, src)) if j not in failed]
+    written = [d for d, _ in ok]
+
+    new_bills, bill_src = bulk_bills(ok, rows)
+    bills_failed = set()
+    if new_bills:
+        try:
+            bills.insert_many(new_bills, ordered=False)
+        except BulkWriteError as bwe:
+            bills_failed = bulk_failures(bwe, bill_src, errors, "bill not created: ")
+    rollup_expenses(written)
+    patterns.detect(pattern_state, flags, written)
+    invalidate_summary(user_id)
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda x: x["row"])
+    return jsonify({"ok": not errors, "inserted": len(ok), "ids": [str(d["_id"]) for d in written], "bills_created": len(new_bills) - len(bills_failed),
+                    "errors": errors, "elapsed_ms": round(elapsed*1000, 1), "rows_per_sec": round(len(rows)/elapsed, 1) if elapsed else None})
+
+EXPENSE_FIELDS = {"amt":"amt", "category":"allele_frequency", "date":"date", "time":"time", "merchant":"merchant", "mood":"mood"}
+
+def expense_update(data):
+    # validates a PATCH /expenses/<id> body with build_expense's rules; raises ValueError with a client-facing message
+    if not isinstance(data, dict): raise ValueError("Body must be an object")
+    upd = {EXPENSE_FIELDS[k]:v for k,v in data.items() if k in EXPENSE_FIELDS}
+    if not upd: raise ValueError("No fields to update")
+    if "amt" in upd: upd["amt"] = parse_amt(upd["amt"])
+    if upd.get("allele_frequency") is not None and upd["allele_frequency"] not in EXPENSE_CATEGORIES: raise ValueError("Invalid category")
+    if "date" in upd:
+        upd["date"] = day_start(upd["date"])
+        if not upd["date"]: raise ValueError("Invalid date")
+    return upd
+
+@app.patch("/expenses/<eid>")
+@jwt_required()
+def update_expense(eid):
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    try:
+        q = {"_id": ObjectId(eid), "user_id": user_id}
+    except Exception:
+        return jsonify({"error":"Invalid expense id"}), 400
+    try:
+        upd = expense_update(data)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    old = expenses.find_one_and_update(q, {"$set":upd}, return_document=ReturnDocument.BEFORE)
+    if not old: return jsonify({"error":"Expense not found"}), 404
+    rollup_expense(old, -1)
+    rollup_expense({**old, **upd})
+    invalidate_summary(user_id)
+    return jsonify({"ok":True})
+
+@app.delete("/expenses/<eid>")
+@jwt_required()
+def delete_expense(eid):
+    user_id = get_jwt_identity()
+    try:
+        old = expenses.find_one_and_delete({"_id": ObjectId(eid), "user_id": user_id})
+    except Exception:
+        return jsonify({"error":"Invalid expense id"}), 400
+    if not old: return jsonify({"error":"Expense not found"}), 404
+    rollup_expense(old, -1)
+    invalidate_summary(user_id)
+    return jsonify({"ok":True})
+
 # ---------------- Bills ----------------
 @app.get("/bills")
 @jwt_required()
 def list_bills():
     user_id = get_jwt_identity()
+    items = list(bills.find(bills_query(user_id, request.args)).sort("next_due", ASCENDING))
+    summary = next(bills.aggregate(bills_summary_pipeline(user_id)), {})
+    return jsonify(bills_page(items, summary))
+
+def bills_query(user_id, args):
     q = {"user_id": user_id}
-    search = request.args.get("search")
-    status = request.args.get("status")
-    cadence = request.args.get("cadence")
-    due = request.args.get("due")  # today, next7, overdue
-    category = request.args.get("category")
+    search = args.get("search")
+    status = args.get("status")
+    cadence = args.get("cadence")
+    due = args.get("due")  # today, next7, overdue
+    category = args.get("category")
 
-    if search: q["name"] = {"$regex": f"^{search}", "$options":"i"}
+    # anchored, case-sensitive regex on the lowered name -> tight prefix bounds on (user_id, name_lower)
+    if search: q["name_lower"] = {"$regex": "^" + re.escape(name_key(search))}
     if status: q["status"] = status
     if cadence: q["cadence"] = cadence
     if category: q["category"] = category
@@ -331,16 +785,23 @@ def list_bills():
         q["next_due"] = {"$gte": today.isoformat(), "$lte": (today+timedelta(days=7)).isoformat()}
     elif due == "overdue":
         q["next_due"] = {"$lt": today.isoformat()}
+    return q
+
+def bills_summary_pipeline(user_id):
+    # active bills only, served from (user_id, status, next_due)
+    next7 = (datetime.utcnow().date()+timedelta(days=7)).isoformat()
+    return [
+        {"$match": {"user_id": user_id, "status": "active"}},
+        {"$group": {"_id": None,
+                    "total_this_month": {"$sum": "$amt"},
+                    "next7": {"$sum": {"$cond": [{"$lte": ["$next_due", next7]}, "$amt", 0]}},
+                    "active": {"$sum": 1}}},
+        {"$project": {"_id": 0}},
+    ]
 
-    docs = []
-    for b in bills.find(q).sort("next_due", ASCENDING):
-        d = {k:(str(v) if k=="_id" else v) for k,v in b.items()}
-        d["id"] = d.pop("_id")
-        docs.append(d)
-    total_this_month = sum(b.get("amt",0) for b in bills.find({"user_id":user_id, "status":"active"}))
-    next7 = sum(b.get("amt",0) for b in bills.find({"user_id":user_id, "status":"active", "next_due":{"$lte": (today+timedelta(days=7)).isoformat()}}))
-    active_count = bills.count_documents({"user_id":user_id, "status":"active"})
-    return jsonify({"ok":True, "items":docs, "summary":{"total_this_month":total_this_month, "next7":next7, "active":active_count}})
+def bills_page(items, summary):
+    for b in items: b["id"] = str(b.pop("_id"))
+    return {"ok":True, "items":items, "summary":{"total_this_month":summary.get("total_this_month", 0), "next7":summary.get("next7", 0), "active":summary.get("active", 0)}}
 
 @app.patch("/bills/<bid>")
 @jwt_required()
@@ -353,7 +814,9 @@ def update_bill(bid):
         return jsonify({"error":"Invalid bill id"}), 400
     upd = {k:v for k,v in data.items() if k in ["name","amt","category","cadence","next_due","status","notes"]}
     if not upd: return jsonify({"error":"No fields to update"}), 400
+    if "name" in upd: upd["name_lower"] = name_key(upd["name"])
     bills.update_one(q, {"$set":upd})
+    invalidate_summary(user_id)
     return jsonify({"ok":True})
 
 @app.delete("/bills/<bid>")
@@ -361,28 +824,261 @@ def update_bill(bid):
 def delete_bill(bid):
     try:
         bills.delete_one({"_id": ObjectId(bid)})
+        invalidate_summary(get_jwt_identity())
         return jsonify({"ok":True})
     except Exception:
         return jsonify({"error":"Invalid bill id"}), 400
 
-# ---------------- ML Stub ----------------
+# ---------------- Forecasting ----------------
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "364"))
+FORECAST_INTERVAL = 0.8
+
+def forecast_reads(user_id, today, horizon):
+    # (filter, projection) of the on-demand forecast inputs: the perday history window and the bills due within the horizon
+    end = today + timedelta(days=horizon)
+    return {
+        "history": ({"user_id":user_id, "day":{"$gte":today - timedelta(days=FORECAST_HISTORY_DAYS), "$lt":today}}, {"_id":0, "day":1, "total":1, "recurring":1}),
+        "bills": ({"user_id":user_id, "status":"active", "next_due":{"$lt": end.date().isoformat()}}, {"_id":0, "amt":1, "cadence":1, "next_due":1, "anchor_day":1}),
+        "last7": ({"user_id":user_id, "count":{"$gt":0}}, {"_id":0, "total":1}),
+    }
+
+def user_bill_events(user_id, start, horizon):
+    return bill_events(bills.find(*forecast_reads(user_id, start, horizon)["bills"]), start, horizon)
+
+def user_forecast(user_id, horizon=7):
+    # one perday range read over the history window plus the user's active bills
+    today = day_start(now())
+    docs = list(perday.find(*forecast_reads(user_id, today, horizon)["history"]))
+    return forecast_user(docs, today, FORECAST_HISTORY_DAYS, horizon, user_bill_events(user_id, today, horizon), level=FORECAST_INTERVAL)
+
+def avg_total(docs):
+    last7 = [float(d["total"]) for d in docs]
+    return (sum(last7)/len(last7)) if last7 else 0.0
+
+def last7_avg(user_id):
+    return avg_total(perday.find(*forecast_reads(user_id, day_start(now()), 7)["last7"]).sort("day", DESCENDING).limit(7))
+
 @app.get("/ml/next7_burnrate")
 @jwt_required()
 def ml_next7():
+    # served from the nightly forecast_job.py output when it has run today and no write has made it stale,
+    # computed on demand otherwise
     user_id = get_jwt_identity()
-    day_map = {}
-    for e in expenses.find({"user_id":user_id}):
-        day = e.get("date")
-        if not day: continue
-        day_map[day] = day_map.get(day, 0.0) + float(e.get("amt",0))
-    days = sorted(day_map.keys())[-7:]
-    avg = (sum(day_map[d] for d in days)/len(days)) if days else 0.0
-    proj = [round(avg,2) for _ in range(7)]
-    return jsonify({"ok":True, "avg_last7": round(avg,2), "projection_next7": proj})
+    today = day_start(now())
+    pre = forecast.find_one(*precomputed_read(user_id, today))
+    if pre:
+        fc, avg, source = pre, pre.get("avg_last7", 0.0), "precomputed"
+    else:
+        fc, avg, source = user_forecast(user_id), last7_avg(user_id), "on_demand"
+    return jsonify(next7_payload(fc, avg, source))
+
+def precomputed_read(user_id, today):
+    return {"user_id":user_id, "as_of":today, "horizon":{"$gte":7}, "stale":{"$ne":True}}, {"_id":0, "mean":1, "lower":1, "upper":1, "avg_last7":1}
+
+def stale_forecast(user_id):
+    # (filter, update): a write since the nightly job ran makes today's precomputed forecast unusable; the
+    # document is kept for backtest.py --stored
+    return {"user_id":user_id, "as_of":day_start(now())}, {"$set":{"stale":True}}
+
+def next7_payload(fc, avg, source):
+    r2 = lambda xs: [round(float(x), 2) for x in list(xs)[:7]]
+    return {"ok":True, "avg_last7": round(avg,2), "projection_next7": r2(fc["mean"]),
+            "lower_next7": r2(fc["lower"]), "upper_next7": r2(fc["upper"]), "interval": FORECAST_INTERVAL,
+            "model": "ses_dow", "source": source}
+
+# ---------------- Cash flow ----------------
+# Day-by-day balance from paydays, bill occurrences and forecast discretionary spend (cashflow.py).
+# The dashboard's days_left is the first day this balance goes negative.
+CASHFLOW_HORIZON = int(os.getenv("CASHFLOW_HORIZON", "90"))
+CASHFLOW_MAX_HORIZON = 365
+
+def cashflow_reads(user_id, today, horizon):
+    # (filter, projection) of each snapshot input; shared with asgi_app, which runs them concurrently
+    due_before = (today + timedelta(days=horizon)).date().isoformat()
+    return {
+        "ledger": ({"user_id": user_id}, LEDGER_FIELDS),
+        "history": ({"user_id":user_id, "day":{"$gte": today - timedelta(days=FORECAST_HISTORY_DAYS)}}, {"_id":0, "day":1, "total":1, "recurring":1, "count":1}),
+        "bills": ({"user_id":user_id, "status":"active", "next_due":{"$lt": due_before}}, {"_id":0}),
+        "pay": ({"user_id":user_id, "pay_frequency":{"$in": list(PAY_FREQUENCIES)}}, {"_id":0}),
+    }
+
+PAY_SORT = [("created_at", DESCENDING)]
+
+def cashflow_snapshot(user_id, horizon):
+    today = day_start(now())
+    r = cashflow_reads(user_id, today, horizon)
+    return {"today": today, "balance": ledger_balance(current_balance.find_one(*r["ledger"])),
+            "history": list(perday.find(*r["history"])), "bills": list(bills.find(*r["bills"])),
+            "pay": income.find_one(*r["pay"], sort=PAY_SORT)}
+
+def simulate_cashflow(snap, horizon):
+    today = snap["today"]
+    pay, due = payday_amounts(snap["pay"], today, horizon), daily_amounts(snap["bills"], today, horizon)
+    spend = forecast_user(snap["history"], today, FORECAST_HISTORY_DAYS, horizon)["mean"]  # bills are added separately
+    return {**simulate(snap["balance"], pay, due, spend), "income": pay, "bills": due, "spend": spend}
+
+def cashflow_brief(sim, today):
+    first, low = int(sim["first_negative"]), int(sim["min_day"])
+    return {"first_negative_day": first if first >= 0 else None,
+            "first_negative_date": (today + timedelta(days=first)).date().isoformat() if first >= 0 else None,
+            "min_balance": round(float(sim["min_balance"]), 2), "min_balance_date": (today + timedelta(days=low)).date().isoformat(),
+            "horizon": int(sim["balance"].shape[-1])}
+
+@app.get("/cashflow")
+@jwt_required()
+def cashflow_simulation():
+    # ?horizon=<days> (default CASHFLOW_HORIZON); arrays are end-of-day values, index 0 = today
+    user_id = get_jwt_identity()
+    horizon = max(1, min(request.args.get("horizon", default=CASHFLOW_HORIZON, type=int), CASHFLOW_MAX_HORIZON))
+    return jsonify(cashflow_payload(cashflow_snapshot(user_id, horizon), horizon))
+
+def cashflow_payload(snap, horizon):
+    sim = simulate_cashflow(snap, horizon)
+    r2 = lambda xs: [round(float(x), 2) for x in xs]
+    return {"ok": True, "start": snap["today"].date().isoformat(), "current_balance": round(snap["balance"], 2),
+            **{k: r2(sim[k]) for k in ("balance", "income", "bills", "spend")},
+            "days_left": float(runway_days(sim)), **cashflow_brief(sim, snap["today"])}
+
+# ---------------- Spending patterns ----------------
+@app.get("/flags")
+@jwt_required()
+def list_flags():
+    # newest first; flags are written by patterns.detect as expenses arrive
+    q, limit = flags_query(get_jwt_identity(), request.args)
+    return jsonify(flags_page(list(flags.find(q, {"_id": 0}).sort("created_at", DESCENDING).limit(limit))))
+
+def flags_query(user_id, args):
+    q = {"user_id": user_id}
+    if args.get("type"): q["type"] = args["type"]
+    return q, max(1, min(args.get("limit", default=50, type=int), 200))
+
+def flags_page(items):
+    for f in items:
+        f["day"] = f["day"].date().isoformat() if f.get("day") else None
+        f["created_at"] = f["created_at"].isoformat()
+    return {"ok": True, "items": items}
+
+# ---------------- Insights ----------------
+INSIGHTS_PAGE_DEFAULT, INSIGHTS_PAGE_MAX = 20, 100
+
+@app.get("/insights")
+@jwt_required()
+def list_insights():
+    # precomputed by insights.py; one (user_id, rank) index range per page
+    try:
+        q, limit = insights_query(get_jwt_identity(), request.args)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    return jsonify(insights_page(list(insights.find(q, {"user_id": 0}).sort("rank", ASCENDING).limit(limit + 1)), limit))
+
+def insights_query(user_id, args):
+    limit = max(1, min(args.get("limit", default=INSIGHTS_PAGE_DEFAULT, type=int), INSIGHTS_PAGE_MAX))
+    q = {"user_id": user_id}
+    if args.get("type"): q["type"] = args["type"]
+    cursor = args.get("cursor")
+    if cursor:
+        try:
+            q["rank"] = {"$gt": decode_cursor("rank", cursor)[0]}
+        except Exception:
+            raise ValueError("Invalid cursor")
+    return q, limit
+
+def insights_page(items, limit):
+    more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1]["rank"], items[-1]["_id"]) if more else None
+    for i in items:
+        i["_id"] = str(i["_id"])
+        i["computed_at"] = i["computed_at"].isoformat()
+    return {"ok": True, "items": items, "next_cursor": next_cursor}
+
+# ---------------- Maintenance ----------------
+@app.cli.command("reconcile")
+@click.option("--user", "user_id", default=None, help="Only rebuild this user's aggregates.")
+def reconcile(user_id):
+    """Rebuild the balance ledger, daily rollups and month cube from income and expenses."""
+    n = rebuild_ledger(user_id)
+    rebuild_perday(user_id)
+    rebuild_month(user_id)
+    print(f"[RECONCILE] ledger, daily rollups and month cube rebuilt for {n} users")
+
+# ---------------- Migrations ----------------
+# Versioned, resumable data migrations. Progress lives in the migrations collection as
+# {_id: name, last_id, converted, skipped, done}; an interrupted run picks up after last_id.
+migrations = db.migrations
+MIGRATION_BATCH = int(os.getenv("MIGRATION_BATCH", "1000"))
+
+def _native_dates(coll, field, parse):
+    def run(state):
+        q = {field: {"$type": "string"}}
+        if state.get("last_id"): q["_id"] = {"$gt": state["last_id"]}
+        batch = list(coll.find(q, {field: 1}).sort("_id", ASCENDING).limit(MIGRATION_BATCH))
+        ops, skipped = [], 0
+        for d in batch:
+            v = parse(d[field])
+            if v: ops.append(UpdateOne({"_id": d["_id"], field: d[field]}, {"$set": {field: v}}))
+            else: skipped += 1
+        if ops: coll.bulk_write(ops, ordered=False)
+        return (batch[-1]["_id"] if batch else None), len(ops), skipped
+    return run
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", ""))
+    except Exception:
+        return None
+
+def _rebuild_perday_once(state):
+    rebuild_perday()
+    return None, perday.estimated_document_count(), 0
+
+def _bill_name_lower(state):
+    q = {"name_lower": {"$exists": False}}
+    if state.get("last_id"): q["_id"] = {"$gt": state["last_id"]}
+    batch = list(bills.find(q, {"name": 1}).sort("_id", ASCENDING).limit(MIGRATION_BATCH))
+    ops = [UpdateOne({"_id": b["_id"]}, {"$set": {"name_lower": name_key(b.get("name"))}}) for b in batch]
+    if ops: bills.bulk_write(ops, ordered=False)
+    return (batch[-1]["_id"] if batch else None), len(ops), 0
+
+MIGRATIONS = [
+    ("0001_expense_date_native", _native_dates(expenses, "date", day_start)),
+    ("0002_transaction_created_at_native", _native_dates(transactions, "created_at", _parse_datetime)),
+    ("0003_perday_native_days", _rebuild_perday_once),
+    ("0004_bill_name_lower", _bill_name_lower),
+]
+
+def run_migrations():
+    for name, step in MIGRATIONS:
+        state = migrations.find_one({"_id": name}) or {"_id": name, "converted": 0, "skipped": 0}
+        if state.get("done"): continue
+        while True:
+            last_id, converted, skipped = step(state)
+            state.update(converted=state["converted"] + converted, skipped=state["skipped"] + skipped,
+                         done=last_id is None, updated_at=now())
+            if last_id is not None: state["last_id"] = last_id
+            migrations.replace_one({"_id": name}, state, upsert=True)
+            if state["done"]: break
+        print(f"[MIGRATE] {name}: {state['converted']} converted, {state['skipped']} skipped")
+
+@app.cli.command("migrate")
+def migrate():
+    """Apply pending data migrations (resumable)."""
+    run_migrations()
+
+@app.after_request
+def report_mongo_commands(resp):
+    if COUNT_MONGO_COMMANDS:
+        n = g.get("mongo_commands", 0)
+        resp.headers["X-Mongo-Commands"] = str(n)
+        budget = SUMMARY_MAX_COMMANDS + (PERSISTED_CACHE_COMMANDS if DASHBOARD_CACHE_PERSIST else 0)
+        if request.endpoint == "dashboard_summary" and n > budget:
+            app.logger.warning("dashboard summary issued %d Mongo commands (budget %d)", n, budget)
+    return resp
 
 @app.get("/health")
 def health():
-    return {"ok":True, "time": datetime.utcnow().isoformat()}
+    with cache_lock: stats = {**cache_stats, "size": len(summary_cache)}
+    return {"ok":True, "time": datetime.utcnow().isoformat(), "dashboard_cache": stats}
 
 if __name__ == "__main__":
     app.run(host=os.getenv("APP_HOST","0.0.0.0"), port=int(os.getenv("APP_PORT","5000")), debug=os.getenv("APP_DEBUG","true")=="true")
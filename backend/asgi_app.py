@@ -0,0 +1,453 @@
+# backend/asgi_app.py
+"""ASGI variant of app.py: Quart + motor (async MongoDB) + PyJWT.
+
+    hypercorn asgi_app:app --bind 0.0.0.0:5001 --workers 4
+
+Same routes and JSON bodies as the Flask app. Each handler sends its independent reads together
+with asyncio.gather, so its latency is the slowest read rather than the sum of all of them. An
+in-flight request holds only a coroutine, not a worker thread. /dashboard/summary issues its five
+reads (ledger, perday window, bills, pay schedule, month cube) at once.
+
+Writes run concurrently too, but the summary cache is invalidated only once they have all landed, as in
+app.py. Invalidating earlier would let a concurrent /dashboard/summary read the old rollups and cache them.
+
+Query shapes, rollup operations, pattern detection and response shaping are imported from app.py
+and patterns.py, so the two apps cannot drift apart. Importing app.py also creates the indexes.
+Tokens are HS256 with the claims flask-jwt-extended issues, so a token from either app works on both.
+Not ported: the flask CLI commands (`reconcile`, `migrate`) and the X-Mongo-Commands header.
+"""
+import asyncio
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import jwt
+from bson import ObjectId
+from itsdangerous import BadSignature, SignatureExpired
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.hash import bcrypt
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from quart import Quart, g, jsonify, request
+from quart_cors import cors
+
+import app as sync_app
+import patterns
+from app import (CASHFLOW_HORIZON, CASHFLOW_MAX_HORIZON, BULK_MAX_ROWS,
+                 FORECAST_HISTORY_DAYS, FORECAST_INTERVAL, JWT_SECRET, FRONTEND_ORIGIN, MONGO_URI, DB_NAME, TOKEN_SALT,
+                 MONTH_TOTAL_FIELDS, PAY_SORT, now, day_start, ts)
+from forecast import forecast_user
+from recurrence import bill_events
+
+ACCESS_TOKEN_TTL = timedelta(minutes=15)  # flask-jwt-extended's JWT_ACCESS_TOKEN_EXPIRES default
+
+app = Quart(__name__)
+app = cors(app, allow_origin=FRONTEND_ORIGIN, allow_credentials=FRONTEND_ORIGIN != "*")
+db = None
+
+@app.before_serving
+async def connect():
+    # the motor client binds to the running event loop, so it is created here rather than at import
+    global db
+    db = AsyncIOMotorClient(MONGO_URI)[DB_NAME]
+
+# ---------------- Auth ----------------
+def create_access_token(identity, additional_claims=None):
+    t = datetime.now(timezone.utc)
+    claims = {"fresh": False, "iat": t, "jti": str(uuid.uuid4()), "type": "access", "sub": identity, "nbf": t,
+              "exp": t + ACCESS_TOKEN_TTL, **(additional_claims or {})}
+    return jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+
+def jwt_required(fn):
+    # same status codes and {"msg"} bodies as flask-jwt-extended
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "").strip().strip(",")
+        if not header: return jsonify({"msg": "Missing Authorization Header"}), 401
+        bearer = [v for v in re.split(r",\s*", header) if v.split()[0] == "Bearer"]
+        if len(bearer) != 1:
+            return jsonify({"msg": "Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'"}), 401
+        parts = bearer[0].split()
+        if len(parts) != 2:
+            return jsonify({"msg": "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}), 422
+        try:
+            claims = jwt.decode(parts[1], JWT_SECRET, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return jsonify({"msg": "Token has expired"}), 401
+        except jwt.InvalidTokenError as ex:
+            return jsonify({"msg": str(ex)}), 422
+        if claims.get("type") != "access": return jsonify({"msg": "Only non-refresh tokens are allowed"}), 422
+        g.jwt_identity = claims["sub"]
+        return await fn(*args, **kwargs)
+    return wrapper
+
+def get_jwt_identity():
+    return g.jwt_identity
+
+# ---------------- Helpers ----------------
+async def apply_ops(*ops):
+    # {collection: [UpdateOne]} dicts from app.rollup_ops / income_rollup_ops, one unordered bulk write per collection
+    merged = {}
+    for o in ops:
+        for name, batch in o.items(): merged.setdefault(name, []).extend(batch)
+    await asyncio.gather(*(db[name].bulk_write(batch, ordered=False) for name, batch in merged.items() if batch))
+
+async def detect_patterns(docs):
+    # patterns.detect with motor: versioned state writes, re-run for users that lost a race
+    pending, found_all = patterns.by_user(docs), []
+    for attempt in range(patterns.STATE_RETRIES):
+        if not pending: break
+        states = {s["user_id"]: s for s in await db.pattern_state.find({"user_id": {"$in": list(pending)}}, {"_id": 0}).to_list(None)}
+        uids, state_ops, found = patterns.detect_ops(states, [e for batch in pending.values() for e in batch])
+        try:
+            await db.pattern_state.bulk_write(state_ops, ordered=False)
+            lost = set()
+        except BulkWriteError as bwe:
+            lost = patterns.lost_races(bwe)
+            if attempt == patterns.STATE_RETRIES - 1: raise
+        patterns.settle(pending, uids, found, lost, found_all)
+    if found_all:
+        await db.flag_patterns.bulk_write(patterns.flag_ops(found_all), ordered=False)
+    return found_all
+
+async def month_totals(user_id, mon=None, allele=None, mood=None):
+    return sync_app.sum_cells(await db.month.find(sync_app.month_query(user_id, mon, allele, mood), MONTH_TOTAL_FIELDS).to_list(None))
+
+async def invalidate_summary(user_id):
+    sync_app._cache_drop(user_id)
+    await asyncio.gather(db.forecast_groundtruth.update_one(*sync_app.stale_forecast(user_id)),
+                         *([db.dashboard.update_one({"user_id": user_id}, sync_app.PERSIST_INVALIDATE, upsert=True)]
+                           if sync_app.DASHBOARD_CACHE_PERSIST else []))
+
+# ---------------- Auth routes ----------------
+@app.post("/auth/signup_page1")
+async def signup_page1():
+    data = await request.get_json()
+    name = (data.get("name") or "").strip()
+    email = (data.get("email") or "").lower().strip()
+    password = data.get("password") or ""
+    if not (name and email and password): return jsonify({"error":"Missing fields"}), 400
+    if await db.users.find_one({"email":email}): return jsonify({"error":"Email exists"}), 409
+    hashed = await asyncio.to_thread(bcrypt.hash, password)  # bcrypt is CPU-bound; keep it off the event loop
+    await db.users.insert_one({"name":name,"email":email,"password":hashed,"verified":False,"created_at":now(),"updated_at":now()})
+    return jsonify({"ok":True})
+
+@app.post("/auth/signup_page2_income")
+async def signup_page2_income():
+    data = await request.get_json()
+    email = (data.get("email") or "").lower().strip()
+    u = await db.users.find_one({"email":email})
+    if not u: return jsonify({"error":"User not found"}), 404
+    try:
+        amt = sync_app.parse_amt(data.get("amt",0))
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    inc = {
+        "user_id": str(u["_id"]),
+        "amt": amt,
+        "pay_frequency": data.get("pay_frequency","monthly"),
+        "weekly_days": data.get("weekly_days"),
+        "anchor_biweekly": data.get("anchor_biweekly"),
+        "monthly_date": data.get("monthly_date"),
+        "created_at": now()
+    }
+    await db.income.insert_one(inc)
+    await apply_ops(sync_app.income_rollup_ops(inc))
+    await invalidate_summary(inc["user_id"])
+    link = sync_app.send_verification_link(email, ts.dumps(email, salt=TOKEN_SALT))
+    return jsonify({"ok":True, "verify_link": link})
+
+@app.get("/auth/verify/<token>")
+async def verify_email(token):
+    try:
+        email = ts.loads(token, salt=TOKEN_SALT, max_age=60*60*24*7)
+    except SignatureExpired:
+        return jsonify({"error":"Token expired"}), 400
+    except BadSignature:
+        return jsonify({"error":"Bad token"}), 400
+    await db.users.update_one({"email":email}, {"$set":{"verified":True, "updated_at":now()}})
+    return jsonify({"ok":True, "message":"Email verified. You can login now."})
+
+@app.post("/auth/login")
+async def login():
+    data = await request.get_json()
+    email = (data.get("email") or "").lower().strip()
+    password = data.get("password") or ""
+    u = await db.users.find_one({"email":email})
+    if not u or not await asyncio.to_thread(bcrypt.verify, password, u["password"]):
+        return jsonify({"error":"Invalid credentials"}), 401
+    if not u.get("verified"):
+        return jsonify({"error":"Account not verified"}), 403
+    token = create_access_token(identity=str(u["_id"]), additional_claims={"email": email})
+    return jsonify({"ok":True, "token":token, "user":{"id":str(u["_id"]), "name":u["name"], "email":u["email"]}})
+
+# ---------------- Dashboard ----------------
+@app.get("/dashboard/summary")
+@jwt_required
+async def dashboard_summary():
+    return jsonify(await cached_summary(get_jwt_identity()))
+
+async def cashflow_snapshot(user_id, horizon):
+    today = day_start(now())
+    r = sync_app.cashflow_reads(user_id, today, horizon)
+    led, history, bill_docs, pay = await asyncio.gather(
+        db.current_balance.find_one(*r["ledger"]),
+        db.perday.find(*r["history"]).to_list(None),
+        db.bills.find(*r["bills"]).to_list(None),
+        db.income.find_one(*r["pay"], sort=PAY_SORT))
+    return {"today": today, "balance": sync_app.ledger_balance(led), "history": history, "bills": bill_docs, "pay": pay}
+
+async def build_summary(user_id):
+    # all five reads in flight at once
+    snap, totals = await asyncio.gather(cashflow_snapshot(user_id, CASHFLOW_HORIZON), month_totals(user_id))
+    return sync_app.summary_payload(snap, totals)
+
+async def persisted_summary(user_id, day):
+    doc = await db.dashboard.find_one({"user_id": user_id}, {"_id": 0})
+    if doc and sync_app.persisted_hit(doc, day):
+        sync_app._cache_count("persisted_hits")
+        return doc["summary"]
+    sync_app._cache_count("misses")
+    summary = await build_summary(user_id)
+    try:
+        await db.dashboard.update_one(*sync_app.persist_update(user_id, doc, day, summary), upsert=True)
+    except DuplicateKeyError:
+        pass
+    return summary
+
+async def cached_summary(user_id):
+    # the same cache as app.cached_summary, so /health reports it the same way
+    day = now().date().isoformat()
+    if sync_app.DASHBOARD_CACHE_PERSIST: return await persisted_summary(user_id, day)
+    summary, gen = sync_app._cache_get(user_id, day)
+    if summary is not None: return summary
+    sync_app._cache_count("misses")
+    summary = await build_summary(user_id)
+    sync_app._cache_store(user_id, day, gen, summary)
+    return summary
+
+# ---------------- Transactions ----------------
+@app.post("/transactions")
+@jwt_required
+async def add_transaction():
+    user_id = get_jwt_identity()
+    data = await request.get_json()
+    t = {
+        "user_id": user_id,
+        "income_id": data.get("income_id"),
+        "expense_id": data.get("expense_id"),
+        "merchant": data.get("merchant"),
+        "created_at": now()
+    }
+    res = await db.transactions.insert_one(dict(t))  # a copy, so the ObjectId _id stays out of the response
+    t["id"] = str(res.inserted_id)
+    return jsonify({"ok":True, "transaction": t})
+
+@app.get("/transactions")
+@jwt_required
+async def list_transactions():
+    user_id = get_jwt_identity()
+    try:
+        q = sync_app.transactions_query(user_id, request.args)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    rows, cube = await asyncio.gather(db.transactions.aggregate(q["pipeline"]).to_list(None),
+                                      month_totals(user_id, now().strftime("%Y-%m"), q["category"], q["mood"]))
+    return jsonify(sync_app.transactions_page(q, rows, cube))
+
+# ---------------- Income & Expenses ----------------
+@app.post("/income")
+@jwt_required
+async def add_income():
+    user_id = get_jwt_identity()
+    data = await request.get_json()
+    try:
+        amt = sync_app.parse_amt(data.get("amt",0))
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    inc = {
+        "user_id": user_id,
+        "amt": amt,
+        "pay_frequency": data.get("pay_frequency","others"),
+        "weekly_days": data.get("weekly_days"),
+        "anchor_biweekly": data.get("anchor_biweekly"),
+        "monthly_date": data.get("monthly_date"),
+        "other_note": data.get("other_note"),
+        "created_at": now()
+    }
+    res = await db.income.insert_one(inc)
+    await apply_ops(sync_app.income_rollup_ops(inc))
+    await invalidate_summary(user_id)
+    return jsonify({"ok":True, "id": str(res.inserted_id)})
+
+@app.post("/expenses")
+@jwt_required
+async def add_expense():
+    user_id = get_jwt_identity()
+    data = await request.get_json()
+    try:
+        e = sync_app.build_expense(user_id, data)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    res = await db.expenses.insert_one(e)
+    bill = sync_app.build_recurring_bill(e, data)
+    await asyncio.gather(apply_ops(sync_app.rollup_ops([e])), detect_patterns([e]), *([db.bills.insert_one(bill)] if bill else []))
+    await invalidate_summary(user_id)
+    return jsonify({"ok":True, "id": str(res.inserted_id)})
+
+@app.post("/expenses/bulk")
+@jwt_required
+async def add_expenses_bulk():
+    user_id = get_jwt_identity()
+    body = await request.get_json(silent=True)
+    rows = body.get("rows") if isinstance(body, dict) else None
+    if not isinstance(rows, list) or not rows: return jsonify({"error":"rows must be a non-empty list"}), 400
+    if len(rows) > BULK_MAX_ROWS: return jsonify({"error":f"At most {BULK_MAX_ROWS} rows per request"}), 413
+    started = asyncio.get_running_loop().time()
+
+    docs, src, errors = sync_app.bulk_expenses(user_id, rows)
+    failed = set()
+    if docs:
+        try:
+            await db.expenses.insert_many(docs, ordered=False)
+        except BulkWriteError as bwe:
+            failed = sync_app.bulk_failures(bwe, src, errors)
+    ok = [(d, i) for j, (d, i) in enumerate(zip(docs, src)) if j not in failed]
+    written = [d for d, _ in ok]
+
+    new_bills, bill_src = sync_app.bulk_bills(ok, rows)
+
+    async def insert_bills():
+        try:
+            await db.bills.insert_many(new_bills, ordered=False)
+        except BulkWriteError as bwe:
+            return sync_app.bulk_failures(bwe, bill_src, errors, "bill not created: ")
+        return set()
+
+    bills_failed, *_ = await asyncio.gather(insert_bills() if new_bills else asyncio.sleep(0, set()),
+                                            apply_ops(sync_app.rollup_ops(written)), detect_patterns(written))
+    await invalidate_summary(user_id)
+
+    elapsed = asyncio.get_running_loop().time() - started
+    errors.sort(key=lambda x: x["row"])
+    return jsonify({"ok": not errors, "inserted": len(ok), "ids": [str(d["_id"]) for d in written], "bills_created": len(new_bills) - len(bills_failed),
+                    "errors": errors, "elapsed_ms": round(elapsed*1000, 1), "rows_per_sec": round(len(rows)/elapsed, 1) if elapsed else None})
+
+@app.patch("/expenses/<eid>")
+@jwt_required
+async def update_expense(eid):
+    user_id = get_jwt_identity()
+    data = await request.get_json()
+    try:
+        q = {"_id": ObjectId(eid), "user_id": user_id}
+    except Exception:
+        return jsonify({"error":"Invalid expense id"}), 400
+    try:
+        upd = sync_app.expense_update(data)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    old = await db.expenses.find_one_and_update(q, {"$set":upd}, return_document=ReturnDocument.BEFORE)
+    if not old: return jsonify({"error":"Expense not found"}), 404
+    await apply_ops(sync_app.rollup_ops([old], -1), sync_app.rollup_ops([{**old, **upd}]))
+    await invalidate_summary(user_id)
+    return jsonify({"ok":True})
+
+@app.delete("/expenses/<eid>")
+@jwt_required
+async def delete_expense(eid):
+    user_id = get_jwt_identity()
+    try:
+        old = await db.expenses.find_one_and_delete({"_id": ObjectId(eid), "user_id": user_id})
+    except Exception:
+        return jsonify({"error":"Invalid expense id"}), 400
+    if not old: return jsonify({"error":"Expense not found"}), 404
+    await apply_ops(sync_app.rollup_ops([old], -1))
+    await invalidate_summary(user_id)
+    return jsonify({"ok":True})
+
+# ---------------- Bills ----------------
+@app.get("/bills")
+@jwt_required
+async def list_bills():
+    user_id = get_jwt_identity()
+    items, summary = await asyncio.gather(db.bills.find(sync_app.bills_query(user_id, request.args)).sort("next_due", ASCENDING).to_list(None),
+                                          db.bills.aggregate(sync_app.bills_summary_pipeline(user_id)).to_list(1))
+    return jsonify(sync_app.bills_page(items, summary[0] if summary else {}))
+
+@app.patch("/bills/<bid>")
+@jwt_required
+async def update_bill(bid):
+    user_id = get_jwt_identity()
+    data = await request.get_json()
+    try:
+        q = {"_id": ObjectId(bid), "user_id": user_id}
+    except Exception:
+        return jsonify({"error":"Invalid bill id"}), 400
+    upd = {k:v for k,v in data.items() if k in ["name","amt","category","cadence","next_due","status","notes"]}
+    if not upd: return jsonify({"error":"No fields to update"}), 400
+    if "name" in upd: upd["name_lower"] = sync_app.name_key(upd["name"])
+    await db.bills.update_one(q, {"$set":upd})
+    await invalidate_summary(user_id)
+    return jsonify({"ok":True})
+
+@app.delete("/bills/<bid>")
+@jwt_required
+async def delete_bill(bid):
+    try:
+        await db.bills.delete_one({"_id": ObjectId(bid)})
+        await invalidate_summary(get_jwt_identity())
+        return jsonify({"ok":True})
+    except Exception:
+        return jsonify({"error":"Invalid bill id"}), 400
+
+# ---------------- Forecasting ----------------
+@app.get("/ml/next7_burnrate")
+@jwt_required
+async def ml_next7():
+    # precomputed document if forecast_job.py has run today; otherwise the forecast inputs are read together
+    user_id = get_jwt_identity()
+    today = day_start(now())
+    pre = await db.forecast_groundtruth.find_one(*sync_app.precomputed_read(user_id, today))
+    if pre:
+        return jsonify(sync_app.next7_payload(pre, pre.get("avg_last7", 0.0), "precomputed"))
+    r = sync_app.forecast_reads(user_id, today, 7)
+    history, bill_docs, last7 = await asyncio.gather(
+        db.perday.find(*r["history"]).to_list(None),
+        db.bills.find(*r["bills"]).to_list(None),
+        db.perday.find(*r["last7"]).sort("day", DESCENDING).limit(7).to_list(None))
+    fc = forecast_user(history, today, FORECAST_HISTORY_DAYS, 7, bill_events(bill_docs, today, 7), level=FORECAST_INTERVAL)
+    return jsonify(sync_app.next7_payload(fc, sync_app.avg_total(last7), "on_demand"))
+
+# ---------------- Cash flow ----------------
+@app.get("/cashflow")
+@jwt_required
+async def cashflow_simulation():
+    horizon = max(1, min(request.args.get("horizon", default=CASHFLOW_HORIZON, type=int), CASHFLOW_MAX_HORIZON))
+    return jsonify(sync_app.cashflow_payload(await cashflow_snapshot(get_jwt_identity(), horizon), horizon))
+
+# ---------------- Spending patterns & insights ----------------
+@app.get("/flags")
+@jwt_required
+async def list_flags():
+    q, limit = sync_app.flags_query(get_jwt_identity(), request.args)
+    return jsonify(sync_app.flags_page(await db.flag_patterns.find(q, {"_id": 0}).sort("created_at", DESCENDING).limit(limit).to_list(None)))
+
+@app.get("/insights")
+@jwt_required
+async def list_insights():
+    try:
+        q, limit = sync_app.insights_query(get_jwt_identity(), request.args)
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    items = await db.insights.find(q, {"user_id": 0}).sort("rank", ASCENDING).limit(limit + 1).to_list(None)
+    return jsonify(sync_app.insights_page(items, limit))
+
+@app.get("/health")
+async def health():
+    with sync_app.cache_lock: stats = {**sync_app.cache_stats, "size": len(sync_app.summary_cache)}
+    return {"ok":True, "time": datetime.utcnow().isoformat(), "dashboard_cache": stats}
+
+if __name__ == "__main__":
+    app.run(host=os.getenv("APP_HOST","0.0.0.0"), port=int(os.getenv("ASGI_PORT","5001")), debug=os.getenv("APP_DEBUG","true")=="true")
@@ -0,0 +1,215 @@
+# backend/backtest.py
+"""Forecast backtesting and timing harness.
+
+    python backtest.py --user <id> [--user <id> ...]       # rolling-origin replay of perday history
+    python backtest.py --sample 200 --lengths 28,91,364     # same, over a sample of users
+    python backtest.py --stored                             # score forecast_job.py output against realized spend
+
+Replay mode cuts each user's daily spend history at every `--step`-th day (the rolling origin). It
+forecasts the next `--horizon` days from the `length` days before each cut and compares the result
+with what was actually spent. All origins for a history length are stacked into one matrix, so each
+model runs once per length (and starting weekday). Models:
+  moving_average   the old /ml/next7_burnrate baseline (mean of the last 7 days with spend)
+  calendar_last7   huping's predict_next7_burn (mean of spending days in the last 7 calendar days)
+  ses_dow          forecast.py; bill occurrences in the horizon are known, as they are in production, but only
+                   for bills that existed at the origin (created_at), projected from their cadence
+For every (model, history length) it reports:
+  mae          mean absolute error per day
+  mape         mean absolute % error of the horizon total (origins with zero realized spend skipped)
+  ms           wall time of the forecast call
+  peak_kib     peak Python memory during the call (tracemalloc)
+Stored mode fills `actual` on forecast_groundtruth documents whose horizon has fully elapsed, then
+reports the same error metrics per model.
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import MongoClient, UpdateOne
+
+from forecast import bill_spikes, forecast
+from recurrence import expand
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "smartspend")
+
+
+def moving_average(total, recurring, first_weekday, horizon, spikes):
+    """The original /ml/next7_burnrate baseline: flat mean of the last 7 days with any spend."""
+    out = np.zeros((total.shape[0], horizon))
+    for i, row in enumerate(total):
+        active = row[row > 0][-7:]
+        out[i] = active.mean() if active.size else 0.0
+    return out
+
+
+def calendar_last7(total, recurring, first_weekday, horizon, spikes):
+    """huping's predict_next7_burn: flat mean of the spending days within the last 7 calendar days."""
+    window = total[:, -7:]
+    active = (window > 0).sum(axis=1)
+    avg = np.where(active > 0, window.sum(axis=1) / np.maximum(active, 1), 0.0)
+    return np.repeat(avg[:, None], horizon, axis=1)
+
+
+def ses_dow(total, recurring, first_weekday, horizon, spikes):
+    return forecast(total - recurring, horizon, first_weekday, spikes=spikes)["mean"]
+
+
+MODELS = {"moving_average": moving_average, "calendar_last7": calendar_last7, "ses_dow": ses_dow}
+
+
+def load_series(db, user_id):
+    """Full daily (total, recurring) arrays for a user plus the date of index 0."""
+    docs = list(db.perday.find({"user_id": user_id, "count": {"$gt": 0}}, {"_id": 0, "day": 1, "total": 1, "recurring": 1}).sort("day", 1))
+    if not docs:
+        return None, None, None
+    start = docs[0]["day"]
+    days = (docs[-1]["day"] - start).days + 1
+    total, recurring = np.zeros(days), np.zeros(days)
+    for d in docs:
+        i = (d["day"] - start).days
+        total[i], recurring[i] = float(d.get("total", 0)), float(d.get("recurring", 0))
+    return start, total, recurring
+
+
+def load_bills(db, user_id):
+    """The user's active bills with what is needed to replay their schedule."""
+    return list(db.bills.find({"user_id": user_id, "status": "active"},
+                              {"_id": 0, "amt": 1, "cadence": 1, "next_due": 1, "anchor_day": 1, "created_at": 1}))
+
+
+def known_spikes(bills, origin, horizon):
+    """Length-`horizon` bill amounts from `origin`, using only the bills that had been created by the origin."""
+    known = [b for b in bills if b.get("created_at") is None or b["created_at"] <= origin]
+    docs, rows, dates = expand(known, origin, origin + timedelta(days=horizon), past=True)
+    events = [(datetime.fromisoformat(str(d)), float(docs[r].get("amt", 0))) for r, d in zip(rows.tolist(), dates)]
+    return bill_spikes(events, origin, horizon)
+
+
+def origins_matrix(total, recurring, start, length, horizon, step, bills=()):
+    """Stack every rolling origin into (total, recurring, spikes, actual, first_weekday) arrays.
+    `start` is the midnight datetime of index 0. Spikes come from the bill schedule as it stood at each origin;
+    the realized recurring spend after the origin is never used."""
+    cuts = list(range(length, len(total) - horizon + 1, step))
+    if not cuts:
+        return None
+    hist = np.stack([total[c - length:c] for c in cuts])
+    rec = np.stack([recurring[c - length:c] for c in cuts])
+    spikes = np.stack([known_spikes(bills, start + timedelta(days=c), horizon) for c in cuts])
+    actual = np.stack([total[c:c + horizon] for c in cuts])
+    weekdays = np.array([(start + timedelta(days=c - length)).weekday() for c in cuts])
+    return hist, rec, spikes, actual, weekdays
+
+
+def score(pred, actual):
+    mae = float(np.abs(pred - actual).mean())
+    tot_p, tot_a = pred.sum(axis=1), actual.sum(axis=1)
+    ok = tot_a > 0
+    mape = float((np.abs(tot_p[ok] - tot_a[ok]) / tot_a[ok]).mean() * 100) if ok.any() else None
+    return mae, mape
+
+
+def timed(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    ms = (time.perf_counter() - t0) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, ms, peak / 1024
+
+
+def replay(db, user_ids, lengths, horizon, step, models):
+    results = []
+    for length in lengths:
+        blocks = [origins_matrix(t, r, s, length, horizon, step, load_bills(db, uid))
+                  for uid, (s, t, r) in ((uid, load_series(db, uid)) for uid in user_ids) if t is not None]
+        blocks = [b for b in blocks if b is not None]
+        if not blocks:
+            continue
+        # group by weekday of the first history day so each model call gets a single phase
+        hist, rec, spikes, actual, weekdays = (np.concatenate(x) for x in zip(*blocks))
+        for name in models:
+            preds, ms, peak = np.zeros_like(actual), 0.0, 0.0
+            for wd in np.unique(weekdays):
+                sel = weekdays == wd
+                p, t, m = timed(MODELS[name], hist[sel], rec[sel], int(wd), horizon, spikes[sel])
+                preds[sel], ms, peak = p, ms + t, max(peak, m)
+            mae, mape = score(preds, actual)
+            results.append({"model": name, "history_days": length, "origins": int(actual.shape[0]), "horizon": horizon,
+                            "mae": round(mae, 2), "mape": None if mape is None else round(mape, 1),
+                            "ms": round(ms, 2), "peak_kib": round(peak, 1)})
+    return results
+
+
+def score_stored(db, since=None):
+    """Fill `actual` on elapsed forecast_groundtruth docs, then score each model against it."""
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    q = {"actual": {"$exists": False}}
+    if since:
+        q["as_of"] = {"$gte": since}
+    ops = []
+    for f in db.forecast_groundtruth.find(q, {"user_id": 1, "as_of": 1, "horizon": 1}):
+        end = f["as_of"] + timedelta(days=f["horizon"])
+        if end > today:
+            continue
+        actual = np.zeros(f["horizon"])
+        for d in db.perday.find({"user_id": f["user_id"], "day": {"$gte": f["as_of"], "$lt": end}}, {"_id": 0, "day": 1, "total": 1}):
+            actual[(d["day"] - f["as_of"]).days] += float(d.get("total", 0))
+        ops.append(UpdateOne({"_id": f["_id"]}, {"$set": {"actual": actual.round(2).tolist()}}))
+        if len(ops) >= 1000:
+            db.forecast_groundtruth.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        db.forecast_groundtruth.bulk_write(ops, ordered=False)
+
+    scored = {"actual": {"$exists": True}}
+    if since:
+        scored["as_of"] = {"$gte": since}
+    by_model = {}
+    for f in db.forecast_groundtruth.find(scored, {"_id": 0, "model": 1, "mean": 1, "actual": 1}):
+        by_model.setdefault(f.get("model", "?"), []).append((f["mean"], f["actual"]))
+    results = []
+    for name, rows in by_model.items():
+        h = min(min(len(p), len(a)) for p, a in rows)
+        mae, mape = score(np.array([p[:h] for p, _ in rows]), np.array([a[:h] for _, a in rows]))
+        results.append({"model": name, "forecasts": len(rows), "horizon": h, "mae": round(mae, 2),
+                        "mape": None if mape is None else round(mape, 1)})
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Backtest spend forecasts: accuracy (MAE/MAPE) and cost (time/memory).")
+    ap.add_argument("--user", action="append", default=[], help="user id to replay (repeatable)")
+    ap.add_argument("--sample", type=int, default=0, help="replay this many users from the ledger")
+    ap.add_argument("--lengths", default="28,91,364", help="history lengths in days")
+    ap.add_argument("--horizon", type=int, default=7)
+    ap.add_argument("--step", type=int, default=7, help="days between rolling origins")
+    ap.add_argument("--models", default=",".join(MODELS))
+    ap.add_argument("--stored", action="store_true", help="score forecast_groundtruth instead of replaying")
+    ap.add_argument("--since", type=lambda s: datetime.fromisoformat(s), help="with --stored: only forecasts made since this date")
+    ap.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = ap.parse_args(argv)
+
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    if args.stored:
+        results = score_stored(db, args.since)
+    else:
+        users = list(args.user)
+        if args.sample:
+            users += [l["user_id"] for l in db.current_balance.aggregate([{"$sample": {"size": args.sample}}, {"$project": {"user_id": 1}}])]
+        if not users:
+            ap.error("pass --user, --sample or --stored")
+        models = [m for m in args.models.split(",") if m in MODELS]
+        lengths = [int(x) for x in args.lengths.split(",")]
+        results = replay(db, users, lengths, args.horizon, args.step, models)
+    for row in results:
+        print(json.dumps(row) if args.json else "  ".join(f"{k}={v}" for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# backend/benchmark.py
+"""Latency and throughput of the Flask app (app.py) vs the ASGI variant (asgi_app.py).
+
+Run both servers against the same local mongod and database. Turn off the summary cache so every
+dashboard request reaches Mongo:
+
+    export DB_NAME=smartspend_bench DASHBOARD_CACHE_TTL=0 APP_DEBUG=false
+    gunicorn -w 4 --threads 8 -b 127.0.0.1:5000 app:app
+    hypercorn -w 4 -b 127.0.0.1:5001 asgi_app:app
+
+    python benchmark.py --seed 50               # 50 users, 90 days of expenses, recurring bills, a pay schedule
+    python benchmark.py --requests 5000 --concurrency 64 [--path /dashboard/summary] [--json]
+
+Users are created directly in `users` (already verified). Everything else goes through the Flask API, so the
+rollups are real. Each target logs in through its own /auth/login. The benchmark then sends --requests GETs per
+path, --concurrency at a time, round-robin over the users, after a 10% warm-up. It reports p50/p99/mean latency,
+requests per second and non-200 responses. Before timing, it checks that both apps return the same JSON shape.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+from passlib.hash import bcrypt
+from pymongo import MongoClient
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "smartspend")
+PASSWORD = "bench-pass-1"
+DEFAULT_PATHS = ["/dashboard/summary", "/transactions?limit=50", "/bills", "/cashflow", "/ml/next7_burnrate"]
+CATEGORIES = ["need", "wants", "guilts"]
+MOODS = ["happy", "neutral", "sad", "stressed", "impulse"]
+BILLS = [("Rent", 900.0, "monthly"), ("Phone", 45.0, "monthly"), ("Gym", 15.0, "weekly")]
+
+
+def email_of(i):
+    return f"bench{i}@example.com"
+
+
+async def login(client, n):
+    tokens = []
+    for i in range(n):
+        r = await client.post("/auth/login", json={"email": email_of(i), "password": PASSWORD})
+        r.raise_for_status()
+        tokens.append(r.json()["token"])
+    return tokens
+
+
+def seed(base, users, days=90):
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    hashed, rnd, today = bcrypt.hash(PASSWORD), random.Random(7), datetime.utcnow().date()
+    with httpx.Client(base_url=base, timeout=60) as c:
+        for i in range(users):
+            if db.users.find_one({"email": email_of(i)}):
+                continue
+            db.users.insert_one({"name": f"Bench {i}", "email": email_of(i), "password": hashed, "verified": True,
+                                 "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()})
+            auth = {"Authorization": "Bearer " + c.post("/auth/login", json={"email": email_of(i), "password": PASSWORD}).json()["token"]}
+            c.post("/income", headers=auth, json={"amt": 3200.0, "pay_frequency": "monthly", "monthly_date": 1}).raise_for_status()
+            rows = [{"amt": round(rnd.uniform(3, 80), 2), "category": rnd.choice(CATEGORIES), "mood": rnd.choice(MOODS),
+                     "merchant": f"m{rnd.randrange(40)}", "date": (today - timedelta(days=d)).isoformat()}
+                    for d in range(days, 0, -1) for _ in range(rnd.randint(0, 4))]
+            rows += [{"amt": amt, "category": "need", "need_recurrence": True, "bill_name": name, "cadence": cadence,
+                      "date": (today - timedelta(days=rnd.randint(1, 25))).isoformat()} for name, amt, cadence in BILLS]
+            c.post("/expenses/bulk", headers=auth, json={"rows": rows}).raise_for_status()
+    print(f"[BENCH] {users} users seeded in {DB_NAME}")
+
+
+def shape(v):
+    if isinstance(v, dict):
+        return {k: shape(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [shape(v[0])] if v else []
+    return "number" if isinstance(v, (int, float)) and not isinstance(v, bool) else type(v).__name__
+
+
+async def check_contract(clients, tokens, paths):
+    mismatched = []
+    for path in paths:
+        shapes = []
+        for name, c in clients.items():
+            r = await c.get(path, headers={"Authorization": f"Bearer {tokens[name][0]}"})
+            shapes.append((r.status_code, shape(r.json())))
+        if shapes[0] != shapes[1]:
+            mismatched.append(path)
+            print(f"[BENCH] response shape differs on {path}: {shapes}")
+    return mismatched
+
+
+async def load(client, tokens, path, requests, concurrency):
+    latencies, errors = [], 0
+    todo = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in todo:
+            t0 = time.perf_counter()
+            r = await client.get(path, headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+            latencies.append(time.perf_counter() - t0)
+            errors += r.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 2), "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "mean_ms": round(float(ms.mean()), 2), "rps": round(requests / wall, 1), "errors": errors}
+
+
+async def bench(targets, users, paths, requests, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    clients = {name: httpx.AsyncClient(base_url=url, timeout=60, limits=limits) for name, url in targets.items()}
+    try:
+        tokens = {name: await login(c, users) for name, c in clients.items()}
+        results = {"mismatched": await check_contract(clients, tokens, paths), "paths": {}}
+        for path in paths:
+            for name, c in clients.items():
+                await load(c, tokens[name], path, max(requests // 10, concurrency), concurrency)  # warm-up
+                results["paths"].setdefault(path, {})[name] = await load(c, tokens[name], path, requests, concurrency)
+        return results
+    finally:
+        for c in clients.values():
+            await c.aclose()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare p50/p99 latency and RPS of app.py (Flask) and asgi_app.py.")
+    ap.add_argument("--flask", default="http://127.0.0.1:5000", help="base URL of the Flask server")
+    ap.add_argument("--asgi", default="http://127.0.0.1:5001", help="base URL of the ASGI server")
+    ap.add_argument("--seed", type=int, metavar="USERS", help="create this many bench users through the Flask server and exit")
+    ap.add_argument("--users", type=int, default=20, help="bench users to spread requests over")
+    ap.add_argument("--path", action="append", help="GET path to time (repeatable; default: the read endpoints)")
+    ap.add_argument("--requests", type=int, default=2000, help="timed requests per path and server")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = ap.parse_args(argv)
+
+    if args.seed:
+        return seed(args.flask, args.seed)
+    results = asyncio.run(bench({"flask": args.flask, "asgi": args.asgi}, args.users, args.path or DEFAULT_PATHS,
+                                args.requests, args.concurrency))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'path':28} {'server':6} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'req/s':>8} {'errors':>6}")
+    for path, by_server in results["paths"].items():
+        for name, r in by_server.items():
+            print(f"{path:28} {name:6} {r['p50_ms']:8.2f} {r['p99_ms']:8.2f} {r['mean_ms']:8.2f} {r['rps']:8.1f} {r['errors']:6d}")
+
+
+if __name__ == "__main__":
+    main()
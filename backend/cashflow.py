@@ -0,0 +1,124 @@
+# backend/cashflow.py
+"""Day-by-day cash-flow simulation.
+
+    balance[t] = balance_now + cumsum(paydays - bills - spend)[t]       (end of day t; t = 0 is today)
+
+- paydays: the user's pay schedule, from their latest income document with a recurring pay_frequency.
+    weekly    weekly_days, e.g. ["Mon", "Thu"] or [0, 3] (default: weekday of created_at)
+    biweekly  anchor_biweekly, any past or future payday as an ISO date (default: created_at)
+    monthly   monthly_date, a day of month 1-31, clamped to short months (default: day of created_at)
+  Each payday brings that document's `amt`. Today's pay is assumed to be in the balance already,
+  so paydays start tomorrow.
+- bills: every occurrence of the active bills, from recurrence.expand (unpaid bills due today count). A bill
+  whose next_due has already passed is still owed and is charged once today.
+- spend: forecast discretionary spend (forecast.py, with bills excluded because they are counted above).
+
+All three are (horizon,) or (users, horizon) arrays, so one call also simulates many users.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from recurrence import expand
+
+PAY_FREQUENCIES = ("weekly", "biweekly", "monthly")
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def _weekdays(value, fallback):
+    if isinstance(value, str):
+        value = [v for v in value.replace(";", ",").split(",") if v.strip()]
+    out = []
+    for v in value or []:
+        if isinstance(v, int) or str(v).strip().isdigit():
+            out.append(int(v) % 7)
+        elif str(v).strip()[:3].lower() in WEEKDAYS:
+            out.append(WEEKDAYS.index(str(v).strip()[:3].lower()))
+    return sorted(set(out)) or [fallback]
+
+
+def _date(value, fallback):
+    try:
+        return datetime.fromisoformat(str(value)[:10]).date()
+    except (TypeError, ValueError):
+        return fallback
+
+
+def pay_schedule(income_doc, start):
+    """Pseudo-bills (next_due, cadence, anchor_day, amt) for recurrence.expand, one per pay stream."""
+    if not income_doc or income_doc.get("pay_frequency") not in PAY_FREQUENCIES:
+        return []
+    start = start.date() if isinstance(start, datetime) else start
+    created = income_doc.get("created_at")
+    created = created.date() if isinstance(created, datetime) else start
+    amt, freq = float(income_doc.get("amt") or 0), income_doc["pay_frequency"]
+    if freq == "weekly":
+        return [{"next_due": (start + timedelta(days=(w - start.weekday()) % 7)).isoformat(), "cadence": "weekly", "amt": amt}
+                for w in _weekdays(income_doc.get("weekly_days"), created.weekday())]
+    if freq == "biweekly":
+        anchor = _date(income_doc.get("anchor_biweekly"), created)
+        if anchor > start:  # step back so paydays before the anchor are included
+            anchor -= timedelta(days=14 * -(-(anchor - start).days // 14))
+        return [{"next_due": anchor.isoformat(), "cadence": "biweekly", "amt": amt}]
+    value = income_doc.get("monthly_date")
+    try:
+        day = _date(value, None).day if "-" in str(value) else int(value)
+    except (AttributeError, TypeError, ValueError):
+        day = created.day
+    day = min(max(day, 1), 31)
+    month_len = ((start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)).day
+    return [{"next_due": start.replace(day=min(day, month_len)).isoformat(), "cadence": "monthly", "anchor_day": day, "amt": amt}]
+
+
+def bill_matrix(docs, start, horizon, overdue=True):
+    """(len(docs), horizon) matrix of each bill-like doc's `amt` on every day it falls due from `start`.
+    Docs without a usable next_due get a row of zeros. With overdue=True a doc whose next_due is before
+    `start` is still owed: it is charged once on day 0, and its later cycles follow the cadence as usual."""
+    start = start.date() if isinstance(start, datetime) else start
+    docs = list(docs)
+    out = np.zeros((len(docs), horizon))
+    kept, rows, dates = expand(docs, start, start + timedelta(days=horizon))
+    if not kept or not horizon:
+        return out
+    pos = {id(d): i for i, d in enumerate(docs)}
+    idx = np.array([pos[id(d)] for d in kept], dtype=np.int64)
+    amts = np.array([float(d.get("amt") or 0) for d in kept])
+    np.add.at(out, (idx[rows], (dates - np.datetime64(start, "D")).astype(np.int64)), amts[rows])
+    if overdue:
+        late = np.array([_date(d.get("next_due"), start) < start for d in kept])
+        out[idx[late], 0] += amts[late]
+    return out
+
+
+def daily_amounts(docs, start, horizon, overdue=True):
+    """(horizon,) array of `amt` summed per day over every occurrence of the given bill-like docs (see bill_matrix)."""
+    return bill_matrix(docs, start, horizon, overdue).sum(axis=0)
+
+
+def payday_amounts(income_doc, start, horizon):
+    out = daily_amounts(pay_schedule(income_doc, start), start, horizon, overdue=False)
+    out[:1] = 0.0  # today's pay is already in the balance
+    return out
+
+
+def simulate(balance, paydays, bills, spend):
+    """
+    balance: scalar or (U,) current balance; paydays/bills/spend: (H,) or (U, H) daily flows.
+    returns {"balance", "first_negative", "min_balance", "min_day"}; first_negative is -1 when the
+    balance stays at or above zero for the whole horizon.
+    """
+    flows = np.asarray(paydays, dtype=float) - np.asarray(bills, dtype=float) - np.asarray(spend, dtype=float)
+    bal = np.asarray(balance, dtype=float)[..., None] + np.cumsum(flows, axis=-1)
+    neg = bal < 0
+    first = np.where(neg.any(axis=-1), neg.argmax(axis=-1), -1)
+    return {"balance": bal, "first_negative": first, "min_balance": bal.min(axis=-1), "min_day": bal.argmin(axis=-1)}
+
+
+def runway_days(sim):
+    """Days until the balance first goes negative; past the horizon, extrapolate at the average net outflow."""
+    bal, first = sim["balance"], sim["first_negative"]
+    horizon = bal.shape[-1]
+    net_out = (bal[..., 0] - bal[..., -1]) / max(horizon - 1, 1)
+    extra = np.where(net_out > 0, bal[..., -1] / np.where(net_out > 0, net_out, 1), 365.0)
+    out = np.where(first >= 0, first, np.minimum(horizon + extra, 365.0))
+    return np.where(bal[..., 0] < 0, 0.0, np.round(out, 2))
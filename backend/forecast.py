@@ -0,0 +1,97 @@
+# backend/forecast.py
+"""Daily spend forecasting on NumPy arrays.
+
+Every function takes a (users x days) matrix of daily spend, or a single 1-D series. The whole
+batch is handled with array ops, so one call forecasts many users. Model:
+
+    y_t = level + season[dow(t)] + bills_t + noise
+
+- season: additive day-of-week offsets, averaged over the last `season_weeks` whole weeks.
+- level: simple exponential smoothing of the deseasonalised series. The closed form
+  sum_k alpha * (1 - alpha)^k * y_(T-k) turns it into one matrix-vector product.
+- bills_t: known recurring-bill spikes taken from the bills schedule (see `bill_spikes`).
+- intervals: Gaussian. The h-step variance sigma^2 * (1 + (h - 1) * alpha^2) comes from the
+  in-sample residuals around the smoothed level.
+"""
+from datetime import timedelta
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_ALPHA = 0.3
+
+
+def daily_series(docs, start, days):
+    """Dense length-`days` arrays (total, recurring) from perday docs with native `day` dates."""
+    total = np.zeros(days)
+    recurring = np.zeros(days)
+    for d in docs:
+        i = (d["day"] - start).days
+        if 0 <= i < days:
+            total[i] += float(d.get("total", 0))
+            recurring[i] += float(d.get("recurring", 0))
+    return total, recurring
+
+
+def bill_spikes(bill_events, start, horizon):
+    """Length-`horizon` array with each (due_date, amount) event added on its day."""
+    out = np.zeros(horizon)
+    for due, amt in bill_events:
+        i = (due - start).days
+        if 0 <= i < horizon:
+            out[i] += float(amt)
+    return out
+
+
+def _smoothing_weights(days, alpha):
+    # weight of y_(T-k) in the SES level after `days` observations, oldest first, summing to 1
+    k = np.arange(days - 1, -1, -1)
+    w = alpha * (1 - alpha) ** k
+    w[0] += (1 - alpha) ** days  # initial level = first observation
+    return w
+
+
+def forecast(history, horizon=7, first_weekday=0, alpha=DEFAULT_ALPHA, season_weeks=8, spikes=None, level=0.8):
+    """
+    history: (U, D) or (D,) daily discretionary spend, oldest first; history[..., 0] falls on
+             `first_weekday` (Monday=0).
+    spikes:  optional (U, horizon) or (horizon,) recurring-bill amounts to add on their due days.
+    returns  {"mean", "lower", "upper"} arrays shaped (U, horizon), or (horizon,) for 1-D input.
+    """
+    y = np.atleast_2d(np.asarray(history, dtype=float))
+    users, days = y.shape
+    if days == 0:
+        y, days = np.zeros((users, 1)), 1
+
+    dow = (first_weekday + np.arange(days)) % 7
+    weeks = min(season_weeks, days // 7)
+    season = np.zeros((users, 7))
+    if weeks:
+        recent = y[:, days - weeks * 7:]
+        by_dow = recent.reshape(users, weeks, 7).mean(axis=1)           # columns follow dow of recent[:, 0]
+        by_dow -= by_dow.mean(axis=1, keepdims=True)
+        season[:, dow[days - weeks * 7:][:7]] = by_dow
+
+    deseason = y - season[:, dow]
+    lvl = deseason @ _smoothing_weights(days, alpha)
+    sigma = np.sqrt(np.mean((deseason - lvl[:, None]) ** 2, axis=1))
+
+    h = np.arange(horizon)
+    mean = lvl[:, None] + season[:, (first_weekday + days + h) % 7]
+    if spikes is not None:
+        mean = mean + np.atleast_2d(np.asarray(spikes, dtype=float))
+    mean = np.clip(mean, 0, None)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    band = z * sigma[:, None] * np.sqrt(1 + h * alpha ** 2)
+    out = {"mean": mean, "lower": np.clip(mean - band, 0, None), "upper": mean + band}
+    if np.ndim(history) == 1:
+        out = {k: v[0] for k, v in out.items()}
+    return out
+
+
+def forecast_user(docs, today, history_days=364, horizon=7, bill_events=(), **kw):
+    """Forecast one user from perday docs covering [today - history_days, today)."""
+    start = today - timedelta(days=history_days)
+    total, recurring = daily_series(docs, start, history_days)
+    spikes = bill_spikes(bill_events, today, horizon)
+    return forecast(total - recurring, horizon, start.weekday(), spikes=spikes, **kw)
@@ -0,0 +1,106 @@
+# backend/forecast_job.py
+"""Nightly batch forecast: writes every user's next-N-day spend forecast to forecast_groundtruth.
+
+    python forecast_job.py                      # all users, one worker per core
+    python forecast_job.py --workers 8 --horizon 30 --partition 500
+
+Users are split into partitions that run on a ProcessPoolExecutor. Each worker has its own
+MongoClient and does two reads per partition (perday window, bills), one batched forecast call
+and one unordered bulk upsert, so throughput grows close to linearly with cores.
+/ml/next7_burnrate serves these documents and forecasts on demand when today's is missing or
+has been marked stale by a write since the job ran. Runway comes from the cash-flow simulation
+(GET /cashflow), which also counts income.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import MongoClient, UpdateOne
+
+from forecast import daily_series, bill_spikes, forecast
+from recurrence import bill_events
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "smartspend")
+HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "364"))
+INTERVAL = 0.8
+MODEL = "ses_dow"
+
+_db = None
+
+
+def _init_worker():
+    global _db
+    _db = MongoClient(MONGO_URI)[DB_NAME]
+
+
+def run_partition(user_ids, today, horizon):
+    """Forecast one partition of users and bulk-upsert the results; returns the number of users written."""
+    start = today - timedelta(days=HISTORY_DAYS)
+    by_user = {uid: [] for uid in user_ids}
+    for d in _db.perday.find({"user_id": {"$in": user_ids}, "day": {"$gte": start, "$lt": today}},
+                             {"_id": 0, "user_id": 1, "day": 1, "total": 1, "recurring": 1}):
+        by_user[d["user_id"]].append(d)
+    bills_by_user = {uid: [] for uid in user_ids}
+    for b in _db.bills.find({"user_id": {"$in": user_ids}, "status": "active",
+                             "next_due": {"$lt": (today + timedelta(days=horizon)).date().isoformat()}},
+                            {"_id": 0, "user_id": 1, "amt": 1, "cadence": 1, "next_due": 1, "anchor_day": 1}):
+        bills_by_user[b["user_id"]].append(b)
+
+    history = np.zeros((len(user_ids), HISTORY_DAYS))
+    spikes = np.zeros((len(user_ids), horizon))
+    last7 = np.zeros(len(user_ids))
+    for i, uid in enumerate(user_ids):
+        total, recurring = daily_series(by_user[uid], start, HISTORY_DAYS)
+        history[i] = total - recurring
+        spikes[i] = bill_spikes(bill_events(bills_by_user[uid], today, horizon), today, horizon)
+        active = total[total > 0][-7:]
+        last7[i] = active.mean() if active.size else 0.0
+    fc = forecast(history, horizon, start.weekday(), spikes=spikes, level=INTERVAL)
+
+    stamp = datetime.utcnow()
+    ops = [UpdateOne({"user_id": uid, "as_of": today}, {"$set": {
+        "horizon": horizon, "model": MODEL, "interval": INTERVAL,
+        "mean": fc["mean"][i].round(2).tolist(), "lower": fc["lower"][i].round(2).tolist(), "upper": fc["upper"][i].round(2).tolist(),
+        "avg_last7": round(float(last7[i]), 2), "stale": False, "computed_at": stamp}}, upsert=True) for i, uid in enumerate(user_ids)]
+    if ops:
+        _db.forecast_groundtruth.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def partitions(db, size):
+    batch = []
+    for l in db.current_balance.find({}, {"_id": 0, "user_id": 1}).batch_size(size):
+        batch.append(l["user_id"])
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Precompute spend forecasts for every user.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--horizon", type=int, default=30)
+    ap.add_argument("--partition", type=int, default=500, help="users per worker task")
+    args = ap.parse_args(argv)
+
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    started = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(run_partition, part, today, args.horizon) for part in partitions(db, args.partition)]
+        for f in as_completed(futures):
+            done += f.result()
+    elapsed = time.perf_counter() - started
+    print(f"[FORECAST] {done} users in {elapsed:.1f}s with {args.workers} workers "
+          f"({done / elapsed if elapsed else 0:.0f} users/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# backend/insights.py
+"""Precomputes ranked insight documents per user into the insights collection.
+
+    python insights.py              # users whose rollups changed since the last run (schedule every few minutes)
+    python insights.py --full       # every user
+    python insights.py --user <id>
+
+Reads only the derived collections (the month cube, active bills, the balance ledger), never raw
+expenses. Rules:
+  mood:<mood>     spend per purchase in a mood vs the user's average over the last 3 months
+  drift:<cat>     this month's pace per category vs last month's total
+  bill_load       bills due in the next BILL_WINDOW_DAYS vs the current balance
+Each insight has an `amount` (money at stake per month) and a tone. Warnings rank above the rest,
+then larger amounts; `rank` starts at 1. GET /insights pages them with one (user_id, rank) index read.
+
+Incremental runs use a watermark in job_state. Only users with a month cube cell updated since
+then are refreshed. The first run of each day also refreshes users with active bills, since
+"due soon" changes with the date.
+"""
+import argparse
+import calendar
+import os
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, UpdateOne, DeleteMany
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "smartspend")
+INCOME_KEY = "income"          # app.INCOME_KEY: month cube cells holding income
+MOOD_MONTHS = 3
+MOOD_MIN_COUNT = 5
+MOOD_MIN_RATIO = 1.2
+DRIFT_MIN_DAY = 7              # don't project a month from its first few days
+DRIFT_MIN_BASE = 20.0
+DRIFT_MIN_CHANGE = 0.25
+BILL_WINDOW_DAYS = 14
+BILL_LOAD_SHARE = 0.5
+BATCH = 500
+
+
+def month_key(d, back=0):
+    y, m = divmod(d.year * 12 + d.month - 1 - back, 12)
+    return f"{y:04d}-{m + 1:02d}"
+
+
+def mood_insights(cells, today):
+    since = month_key(today, MOOD_MONTHS)
+    by_mood, total, count = {}, 0.0, 0
+    for c in cells:
+        if c["allele_frequency"] == INCOME_KEY or c["month"] < since or c.get("count", 0) <= 0:
+            continue
+        total += c["total"]; count += c["count"]
+        if c.get("mood"):
+            t, n = by_mood.get(c["mood"], (0.0, 0))
+            by_mood[c["mood"]] = (t + c["total"], n + c["count"])
+    if count < MOOD_MIN_COUNT * 2 or total <= 0:
+        return []
+    avg = total / count
+    out = []
+    for mood, (t, n) in by_mood.items():
+        ratio = (t / n) / avg if n else 0
+        if n < MOOD_MIN_COUNT or ratio < MOOD_MIN_RATIO:
+            continue
+        excess = (t - n * avg) / (MOOD_MONTHS + 1)
+        out.append({"code": f"mood:{mood}", "type": "mood", "tone": "warn" if mood in ("impulse", "stressed", "sad") else "info",
+                    "title": f"You spend {ratio:.1f}x more per purchase when {mood}",
+                    "desc": f"{n} {mood} purchases averaged {t / n:.2f} vs your usual {avg:.2f}.",
+                    "amount": round(excess, 2), "data": {"mood": mood, "ratio": round(ratio, 2), "count": n}})
+    return out
+
+
+def drift_insights(cells, today):
+    if today.day < DRIFT_MIN_DAY:
+        return []
+    cur_key, prev_key = month_key(today), month_key(today, 1)
+    cur, prev = {}, {}
+    for c in cells:
+        cat = c["allele_frequency"]
+        if cat == INCOME_KEY or cat is None:
+            continue
+        target = cur if c["month"] == cur_key else prev if c["month"] == prev_key else None
+        if target is not None:
+            target[cat] = target.get(cat, 0.0) + c["total"]
+    scale = calendar.monthrange(today.year, today.month)[1] / today.day
+    out = []
+    for cat, base in prev.items():
+        if base < DRIFT_MIN_BASE:
+            continue
+        pace = cur.get(cat, 0.0) * scale
+        change = (pace - base) / base
+        if abs(change) < DRIFT_MIN_CHANGE:
+            continue
+        up = change > 0
+        out.append({"code": f"drift:{cat}", "type": "spending", "tone": "warn" if up else "success",
+                    "title": f"{cat.capitalize()} spending is on pace to be {abs(change):.0%} {'higher' if up else 'lower'} than last month",
+                    "desc": f"{pace:.2f} projected vs {base:.2f} last month.",
+                    "amount": round(abs(pace - base), 2),
+                    "data": {"category": cat, "projected": round(pace, 2), "previous": round(base, 2), "change": round(change, 3)}})
+    return out
+
+
+def bill_insights(bill_docs, balance, today):
+    due = [b for b in bill_docs if b.get("next_due") and b["next_due"] <= (today + timedelta(days=BILL_WINDOW_DAYS)).date().isoformat()]
+    amount = sum(float(b.get("amt", 0)) for b in due)
+    if not due or amount <= 0 or amount < BILL_LOAD_SHARE * max(balance, 0.0):
+        return []
+    over = amount > balance
+    return [{"code": "bill_load", "type": "bills", "tone": "warn",
+             "title": (f"Bills due in the next {BILL_WINDOW_DAYS} days exceed your balance" if over
+                       else f"Bills due soon take {amount / balance:.0%} of your balance"),
+             "desc": f"{len(due)} bills totalling {amount:.2f} vs a balance of {balance:.2f}.",
+             "amount": round(amount - balance if over else amount, 2),
+             "data": {"bills": len(due), "due_total": round(amount, 2), "balance": round(balance, 2),
+                      "next_due": min(b["next_due"] for b in due)}}]
+
+
+def rank(items):
+    items.sort(key=lambda i: (i["tone"] != "warn", -i["amount"]))
+    for n, i in enumerate(items, start=1):
+        i["rank"] = n
+    return items
+
+
+def refresh_users(db, user_ids, today):
+    """Recompute and store the insights of `user_ids`; returns the number of insight docs written."""
+    cells, bill_docs = {u: [] for u in user_ids}, {u: [] for u in user_ids}
+    for c in db.month.find({"user_id": {"$in": user_ids}, "month": {"$gte": month_key(today, MOOD_MONTHS)}}, {"_id": 0, "updated_at": 0}):
+        cells[c["user_id"]].append(c)
+    for b in db.bills.find({"user_id": {"$in": user_ids}, "status": "active",
+                            "next_due": {"$lte": (today + timedelta(days=BILL_WINDOW_DAYS)).date().isoformat()}},
+                           {"_id": 0, "user_id": 1, "amt": 1, "next_due": 1}):
+        bill_docs[b["user_id"]].append(b)
+    balances = {l["user_id"]: l.get("income_total", 0.0) - l.get("expense_total", 0.0)
+                for l in db.current_balance.find({"user_id": {"$in": user_ids}}, {"_id": 0})}
+
+    stamp, ops, written = datetime.utcnow(), [], 0
+    for uid in user_ids:
+        items = rank(mood_insights(cells[uid], today) + drift_insights(cells[uid], today)
+                     + bill_insights(bill_docs[uid], balances.get(uid, 0.0), today))
+        ops.append(DeleteMany({"user_id": uid, "code": {"$nin": [i["code"] for i in items]}}))
+        ops += [UpdateOne({"user_id": uid, "code": i["code"]}, {"$set": {**i, "computed_at": stamp}}, upsert=True) for i in items]
+        written += len(items)
+    if ops:
+        db.insights.bulk_write(ops, ordered=False)
+    return written
+
+
+def dirty_users(db, since, today):
+    if since is None:
+        return db.current_balance.distinct("user_id")
+    # $gte: stored datetimes are truncated to the millisecond, so a write in the watermark's millisecond
+    # compares equal to it; refreshing that user once more is harmless, skipping it is not
+    uids = set(db.month.distinct("user_id", {"updated_at": {"$gte": since}}))
+    if since < today:
+        uids |= set(db.bills.distinct("user_id", {"status": "active"}))
+    return sorted(uids)
+
+
+def run(db, full=False, user_id=None):
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    started = datetime.utcnow()  # taken before reading so writes during the run are picked up next time
+    state = db.job_state.find_one({"_id": "insights"}) or {}
+    if user_id:
+        uids = [user_id]
+    else:
+        uids = dirty_users(db, None if full else state.get("watermark"), today)
+    written = 0
+    for i in range(0, len(uids), BATCH):
+        written += refresh_users(db, uids[i:i + BATCH], today)
+    if not user_id:
+        db.job_state.update_one({"_id": "insights"}, {"$set": {"watermark": started, "users": len(uids)}}, upsert=True)
+    return len(uids), written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Refresh precomputed insights from the rollups.")
+    ap.add_argument("--full", action="store_true", help="ignore the watermark and refresh every user")
+    ap.add_argument("--user", help="refresh a single user")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    users, written = run(MongoClient(MONGO_URI)[DB_NAME], args.full, args.user)
+    print(f"[INSIGHTS] {written} insights for {users} users in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# backend/patterns.py
+"""Streaming spending-pattern detector.
+
+Each new expense updates a small per-user state document (pattern_state) and may raise flags
+(flag_patterns). The state has a fixed size, so the cost per expense does not grow with history:
+
+- spike:          per category, an exponentially weighted mean and variance of the amount. An expense
+                  above mean + SPIKE_Z * sd (and at least SPIKE_RATIO x the mean) is a spike. One flag per expense.
+- late_night:     a late-night count (22:00-05:00) that halves every LATE_HALF_LIFE_DAYS. Reaching
+                  LATE_NIGHT_THRESHOLD flags a habit. One flag per ISO week.
+- impulse_streak: consecutive expenses logged with mood "impulse". IMPULSE_STREAK in a row flags
+                  the streak. One flag per streak; its level tracks the streak length.
+
+Flags are keyed (user_id, type, key) under a unique index and written with $setOnInsert, so
+replays and retries never duplicate them. State documents carry a `version`: a state is only
+replaced if the stored version is still the one that was read, and a user whose state changed in
+between (another request for the same user) is re-read and re-run, up to STATE_RETRIES times.
+"""
+import math
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+EWMA_ALPHA = 0.2
+SPIKE_MIN_OBS = 5
+SPIKE_Z = 3.0
+SPIKE_RATIO = 1.5
+LATE_HALF_LIFE_DAYS = 7
+LATE_NIGHT_THRESHOLD = 3.0
+IMPULSE_STREAK = 3
+IMPULSE_MOOD = "impulse"
+SKIP_CATEGORIES = {"need_recurrence"}  # bill payments are expected to be lumpy
+STATE_RETRIES = 5
+DUPLICATE_KEY = 11000
+
+
+def expense_time(e):
+    """Timestamp of an expense: its date plus the HH:MM `time` field, else created_at."""
+    day = e.get("date")
+    if isinstance(day, datetime):
+        try:
+            hh, mm = (int(x) for x in str(e.get("time", "")).split(":")[:2])
+            return day.replace(hour=hh, minute=mm)
+        except ValueError:
+            pass
+    return e.get("created_at") or datetime.utcnow()
+
+
+def is_late(ts):
+    return ts.hour >= 22 or ts.hour < 5
+
+
+def new_state(user_id):
+    return {"user_id": user_id, "cats": {}, "late": {"score": 0.0, "at": None}, "impulse": {"streak": 0, "start": None}}
+
+
+def _flag(e, type_, key, level, **extra):
+    return {"user_id": e["user_id"], "type": type_, "key": key, "level": round(level, 2),
+            "expense_id": str(e.get("_id", "")), "day": e.get("date"), **extra}
+
+
+def observe(state, e):
+    """Fold one expense into `state` (mutated in place); returns the flags it raises."""
+    out = []
+    ts = expense_time(e)
+    amt = float(e.get("amt", 0))
+
+    cat = e.get("allele_frequency") or "uncategorized"
+    if cat not in SKIP_CATEGORIES and amt > 0:
+        s = state["cats"].setdefault(cat, {"n": 0, "mean": 0.0, "var": 0.0})
+        sd = math.sqrt(s["var"])
+        if s["n"] >= SPIKE_MIN_OBS and amt > s["mean"] + SPIKE_Z * sd and amt >= SPIKE_RATIO * s["mean"]:
+            out.append(_flag(e, "spike", str(e.get("_id", ts.isoformat())), amt / s["mean"] if s["mean"] else 0.0,
+                             category=cat, amt=amt, expected=round(s["mean"], 2),
+                             message=f"{cat} spend of {amt:.2f} is {amt / s['mean']:.1f}x your usual {s['mean']:.2f}"))
+        # West's incremental EWMA: variance update uses the pre-update deviation
+        if s["n"] == 0:
+            s["mean"] = amt
+        else:
+            diff = amt - s["mean"]
+            s["mean"] += EWMA_ALPHA * diff
+            s["var"] = (1 - EWMA_ALPHA) * (s["var"] + EWMA_ALPHA * diff * diff)
+        s["n"] += 1
+
+    if is_late(ts):
+        late = state["late"]
+        if late["at"] is None:
+            late["score"], late["at"] = 1.0, ts
+        elif ts >= late["at"]:
+            late["score"] = late["score"] * 0.5 ** ((ts - late["at"]) / timedelta(days=LATE_HALF_LIFE_DAYS)) + 1
+            late["at"] = ts
+        else:  # backdated: decay the new event to the state's time instead
+            late["score"] += 0.5 ** ((late["at"] - ts) / timedelta(days=LATE_HALF_LIFE_DAYS))
+        if late["score"] >= LATE_NIGHT_THRESHOLD:
+            year, week, _ = late["at"].isocalendar()
+            out.append(_flag(e, "late_night", f"{year}-W{week:02d}", late["score"],
+                             message=f"Late-night spending is becoming a habit (~{late['score']:.0f} purchases this week)"))
+
+    imp = state["impulse"]
+    if e.get("mood") == IMPULSE_MOOD:
+        imp["streak"] += 1
+        if imp["streak"] == 1:
+            imp["start"] = str(e.get("_id", ts.isoformat()))
+        if imp["streak"] >= IMPULSE_STREAK:
+            out.append(_flag(e, "impulse_streak", imp["start"], imp["streak"],
+                             message=f"{imp['streak']} impulse purchases in a row"))
+    else:
+        imp["streak"], imp["start"] = 0, None
+    return out
+
+
+def by_user(docs):
+    out = {}
+    for e in docs:
+        out.setdefault(e["user_id"], []).append(e)
+    return out
+
+
+def detect_ops(states, docs):
+    """Advance the loaded `states` (user_id -> state) with `docs`.
+
+    Returns (user ids, state ops, flags per user id); the i-th state op belongs to the i-th user. A
+    state op only matches if the stored version is still the loaded one; otherwise its upsert hits
+    the unique user_id index and fails with a duplicate key error (see `lost_races`).
+    """
+    found, stamp = {}, datetime.utcnow()
+    for uid, batch in by_user(docs).items():
+        state = states.setdefault(uid, new_state(uid))
+        found[uid] = []
+        for e in sorted(batch, key=expense_time):
+            found[uid].extend(observe(state, e))
+        state["updated_at"] = stamp
+    uids = list(found)
+    state_ops = []
+    for uid in uids:
+        version = states[uid].get("version")
+        states[uid]["version"] = (version or 0) + 1
+        state_ops.append(ReplaceOne({"user_id": uid, "version": version}, states[uid], upsert=True))
+    return uids, state_ops, found
+
+
+def flag_ops(flags):
+    # the same key can fire repeatedly within a batch (a growing streak); the highest level wins
+    stamp = datetime.utcnow()
+    return [UpdateOne({"user_id": f["user_id"], "type": f["type"], "key": f["key"]},
+                      {"$setOnInsert": {k: v for k, v in f.items() if k != "level"} | {"created_at": stamp},
+                       "$max": {"level": f["level"]}}, upsert=True) for f in flags]
+
+
+def lost_races(bwe):
+    """Indexes of the state ops in a BulkWriteError that lost to a concurrent update; re-raises anything else."""
+    errors = bwe.details.get("writeErrors", [])
+    if any(w.get("code") != DUPLICATE_KEY for w in errors):
+        raise bwe
+    return {w["index"] for w in errors}
+
+
+def settle(pending, uids, found, lost, flags):
+    """Move the users whose state was written from `pending` to `flags`."""
+    for i, uid in enumerate(uids):
+        if i not in lost:
+            flags.extend(found[uid])
+            del pending[uid]
+
+
+def detect(state_coll, flag_coll, docs):
+    """Run `observe` over newly inserted expense docs, persisting state and flags; returns the flags."""
+    pending, flags = by_user(docs), []
+    for attempt in range(STATE_RETRIES):
+        if not pending:
+            break
+        states = {s["user_id"]: s for s in state_coll.find({"user_id": {"$in": list(pending)}}, {"_id": 0})}
+        uids, state_ops, found = detect_ops(states, [e for batch in pending.values() for e in batch])
+        try:
+            state_coll.bulk_write(state_ops, ordered=False)
+            lost = set()
+        except BulkWriteError as bwe:
+            lost = lost_races(bwe)
+            if attempt == STATE_RETRIES - 1:
+                raise
+        settle(pending, uids, found, lost, flags)
+    if flags:
+        flag_coll.bulk_write(flag_ops(flags), ordered=False)
+    return flags
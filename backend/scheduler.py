@@ -0,0 +1,247 @@
+# backend/scheduler.py
+"""Bill-due reminder scheduler.
+
+    python scheduler.py                 # long-running; follows bill changes through a change stream
+    python scheduler.py --once          # fire whatever is due now and exit (cron, or no replica set)
+    python scheduler.py --lead-days 3
+
+Active bills are loaded once into a min-heap keyed by reminder time (next_due minus the lead time).
+The loop sleeps until the earliest reminder or the next bill change, whichever comes first, so
+quiet periods cost nothing and no per-user polling happens. Bill inserts, PATCHes and DELETEs
+reach the heap through `apply_change`; a ChangeFeed thread reads the change stream and sets an event
+that ends the sleep as soon as a change arrives. A changed bill is pushed again under a new version, and
+entries whose version no longer matches are dropped when popped (lazy deletion), so updates are
+O(log n). Everything due at the same time goes out in one insert_many. Notifications are unique on
+(bill_id, next_due), so a restart never repeats a reminder.
+
+The clock is injected. FakeClock makes runs deterministic:
+
+    clock = FakeClock(datetime(2024, 5, 1))
+    s = Scheduler(db.bills, db.notifications, clock)
+    s.load(); clock.advance(days=3); s.fire_due()
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from recurrence import cycles_behind
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "smartspend")
+LEAD_DAYS = int(os.getenv("BILL_REMIND_DAYS", "2"))
+IDLE_POLL_SECONDS = 60  # upper bound on a sleep with nothing queued; a change wakes it earlier
+BILL_FIELDS = {"user_id": 1, "name": 1, "amt": 1, "next_due": 1, "status": 1, "cadence": 1, "anchor_day": 1}
+
+
+class SystemClock:
+    def now(self):
+        return datetime.utcnow()
+
+    def sleep(self, seconds, wake=None):
+        """Sleep `seconds`, or until `wake` (a threading.Event) is set."""
+        if wake is None:
+            time.sleep(max(0.0, seconds))
+        else:
+            wake.wait(max(0.0, seconds))
+
+
+class FakeClock:
+    def __init__(self, start):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    def advance(self, **delta):
+        self.t += timedelta(**delta)
+
+    def sleep(self, seconds, wake=None):
+        if wake is None or not wake.is_set():
+            self.t += timedelta(seconds=max(0.0, seconds))
+
+
+class ChangeFeed:
+    """Reads a change stream on a background thread. `changed` is set whenever a change is queued,
+    which ends Scheduler.run's sleep; the scheduler drains the queue with try_next."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.queue = collections.deque()
+        self.changed = threading.Event()
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._watch, name="bill-changes", daemon=True)
+        self.thread.start()
+        return self
+
+    def _watch(self):
+        try:
+            for change in self.stream:
+                self.push(change)
+            self.error = RuntimeError("bill change stream closed")
+        except Exception as ex:
+            self.error = ex
+        self.changed.set()
+
+    def push(self, change):
+        self.queue.append(change)
+        self.changed.set()
+
+    def try_next(self):
+        if self.queue:
+            return self.queue.popleft()
+        if self.error is not None:
+            raise self.error  # the stream died; let the process restart rather than miss changes
+        return None
+
+
+class Scheduler:
+    def __init__(self, bills, notifications, clock=None, lead_days=LEAD_DAYS):
+        self.bills, self.notifications = bills, notifications
+        self.clock = clock or SystemClock()
+        self.lead = timedelta(days=lead_days)
+        self.heap = []            # (remind_at, seq, bill_id, version)
+        self.live = {}            # bill_id -> (version, bill doc)
+        self.seq = itertools.count()
+
+    # ---- heap maintenance ----
+    def remind_at(self, bill):
+        try:
+            return datetime.fromisoformat(str(bill["next_due"])[:10]) - self.lead
+        except (KeyError, ValueError):
+            return None
+
+    def upsert(self, bill):
+        bid = bill["_id"]
+        if bill.get("status") != "active" or self.remind_at(bill) is None:
+            return self.remove(bid)
+        version = next(self.seq)
+        self.live[bid] = (version, bill)
+        heapq.heappush(self.heap, (self.remind_at(bill), version, bid, version))
+
+    def remove(self, bill_id):
+        self.live.pop(bill_id, None)  # its heap entry is skipped when it surfaces
+
+    def load(self):
+        for b in self.bills.find({"status": "active"}, BILL_FIELDS):
+            self.upsert(b)
+        return len(self.live)
+
+    def apply_change(self, change):
+        """Apply one change-stream event (opened with full_document="updateLookup")."""
+        op, bid = change["operationType"], change["documentKey"]["_id"]
+        if op == "delete":
+            self.remove(bid)
+        elif op in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc is None:
+                self.remove(bid)  # deleted again before the lookup ran
+            elif bid in self.live and doc.get("status") == "active" and doc.get("next_due") == self.live[bid][1].get("next_due"):
+                self.live[bid] = (self.live[bid][0], doc)  # same reminder time; just refresh name/amt
+            else:
+                self.upsert(doc)  # new, rescheduled, paused, or not queued (no usable next_due, or already fired)
+
+    def next_wakeup(self):
+        while self.heap and self._stale(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def _stale(self, entry):
+        _, _, bid, version = entry
+        return self.live.get(bid, (None,))[0] != version
+
+    # ---- firing ----
+    def pop_due(self):
+        now, due = self.clock.now(), []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if not self._stale(entry):
+                due.append(self.live.pop(entry[2])[1])  # re-queued when its next_due changes
+        return due
+
+    def notification(self, bill, now):
+        due = datetime.fromisoformat(str(bill["next_due"])[:10])
+        days = (due.date() - now.date()).days
+        when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+        behind = cycles_behind(bill, now.date())[0] if days < 0 else 0
+        if behind:
+            when = f"{-days} days ago, {behind} payment{'s' if behind > 1 else ''} behind"
+        return {"user_id": bill["user_id"], "bill_id": bill["_id"], "next_due": bill["next_due"], "type": "bill_due",
+                "message": f"{bill.get('name', 'Bill')} ({float(bill.get('amt', 0)):.2f}) due {when}",
+                "cycles_behind": behind, "read": False, "created_at": now}
+
+    def fire_due(self):
+        """Insert one notification per bill whose reminder time has passed; returns the number inserted."""
+        now = self.clock.now()
+        docs = [self.notification(b, now) for b in self.pop_due()]
+        if not docs:
+            return 0
+        try:
+            return len(self.notifications.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as bwe:
+            dupes = sum(1 for e in bwe.details.get("writeErrors", []) if e.get("code") == 11000)
+            if dupes != len(bwe.details.get("writeErrors", [])):
+                raise
+            return bwe.details.get("nInserted", 0)
+
+    def run(self, stream=None, until=None):
+        """Fire reminders as they come due, applying changes from `stream` (a ChangeFeed) in between.
+        The sleep ends early when the feed's `changed` event is set. Stops at `until`, if given."""
+        sent, changed = 0, getattr(stream, "changed", None)
+        while until is None or self.clock.now() < until:
+            sent += self.fire_due()
+            if stream is not None:
+                if changed is not None:
+                    changed.clear()  # before draining, so a change queued after the drain still wakes the sleep
+                change = stream.try_next()
+                while change is not None:
+                    self.apply_change(change)
+                    change = stream.try_next()
+            wake = self.next_wakeup()
+            limit = IDLE_POLL_SECONDS if stream is not None or until is None else (until - self.clock.now()).total_seconds()
+            wait = limit if wake is None else min(limit, (wake - self.clock.now()).total_seconds())
+            if wait > 0:
+                self.clock.sleep(wait, changed)
+        return sent
+
+
+def ensure_indexes(db):
+    db.notifications.create_index([("bill_id", ASCENDING), ("next_due", ASCENDING)], unique=True)
+    db.notifications.create_index([("user_id", ASCENDING), ("created_at", ASCENDING)])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Send bill-due reminders into the notifications collection.")
+    ap.add_argument("--lead-days", type=int, default=LEAD_DAYS, help="days before next_due to remind")
+    ap.add_argument("--once", action="store_true", help="fire what is due now and exit")
+    args = ap.parse_args(argv)
+
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    ensure_indexes(db)
+    s = Scheduler(db.bills, db.notifications, lead_days=args.lead_days)
+    if args.once:
+        s.load()
+        print(f"[SCHEDULER] {s.fire_due()} reminders sent")
+        return
+    # open the stream before loading so no change between the two is missed
+    try:
+        stream = db.bills.watch(full_document="updateLookup")
+    except OperationFailure:
+        raise SystemExit("[SCHEDULER] change streams need a replica set; run with --once from cron instead")
+    print(f"[SCHEDULER] watching {s.load()} active bills, reminding {args.lead_days} days ahead")
+    with stream:
+        s.run(ChangeFeed(stream).start())
+
+
+if __name__ == "__main__":
+    main()
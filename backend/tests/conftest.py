@@ -0,0 +1,72 @@
+# backend/tests/conftest.py
+"""Shared fixtures. Tests run against TEST_MONGO_URI (default localhost) when a mongod answers there, otherwise
+against mongomock; tests that need a real server (command monitoring, explain plans) take the `mongod` fixture
+and are skipped without one."""
+import os
+import sys
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+os.environ["MONGO_URI"] = TEST_MONGO_URI
+os.environ["DB_NAME"] = os.getenv("TEST_DB_NAME", "smartspend_test")
+os.environ.setdefault("COUNT_MONGO_COMMANDS", "true")
+
+
+def _mongod_up():
+    try:
+        MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+MONGOD = _mongod_up()
+
+
+@pytest.fixture(scope="session")
+def mongod():
+    if not MONGOD:
+        pytest.skip(f"no mongod at {TEST_MONGO_URI}")
+    return TEST_MONGO_URI
+
+
+@pytest.fixture(scope="session")
+def backend_app():
+    """The app.py module, bound to the test database (mongomock when no mongod is running)."""
+    if MONGOD:
+        import app
+    else:
+        from unittest import mock
+        import mongomock
+        with mock.patch("pymongo.MongoClient", mongomock.MongoClient):
+            import app
+    return app
+
+
+@pytest.fixture
+def db(backend_app):
+    yield backend_app.db
+    for name in backend_app.db.list_collection_names():
+        backend_app.db[name].delete_many({})
+    backend_app.summary_cache.clear()
+
+
+@pytest.fixture
+def make_user(backend_app, db):
+    """Insert a verified user and return (user_id, auth headers)."""
+    from datetime import datetime
+    from flask_jwt_extended import create_access_token
+
+    def make(email="test@example.com"):
+        uid = str(db.users.insert_one({"name": "Test", "email": email, "password": "x", "verified": True,
+                                       "created_at": datetime.utcnow()}).inserted_id)
+        with backend_app.app.app_context():
+            token = create_access_token(identity=uid)
+        return uid, {"Authorization": f"Bearer {token}"}
+    return make
@@ -0,0 +1,183 @@
+# backend/tests/test_asgi_parity.py
+"""Every route of asgi_app.py must answer like app.py. Both apps run on the same database (motor over
+mongomock via mongomock-motor when there is no mongod). The same script of requests runs once per app, for
+a user of its own, and the JSON responses are compared with ids and timestamps masked out. Then each user's
+reads are sent to both apps, with each app's token on the other one, and must come back identical."""
+import asyncio
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+
+from conftest import MONGOD
+
+VOLATILE = {"id", "_id", "ids", "user_id", "expense_id", "income_id", "email", "token", "verify_link",
+            "created_at", "updated_at", "elapsed_ms", "rows_per_sec", "time"}
+READS = ["/dashboard/summary", "/transactions?limit=50", "/transactions?category=wants", "/bills", "/bills?search=ph",
+         "/bills?due=overdue", "/cashflow?horizon=30", "/ml/next7_burnrate", "/flags?limit=0", "/insights"]
+if not MONGOD:
+    READS = [p for p in READS if not p.startswith("/transactions")]  # mongomock has no $lookup with `let`
+
+
+def masked(v):
+    if isinstance(v, dict):
+        return {k: "*" if k in VOLATILE else masked(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [masked(x) for x in v]
+    return v
+
+
+class FlaskClient:
+    def __init__(self, app):
+        self.c = app.test_client()
+
+    async def call(self, method, path, auth=None, body=None):
+        r = self.c.open(path, method=method, headers=auth or {}, json=body)
+        return r.status_code, r.get_json()
+
+
+class QuartClient:
+    def __init__(self, app):
+        self.c = app.test_client()
+
+    async def call(self, method, path, auth=None, body=None):
+        r = await self.c.open(path, method=method, headers=auth or {}, json=body)
+        return r.status_code, await r.get_json()
+
+
+@pytest.fixture
+def asgi(backend_app, db):
+    import asgi_app
+    if not MONGOD:
+        from mongomock_motor import AsyncMongoMockClient
+        with mock.patch("asgi_app.AsyncIOMotorClient", lambda *a, **k: AsyncMongoMockClient(mock_mongo_client=backend_app.client)):
+            yield asgi_app.app
+    else:
+        yield asgi_app.app
+
+
+def run(backend_app, asgi, script):
+    async def main():
+        async with asgi.test_app() as served:
+            return await script(FlaskClient(backend_app.app), QuartClient(served))
+    return asyncio.run(main())
+
+
+async def session(client, email):
+    """Sign up, verify and log in through `client`, then exercise every write route. Returns (responses, auth)."""
+    out, today = [], date.today()
+
+    async def call(*args, **kwargs):
+        r = await client.call(*args, **kwargs)
+        out.append(r)
+        return r
+
+    await call("POST", "/auth/signup_page1", body={"name": "Parity", "email": email, "password": "pw-1"})
+    _, page2 = await call("POST", "/auth/signup_page2_income", body={"email": email, "amt": 2000, "pay_frequency": "monthly", "monthly_date": 1})
+    await call("POST", "/auth/login", body={"email": email, "password": "pw-1"})  # not verified yet
+    await call("GET", page2["verify_link"])
+    await call("GET", "/auth/verify/not-a-token")
+    _, login = await call("POST", "/auth/login", body={"email": email, "password": "pw-1"})
+    auth = {"Authorization": f"Bearer {login['token']}"}
+
+    await call("GET", "/dashboard/summary")
+    await call("GET", "/dashboard/summary", auth={"Authorization": "Token abc"})
+    await call("GET", "/dashboard/summary", auth={"Authorization": "Bearer a b"})
+    await call("GET", "/dashboard/summary", auth={"Authorization": "Bearer not-a-jwt"})
+    await call("POST", "/income", auth, {"amt": 300.0, "pay_frequency": "others", "other_note": "gift"})
+    await call("POST", "/income", auth, {"amt": "nan"})
+    _, e1 = await call("POST", "/expenses", auth, {"amt": 12.5, "category": "wants", "mood": "impulse", "merchant": "cafe",
+                                                    "date": (today - timedelta(days=2)).isoformat()})
+    await call("POST", "/expenses", auth, {"amt": 45.0, "category": "need", "need_recurrence": True, "bill_name": "Phone",
+                                           "cadence": "monthly", "date": (today - timedelta(days=40)).isoformat()})
+    await call("POST", "/expenses", auth, {"amt": "nan"})
+    _, bulk = await call("POST", "/expenses/bulk", auth, {"rows": [
+        {"amt": 8.0, "category": "guilts", "mood": "sad", "date": (today - timedelta(days=d)).isoformat()} for d in range(1, 15)
+    ] + [{"amt": 900.0, "category": "need", "need_recurrence": True, "bill_name": "Rent", "cadence": "monthly",
+          "date": (today - timedelta(days=3)).isoformat()}, {"amt": "inf"}]})
+    await call("POST", "/expenses/bulk", auth, [{"amt": 1}])
+    await call("PATCH", f"/expenses/{e1['id']}", auth, {"amt": 20.0, "mood": "happy"})
+    await call("PATCH", "/expenses/nope", auth, {"amt": 1.0})
+    await call("PATCH", f"/expenses/{e1['id']}", auth, {"amt": "nan", "category": "bogus"})
+    await call("DELETE", f"/expenses/{bulk['ids'][0]}", auth)
+    await call("DELETE", f"/expenses/{bulk['ids'][0]}", auth)
+    await call("POST", "/transactions", auth, {"merchant": "cafe", "expense_id": e1["id"]})
+    _, listed = await call("GET", "/bills", auth)
+    by_name = {b["name"]: b["id"] for b in listed["items"]}
+    await call("PATCH", f"/bills/{by_name['Phone']}", auth, {"amt": 50.0, "name": "Phone plan"})
+    await call("PATCH", f"/bills/{by_name['Phone']}", auth, {"unknown": 1})
+    await call("DELETE", f"/bills/{by_name['Rent']}", auth)
+    await call("DELETE", "/bills/nope", auth)
+    for path in READS:
+        await call("GET", path, auth)
+    return out, auth
+
+
+def test_same_routes(backend_app, asgi):
+    def routes(app):
+        return {(m, r.rule) for r in app.url_map.iter_rules() for m in r.methods - {"HEAD", "OPTIONS"}
+                if r.endpoint != "static"}
+    assert routes(backend_app.app) == routes(asgi)
+
+
+def test_write_routes_match(backend_app, asgi):
+    async def script(flask, quart):
+        flask_out, _ = await session(flask, "flask@example.com")
+        quart_out, _ = await session(quart, "quart@example.com")
+        return flask_out, quart_out
+
+    flask_out, quart_out = run(backend_app, asgi, script)
+    assert [s for s, _ in flask_out] == [s for s, _ in quart_out]
+    for f, q in zip(flask_out, quart_out):
+        assert masked(f) == masked(q)
+
+
+def test_read_routes_match_with_either_token(backend_app, asgi):
+    async def script(flask, quart):
+        _, flask_auth = await session(flask, "flask@example.com")
+        _, quart_auth = await session(quart, "quart@example.com")
+        pairs = []
+        for auth in (flask_auth, quart_auth):
+            for path in READS:
+                backend_app.summary_cache.clear()  # both apps share this process's cache
+                f = await flask.call("GET", path, auth)
+                backend_app.summary_cache.clear()
+                pairs.append((path, f, await quart.call("GET", path, auth)))
+        health = [await flask.call("GET", "/health"), await quart.call("GET", "/health")]
+        return pairs, health
+
+    pairs, health = run(backend_app, asgi, script)
+    for path, f, q in pairs:
+        assert f[0] == 200, (path, f)
+        assert f == q, path
+    assert health[0][0] == health[1][0] == 200
+    assert health[0][1].keys() == health[1][1].keys()
+
+
+def test_writes_land_before_the_summary_is_invalidated(backend_app, asgi, monkeypatch):
+    import asgi_app
+    events = []
+    apply_ops, invalidate = asgi_app.apply_ops, asgi_app.invalidate_summary
+
+    async def tracked_apply(*ops):
+        await apply_ops(*ops)
+        events.append("rollups")
+
+    async def tracked_invalidate(user_id):
+        events.append("invalidate")
+        await invalidate(user_id)
+
+    monkeypatch.setattr(asgi_app, "apply_ops", tracked_apply)
+    monkeypatch.setattr(asgi_app, "invalidate_summary", tracked_invalidate)
+
+    async def script(_, quart):
+        _, auth = await session(quart, "order@example.com")
+        events.clear()
+        _, e = await quart.call("POST", "/expenses", auth, {"amt": 5.0, "category": "wants"})
+        await quart.call("POST", "/expenses/bulk", auth, {"rows": [{"amt": 1.0}]})
+        await quart.call("POST", "/income", auth, {"amt": 10.0})
+        await quart.call("PATCH", f"/expenses/{e['id']}", auth, {"amt": 6.0})
+        await quart.call("DELETE", f"/expenses/{e['id']}", auth)
+
+    run(backend_app, asgi, script)
+    assert events == ["rollups", "invalidate"] * 5
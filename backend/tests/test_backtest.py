@@ -0,0 +1,34 @@
+# backend/tests/test_backtest.py
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtest import origins_matrix
+from recurrence import expand
+
+START = datetime(2024, 1, 1)
+
+
+def test_expand_can_replay_before_next_due():
+    bill = {"amt": 10.0, "cadence": "weekly", "next_due": "2024-03-04"}
+    assert len(expand([bill], "2024-02-01", "2024-03-01")[2]) == 0
+    _, _, dates = expand([bill], "2024-02-01", "2024-03-01", past=True)
+    assert [str(d) for d in dates] == ["2024-02-05", "2024-02-12", "2024-02-19", "2024-02-26"]
+
+
+def test_spikes_come_from_the_schedule_known_at_each_origin():
+    days = 70
+    total, recurring = np.full(days, 5.0), np.zeros(days)
+    recurring[[38, 60]] = 99.0  # realized recurring spend after the origins must not leak into the forecast
+    total += recurring
+    bills = [{"amt": 50.0, "cadence": "weekly", "next_due": "2024-03-04", "created_at": START + timedelta(days=30)}]
+    hist, rec, spikes, actual, weekdays = origins_matrix(total, recurring, START, 28, 7, 7, bills)
+
+    origins = [START + timedelta(days=c) for c in range(28, days - 7 + 1, 7)]
+    for origin, row in zip(origins, spikes):
+        if origin < bills[0]["created_at"]:
+            assert not row.any()
+        else:
+            assert row.sum() == 50.0 and (origin + timedelta(days=int(row.argmax()))).weekday() == 0
+    assert not np.isin(99.0, spikes)
+    assert actual.shape == spikes.shape == (len(origins), 7)
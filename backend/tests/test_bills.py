@@ -0,0 +1,37 @@
+# backend/tests/test_bills.py
+from datetime import date, timedelta
+
+
+def seed(db, uid):
+    today = date.today()
+    db.bills.insert_many([
+        {"user_id": uid, "name": "Rent", "name_lower": "rent", "amt": 900.0, "cadence": "monthly", "status": "active",
+         "next_due": (today + timedelta(days=3)).isoformat()},
+        {"user_id": uid, "name": "Renters insurance", "name_lower": "renters insurance", "amt": 20.0, "cadence": "monthly",
+         "status": "pause", "next_due": (today + timedelta(days=1)).isoformat()},
+        {"user_id": uid, "name": "Gym", "name_lower": "gym", "amt": 15.0, "cadence": "weekly", "status": "active",
+         "next_due": (today + timedelta(days=10)).isoformat()},
+        {"user_id": "someone-else", "name": "Rent", "name_lower": "rent", "amt": 1.0, "cadence": "monthly",
+         "status": "active", "next_due": today.isoformat()},
+    ])
+
+
+def test_filters_and_summary(backend_app, db, make_user):
+    uid, auth = make_user()
+    seed(db, uid)
+    client = backend_app.app.test_client()
+    body = client.get("/bills?search=REN", headers=auth).get_json()
+    assert [b["name"] for b in body["items"]] == ["Renters insurance", "Rent"]
+    assert all(isinstance(b["id"], str) and "_id" not in b for b in body["items"])
+    assert body["summary"] == {"total_this_month": 915.0, "next7": 900.0, "active": 2}
+    assert [b["name"] for b in client.get("/bills?status=active", headers=auth).get_json()["items"]] == ["Rent", "Gym"]
+    assert client.get("/bills?search=x.*", headers=auth).get_json()["items"] == []
+
+
+def test_search_uses_the_name_index(mongod, backend_app, db, make_user):
+    uid, _ = make_user()
+    seed(db, uid)
+    planner = db.bills.find(backend_app.bills_query(uid, {"search": "ren"})).sort("next_due", 1).explain()["queryPlanner"]
+    # the prefix regex reaches the planner as index bounds on (user_id, name_lower)
+    assert "user_id_1_name_lower_1" in str(planner)
+    assert "COLLSCAN" not in str(planner["winningPlan"])
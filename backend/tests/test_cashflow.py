@@ -0,0 +1,32 @@
+# backend/tests/test_cashflow.py
+from datetime import date
+
+from cashflow import daily_amounts, payday_amounts, runway_days, simulate
+
+TODAY = date(2024, 3, 15)
+
+
+def test_overdue_bill_is_charged_today():
+    out = daily_amounts([{"next_due": "2024-03-10", "cadence": "monthly", "amt": 50.0}], TODAY, 30)
+    assert out[0] == 50.0
+    assert out[26] == 50.0  # Apr 10, the next cycle
+    assert out.sum() == 100.0
+
+
+def test_bill_due_today_is_charged_once():
+    out = daily_amounts([{"next_due": "2024-03-15", "cadence": "weekly", "amt": 10.0}], TODAY, 7)
+    assert out.tolist() == [10.0, 0, 0, 0, 0, 0, 0]
+
+
+def test_past_paydays_are_not_paid_today():
+    pay = {"pay_frequency": "monthly", "monthly_date": 1, "amt": 1000.0}
+    out = payday_amounts(pay, TODAY, 30)
+    assert out[0] == 0.0
+    assert out[17] == 1000.0  # Apr 1
+
+
+def test_overdue_bill_shortens_the_runway():
+    bills = [{"next_due": "2024-03-10", "cadence": "monthly", "amt": 80.0}]
+    sim = simulate(100.0, [0.0] * 30, daily_amounts(bills, TODAY, 30), [1.0] * 30)
+    assert int(sim["first_negative"]) == 20  # 100 - 80 today, then 1 a day from today
+    assert float(runway_days(sim)) == 20.0
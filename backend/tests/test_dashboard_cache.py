@@ -0,0 +1,98 @@
+# backend/tests/test_dashboard_cache.py
+import pytest
+
+
+@pytest.fixture
+def persist(backend_app, monkeypatch):
+    monkeypatch.setattr(backend_app, "DASHBOARD_CACHE_PERSIST", True)
+    return backend_app
+
+
+def add_expense(client, auth, amt):
+    r = client.post("/expenses", headers=auth, json={"amt": amt, "category": "wants", "mood": "happy"})
+    assert r.status_code in (200, 201)
+
+
+def test_local_cache_is_dropped_on_write(backend_app, make_user):
+    client = backend_app.app.test_client()
+    _, auth = make_user()
+    first = client.get("/dashboard/summary", headers=auth).get_json()
+    assert client.get("/dashboard/summary", headers=auth).get_json() == first
+    add_expense(client, auth, 20.0)
+    assert client.get("/dashboard/summary", headers=auth).get_json()["current_balance"] == first["current_balance"] - 20.0
+
+
+def test_persisted_entry_is_shared_and_versioned(persist, db, make_user):
+    client = persist.app.test_client()
+    uid, auth = make_user()
+    first = client.get("/dashboard/summary", headers=auth).get_json()
+    doc = db.dashboard.find_one({"user_id": uid})
+    assert doc["version"] == 0 and doc["summary"] == first
+
+    hits = persist.cache_stats["persisted_hits"]
+    assert client.get("/dashboard/summary", headers=auth).get_json() == first
+    assert persist.cache_stats["persisted_hits"] == hits + 1
+
+    add_expense(client, auth, 20.0)
+    doc = db.dashboard.find_one({"user_id": uid})
+    assert doc["version"] == 1 and "summary" not in doc
+    assert client.get("/dashboard/summary", headers=auth).get_json()["current_balance"] == first["current_balance"] - 20.0
+
+
+def test_summary_built_before_a_write_is_not_stored(persist, db, make_user, monkeypatch):
+    uid, auth = make_user()
+    build = persist.build_summary
+
+    def build_racing_a_write(user_id):
+        summary = build(user_id)
+        persist.invalidate_summary(user_id)  # another worker writes while this one is building
+        return summary
+
+    monkeypatch.setattr(persist, "build_summary", build_racing_a_write)
+    assert persist.app.test_client().get("/dashboard/summary", headers=auth).status_code == 200
+    doc = db.dashboard.find_one({"user_id": uid})
+    assert doc["version"] == 1 and "summary" not in doc
+
+
+def test_expired_entry_is_rebuilt(persist, db, make_user, monkeypatch):
+    uid, auth = make_user()
+    client = persist.app.test_client()
+    client.get("/dashboard/summary", headers=auth)
+    monkeypatch.setattr(persist, "DASHBOARD_CACHE_TTL", 0)
+    misses = persist.cache_stats["misses"]
+    client.get("/dashboard/summary", headers=auth)
+    assert persist.cache_stats["misses"] == misses + 1
+
+
+@pytest.fixture
+def cache(backend_app):
+    yield backend_app
+    backend_app.summary_cache.clear()
+
+
+def test_store_is_refused_after_a_concurrent_write(cache):
+    day = "2024-03-01"
+    _, seen = cache._cache_get("u1", day)
+    cache._cache_drop("u1")  # a write lands while the summary is being built
+    assert not cache._cache_store("u1", day, seen, {"stale": True})
+    _, seen = cache._cache_get("u1", day)
+    assert cache._cache_store("u1", day, seen, {"fresh": True})
+    assert cache._cache_get("u1", day)[0] == {"fresh": True}
+
+
+def test_invalidations_stay_within_the_lru_bound(cache, monkeypatch):
+    monkeypatch.setattr(cache, "DASHBOARD_CACHE_SIZE", 4)
+    for i in range(50):
+        cache._cache_drop(f"user{i}")
+    assert len(cache.summary_cache) == 4
+
+
+def test_evicted_invalidation_still_guards_the_store(cache, monkeypatch):
+    monkeypatch.setattr(cache, "DASHBOARD_CACHE_SIZE", 2)
+    day = "2024-03-01"
+    _, seen = cache._cache_get("u1", day)
+    cache._cache_drop("u1")
+    cache._cache_drop("u2")
+    cache._cache_drop("u3")  # pushes u1's marker out of the LRU
+    assert "u1" not in cache.summary_cache
+    assert not cache._cache_store("u1", day, seen, {"stale": True})
@@ -0,0 +1,31 @@
+# backend/tests/test_dashboard_commands.py
+from datetime import date, timedelta
+
+
+def seed(client, auth):
+    client.post("/income", headers=auth, json={"amt": 3000.0, "pay_frequency": "monthly", "monthly_date": 1})
+    rows = [{"amt": 12.5 + d, "category": "need", "mood": "neutral", "date": (date.today() - timedelta(days=d)).isoformat()}
+            for d in range(1, 20)]
+    rows.append({"amt": 900.0, "category": "need", "need_recurrence": True, "bill_name": "Rent", "cadence": "monthly",
+                 "date": (date.today() - timedelta(days=3)).isoformat()})
+    assert client.post("/expenses/bulk", headers=auth, json={"rows": rows}).status_code == 200
+
+
+def test_summary_stays_within_command_budget(mongod, backend_app, make_user, monkeypatch):
+    monkeypatch.setattr(backend_app, "DASHBOARD_CACHE_TTL", 0)
+    client = backend_app.app.test_client()
+    _, auth = make_user()
+    seed(client, auth)
+    for _ in range(2):
+        r = client.get("/dashboard/summary", headers=auth)
+        assert r.status_code == 200
+        assert int(r.headers["X-Mongo-Commands"]) <= backend_app.SUMMARY_MAX_COMMANDS
+
+
+def test_summary_shape(backend_app, make_user):
+    client = backend_app.app.test_client()
+    _, auth = make_user()
+    seed(client, auth)
+    body = client.get("/dashboard/summary", headers=auth).get_json()
+    assert set(body) == {"current_balance", "burn_rate", "days_left", "upcoming_bills", "nwg", "cashflow"}
+    assert body["current_balance"] == round(3000.0 - sum(12.5 + d for d in range(1, 20)) - 900.0, 2)
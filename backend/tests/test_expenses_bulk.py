@@ -0,0 +1,44 @@
+# backend/tests/test_expenses_bulk.py
+import pytest
+
+
+@pytest.fixture
+def client(backend_app):
+    return backend_app.app.test_client()
+
+
+def balance(db, uid):
+    led = db.current_balance.find_one({"user_id": uid}) or {}
+    return led.get("income_total", 0.0) - led.get("expense_total", 0.0)
+
+
+@pytest.mark.parametrize("body", [[{"amt": 5}], "rows", {"rows": {"amt": 5}}, {"rows": []}])
+def test_malformed_body_is_rejected(client, make_user, body):
+    _, auth = make_user()
+    assert client.post("/expenses/bulk", headers=auth, json=body).status_code == 400
+
+
+def test_non_finite_amounts_are_row_errors(client, db, make_user):
+    uid, auth = make_user()
+    r = client.post("/expenses/bulk", headers=auth, json={"rows": [{"amt": "nan"}, {"amt": "inf"}, {"amt": 4.5}]}).get_json()
+    assert r["inserted"] == 1
+    assert r["errors"] == [{"row": 0, "error": "Invalid amt"}, {"row": 1, "error": "Invalid amt"}]
+    assert balance(db, uid) == -4.5
+    assert client.post("/expenses", headers=auth, json={"amt": "-inf"}).status_code == 400
+
+
+def test_failed_bill_insert_still_rolls_up(client, db, make_user, backend_app):
+    uid, auth = make_user()
+    db.bills.create_index([("user_id", 1), ("name_lower", 1)], unique=True, name="test_unique_bill")
+    try:
+        rows = [{"amt": 50.0, "category": "need", "need_recurrence": True, "bill_name": "Phone"},
+                {"amt": 8.0, "category": "wants"},
+                {"amt": 50.0, "category": "need", "need_recurrence": True, "bill_name": "phone"}]
+        r = client.post("/expenses/bulk", headers=auth, json={"rows": rows}).get_json()
+    finally:
+        db.bills.drop_index("test_unique_bill")
+    assert r["inserted"] == 3 and r["bills_created"] == 1 and not r["ok"]
+    assert [e["row"] for e in r["errors"]] == [2]
+    assert r["errors"][0]["error"].startswith("bill not created: ")
+    assert balance(db, uid) == -108.0
+    assert db.bills.count_documents({"user_id": uid}) == 1
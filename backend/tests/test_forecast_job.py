@@ -0,0 +1,36 @@
+# backend/tests/test_forecast_job.py
+from datetime import timedelta
+
+import pytest
+
+import forecast_job
+
+
+@pytest.fixture
+def job_db(db, monkeypatch):
+    monkeypatch.setattr(forecast_job, "_db", db)
+    return db
+
+
+def seed(backend_app, client, auth, days=21):
+    today = backend_app.day_start(backend_app.now())
+    rows = [{"amt": 10.0 + d % 7, "category": "wants", "date": (today - timedelta(days=d)).date().isoformat()} for d in range(1, days)]
+    assert client.post("/expenses/bulk", headers=auth, json={"rows": rows}).status_code == 200
+    return today
+
+
+def test_precomputed_forecast_goes_stale_on_write(backend_app, job_db, make_user):
+    client = backend_app.app.test_client()
+    uid, auth = make_user()
+    today = seed(backend_app, client, auth)
+    assert forecast_job.run_partition([uid], today, 7) == 1
+    doc = job_db.forecast_groundtruth.find_one({"user_id": uid, "as_of": today})
+    assert doc["stale"] is False and "runway_days" not in doc and len(doc["mean"]) == 7
+
+    assert client.get("/ml/next7_burnrate", headers=auth).get_json()["source"] == "precomputed"
+    client.post("/expenses", headers=auth, json={"amt": 99.0, "category": "guilts"})
+    assert job_db.forecast_groundtruth.find_one({"user_id": uid, "as_of": today})["stale"] is True
+    assert client.get("/ml/next7_burnrate", headers=auth).get_json()["source"] == "on_demand"
+
+    forecast_job.run_partition([uid], today, 7)
+    assert client.get("/ml/next7_burnrate", headers=auth).get_json()["source"] == "precomputed"
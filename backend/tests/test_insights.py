@@ -0,0 +1,132 @@
+# backend/tests/test_insights.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import insights
+from insights import bill_insights, drift_insights, month_key, mood_insights, rank
+
+
+def cell(month, cat, total, count, mood=None):
+    return {"month": month, "allele_frequency": cat, "mood": mood, "total": float(total), "count": count}
+
+
+def test_mood_flags_moods_that_cost_more_per_purchase():
+    today = datetime(2024, 3, 15)
+    cells = [cell("2024-03", "wants", 100, 10), cell("2024-02", "wants", 200, 5, "impulse"),
+             cell("2024-01", "need", 50, 5, "happy"), cell("2024-03", "guilts", 400, 4, "sad"),
+             cell("2023-11", "wants", 900, 5, "stressed"), cell("2024-03", "income", 5000, 2, "impulse")]
+    out = mood_insights(cells, today)
+    # 24 purchases over the last 3 months average 750/24; "sad" has too few, "stressed" is too old, income is ignored
+    avg = 750 / 24
+    assert [i["code"] for i in out] == ["mood:impulse"]
+    assert out[0]["tone"] == "warn" and out[0]["data"] == {"mood": "impulse", "ratio": round(40 / avg, 2), "count": 5}
+    assert out[0]["amount"] == pytest.approx((200 - 5 * avg) / 4, abs=0.01)
+
+
+def test_mood_needs_enough_purchases():
+    today = datetime(2024, 3, 15)
+    assert mood_insights([cell("2024-03", "wants", 10, 4), cell("2024-03", "wants", 200, 5, "impulse")], today) == []
+
+
+def test_drift_projects_this_month_against_last():
+    today = datetime(2024, 3, 15)
+    cells = [cell("2024-02", "wants", 100, 1), cell("2024-03", "wants", 100, 1),    # on pace for 206.67
+             cell("2024-02", "need", 100, 1), cell("2024-03", "need", 45, 1),       # 93, within 25%
+             cell("2024-02", "fun", 60, 1), cell("2024-02", "fun", 40, 1, "happy"),
+             cell("2024-03", "fun", 15, 1),                                         # 31, down 69%
+             cell("2024-02", "guilts", 10, 1), cell("2024-03", "guilts", 90, 1),    # base below DRIFT_MIN_BASE
+             cell("2024-02", "income", 3000, 1), cell("2024-03", None, 500, 1)]
+    out = {i["code"]: i for i in drift_insights(cells, today)}
+    assert set(out) == {"drift:wants", "drift:fun"}
+    assert out["drift:wants"]["tone"] == "warn" and out["drift:wants"]["amount"] == pytest.approx(100 * 31 / 15 - 100, abs=0.01)
+    assert out["drift:fun"]["tone"] == "success" and out["drift:fun"]["data"]["previous"] == 100.0
+    assert drift_insights(cells, datetime(2024, 3, 6)) == []
+
+
+@pytest.mark.parametrize("balance, expected", [(1000.0, None), (500.0, ("warn", 300.0)), (200.0, ("warn", 100.0))])
+def test_bill_load_counts_bills_due_in_the_window(balance, expected):
+    today = datetime(2024, 3, 1)
+    bills = [{"amt": 300, "next_due": "2024-03-05"}, {"amt": 500, "next_due": "2024-03-20"}, {"amt": 40}]
+    out = bill_insights(bills, balance, today)
+    if expected is None:
+        assert out == []
+    else:
+        assert [(i["tone"], i["amount"]) for i in out] == [expected]
+        assert out[0]["data"]["bills"] == 1 and out[0]["data"]["next_due"] == "2024-03-05"
+
+
+def test_rank_puts_warnings_first_then_larger_amounts():
+    items = [{"code": "a", "tone": "info", "amount": 90.0}, {"code": "b", "tone": "warn", "amount": 5.0},
+             {"code": "c", "tone": "success", "amount": 50.0}, {"code": "d", "tone": "warn", "amount": 20.0}]
+    assert [(i["code"], i["rank"]) for i in rank(items)] == [("d", 1), ("b", 2), ("a", 3), ("c", 4)]
+
+
+def seed_user(db, uid, mood_total, updated_at):
+    mon = month_key(datetime.utcnow())
+    db.current_balance.insert_one({"user_id": uid, "income_total": 5000.0, "expense_total": 0.0})
+    db.month.insert_many([
+        {"user_id": uid, "month": mon, "allele_frequency": "wants", "mood": None, "total": 100.0, "count": 10, "updated_at": updated_at},
+        {"user_id": uid, "month": mon, "allele_frequency": "wants", "mood": "impulse", "total": mood_total, "count": 5, "updated_at": updated_at}])
+
+
+def computed(db):
+    return {i["user_id"]: i["computed_at"] for i in db.insights.find()}
+
+
+def test_incremental_runs_follow_the_watermark(db):
+    long_ago = datetime.utcnow() - timedelta(days=30)
+    seed_user(db, "u1", 200.0, long_ago)
+    seed_user(db, "u2", 300.0, long_ago)
+    assert insights.run(db) == (2, 2)  # no watermark yet: every user with a ledger
+    first = computed(db)
+    watermark = db.job_state.find_one({"_id": "insights"})["watermark"]
+    assert insights.run(db) == (0, 0)
+
+    db.month.update_one({"user_id": "u2", "mood": "impulse"}, {"$set": {"total": 20.0, "updated_at": datetime.utcnow()}})
+    assert insights.run(db) == (1, 0)  # u2's impulse spend no longer stands out
+    assert computed(db) == {"u1": first["u1"]}
+    assert db.job_state.find_one({"_id": "insights"})["watermark"] > watermark
+
+
+def test_first_run_of_the_day_refreshes_users_with_bills(db):
+    long_ago = datetime.utcnow() - timedelta(days=30)
+    seed_user(db, "u1", 200.0, long_ago)
+    db.bills.insert_many([
+        {"user_id": "u3", "status": "active", "amt": 80.0, "next_due": datetime.utcnow().date().isoformat()},
+        {"user_id": "u4", "status": "paused", "amt": 80.0, "next_due": datetime.utcnow().date().isoformat()}])
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    db.job_state.insert_one({"_id": "insights", "watermark": yesterday})
+    assert insights.run(db) == (1, 1)
+    assert [i["code"] for i in db.insights.find({"user_id": "u3"})] == ["bill_load"]
+    assert insights.run(db) == (0, 0)  # later runs that day skip them
+    assert insights.run(db, full=True)[0] == 1  # --full walks the ledger users
+
+
+@pytest.fixture
+def client(backend_app):
+    return backend_app.app.test_client()
+
+
+def test_insights_page_on_rank(client, db, make_user):
+    uid, auth = make_user()
+    stamp = datetime.utcnow()
+    db.insights.insert_many([{"user_id": uid, "code": f"c{r}", "type": "mood" if r % 2 else "spending", "rank": r,
+                              "amount": 1.0, "computed_at": stamp} for r in (3, 1, 5, 2, 4)]
+                            + [{"user_id": "someone-else", "code": "c0", "type": "mood", "rank": 0, "amount": 1.0, "computed_at": stamp}])
+    pages, cursor = [], None
+    while True:
+        body = client.get("/insights?limit=2" + (f"&cursor={cursor}" if cursor else ""), headers=auth).get_json()
+        pages.append([i["rank"] for i in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert [i["rank"] for i in client.get("/insights?type=mood", headers=auth).get_json()["items"]] == [1, 3, 5]
+
+
+@pytest.mark.parametrize("cursor", ["nope", "WyJ4IiwgIjEiXQ=="])
+def test_insights_reject_a_bad_cursor(client, make_user, cursor):
+    _, auth = make_user()
+    r = client.get(f"/insights?cursor={cursor}", headers=auth)
+    assert r.status_code == 400 and r.get_json() == {"error": "Invalid cursor"}
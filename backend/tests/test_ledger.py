@@ -0,0 +1,66 @@
+# backend/tests/test_ledger.py
+import pytest
+
+
+@pytest.fixture
+def client(backend_app):
+    return backend_app.app.test_client()
+
+
+def ledger(db, uid):
+    return db.current_balance.find_one({"user_id": uid}, {"_id": 0, "income_total": 1, "expense_total": 1})
+
+
+@pytest.mark.parametrize("amt", ["nan", "inf", "-inf", "x", None, [1]])
+def test_rejected_income_leaves_the_ledger_alone(client, db, make_user, amt):
+    uid, auth = make_user()
+    assert client.post("/income", headers=auth, json={"amt": 100.0}).status_code == 200
+    before = ledger(db, uid)
+    r = client.post("/income", headers=auth, json={"amt": amt})
+    assert r.status_code == 400 and r.get_json() == {"error": "Invalid amt"}
+    assert ledger(db, uid) == before
+    assert db.income.count_documents({"user_id": uid}) == 1
+
+
+def test_rejected_signup_income_is_not_stored(client, db, make_user):
+    uid, _ = make_user("new@example.com")
+    r = client.post("/auth/signup_page2_income", json={"email": "new@example.com", "amt": "nan"})
+    assert r.status_code == 400
+    assert ledger(db, uid) is None and db.income.count_documents({}) == 0
+
+
+def test_reconcile_matches_the_ledger(backend_app, client, db, make_user):
+    uid, auth = make_user()
+    for amt in (1200, "300.5", "nan"):
+        client.post("/income", headers=auth, json={"amt": amt})
+    client.post("/expenses", headers=auth, json={"amt": 42.25, "category": "wants"})
+    before = ledger(db, uid)
+    assert before == {"income_total": 1500.5, "expense_total": 42.25}
+    backend_app.rebuild_ledger(uid)
+    assert ledger(db, uid) == before
+
+
+def rollups(db, uid):
+    strip = {"_id": 0, "updated_at": 0}
+    return (ledger(db, uid), sorted(map(repr, db.perday.find({"user_id": uid}, strip))),
+            sorted(map(repr, db.month.find({"user_id": uid}, strip))))
+
+
+@pytest.mark.parametrize("body", [{"amt": "nan"}, {"amt": "inf"}, {"amt": "abc"}, {"amt": None}, {"category": "bogus"},
+                                  {"date": "not-a-date"}, {"amt": 5.0, "category": "bogus"}, {"note": "x"}, [{"amt": 5}]])
+def test_rejected_patch_leaves_the_rollups_alone(client, db, make_user, body):
+    uid, auth = make_user()
+    eid = client.post("/expenses", headers=auth, json={"amt": 10.0, "category": "wants", "mood": "happy"}).get_json()["id"]
+    before = rollups(db, uid)
+    assert client.patch(f"/expenses/{eid}", headers=auth, json=body).status_code == 400
+    assert rollups(db, uid) == before
+    assert db.expenses.find_one({"user_id": uid})["amt"] == 10.0
+
+
+def test_patch_moves_the_amount_between_cells(client, db, make_user):
+    uid, auth = make_user()
+    eid = client.post("/expenses", headers=auth, json={"amt": 10.0, "category": "wants"}).get_json()["id"]
+    assert client.patch(f"/expenses/{eid}", headers=auth, json={"amt": "12.5", "category": "guilts"}).status_code == 200
+    assert ledger(db, uid)["expense_total"] == 12.5
+    cells = {c["allele_frequency"]: c["total"] for c in db.month.find({"user_id": uid})}
+    assert cells == {"wants": 0.0, "guilts": 12.5}
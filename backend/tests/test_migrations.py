@@ -0,0 +1,54 @@
+# backend/tests/test_migrations.py
+from datetime import datetime
+
+import pytest
+
+NAME = "0001_expense_date_native"
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def expense_dates(backend_app, db, monkeypatch):
+    monkeypatch.setattr(backend_app, "MIGRATION_BATCH", 2)
+    dates = ["2024-01-05", "2024-01-06T10:00:00", "garbage", "2024-02-01", "", "2024-02-29", "2024-03-01"]
+    ids = [db.expenses.insert_one({"user_id": "u", "amt": 1.0, "date": d}).inserted_id for d in dates]
+    db.expenses.insert_one({"user_id": "u", "amt": 1.0, "date": datetime(2023, 12, 1)})  # already native
+    step = dict(backend_app.MIGRATIONS)[NAME]
+    calls = []
+
+    def flaky(state):
+        calls.append(dict(state))
+        if len(calls) == 3 and not state.get("resumed"):
+            raise Interrupted
+        return step(state)
+
+    monkeypatch.setattr(backend_app, "MIGRATIONS", [(NAME, flaky)])
+    return ids, calls
+
+
+def test_interrupted_migration_resumes_from_stored_progress(backend_app, db, expense_dates, capsys):
+    ids, calls = expense_dates
+    with pytest.raises(Interrupted):
+        backend_app.run_migrations()
+    state = db.migrations.find_one({"_id": NAME})
+    assert state["last_id"] == ids[3] and not state["done"]  # two batches of two went through
+    assert (state["converted"], state["skipped"]) == (3, 1)
+    assert [type(d["date"]) for d in db.expenses.find({"_id": {"$in": ids[:4]}}, sort=[("_id", 1)])] == [datetime, datetime, str, datetime]
+
+    db.migrations.update_one({"_id": NAME}, {"$set": {"resumed": True}})
+    calls.clear()
+    backend_app.run_migrations()
+    assert calls[0]["last_id"] == ids[3]  # picks up after the last stored batch, not from the start
+    state = db.migrations.find_one({"_id": NAME})
+    assert state["done"] and (state["converted"], state["skipped"]) == (5, 2)  # each row counted exactly once
+    assert f"{NAME}: 5 converted, 2 skipped" in capsys.readouterr().out
+    left = {d["date"] for d in db.expenses.find({"date": {"$type": "string"}})}
+    assert left == {"garbage", ""}
+    assert db.expenses.find_one({"_id": ids[1]})["date"] == datetime(2024, 1, 6)
+
+    calls.clear()
+    backend_app.run_migrations()  # finished migrations are not run again
+    assert calls == []
@@ -0,0 +1,82 @@
+# backend/tests/test_patterns.py
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from pymongo import ASCENDING
+
+import patterns
+
+DAY = datetime(2024, 5, 6)
+
+
+@pytest.fixture
+def colls():
+    db = mongomock.MongoClient().patterns_test
+    db.pattern_state.create_index([("user_id", ASCENDING)], unique=True)
+    db.flag_patterns.create_index([("user_id", ASCENDING), ("type", ASCENDING), ("key", ASCENDING)], unique=True)
+    return db.pattern_state, db.flag_patterns
+
+
+def expense(i, amt=10.0, uid="u1", mood="neutral"):
+    return {"_id": f"e{i}", "user_id": uid, "amt": amt, "allele_frequency": "wants", "mood": mood,
+            "date": DAY + timedelta(days=i), "time": "12:00"}
+
+
+class RacingStates:
+    """pattern_state wrapper: another request for the same user lands between our read and our write."""
+
+    def __init__(self, coll, flag_coll, concurrent):
+        self.coll, self.flag_coll, self.concurrent = coll, flag_coll, list(concurrent)
+
+    def find(self, *args, **kw):
+        docs = list(self.coll.find(*args, **kw))
+        if self.concurrent:
+            patterns.detect(self.coll, self.flag_coll, [self.concurrent.pop()])
+        return docs
+
+    def bulk_write(self, *args, **kw):
+        return self.coll.bulk_write(*args, **kw)
+
+
+def test_state_is_versioned(colls):
+    state, flags = colls
+    patterns.detect(state, flags, [expense(0)])
+    patterns.detect(state, flags, [expense(1), expense(2, uid="u2")])
+    assert state.find_one({"user_id": "u1"})["version"] == 2
+    assert state.find_one({"user_id": "u2"})["version"] == 1
+
+
+def test_concurrent_update_is_not_lost(colls):
+    state, flags = colls
+    patterns.detect(state, flags, [expense(0)])
+    racing = RacingStates(state, flags, [expense(1)])
+    patterns.detect(racing, flags, [expense(2), expense(3, uid="u2")])
+    s = state.find_one({"user_id": "u1"})
+    assert s["cats"]["wants"]["n"] == 3 and s["version"] == 3
+    assert state.find_one({"user_id": "u2"})["cats"]["wants"]["n"] == 1
+
+
+def test_flags_only_for_written_states(colls):
+    state, flags = colls
+    patterns.detect(state, flags, [expense(0, mood="impulse"), expense(1, mood="impulse")])
+    racing = RacingStates(state, flags, [expense(2, mood="neutral")])
+    found = patterns.detect(racing, flags, [expense(3, mood="impulse")])
+    # the concurrent neutral expense broke the streak, so the re-run must not flag one
+    assert found == [] and flags.count_documents({"type": "impulse_streak"}) == 0
+
+
+def test_legacy_state_without_version(colls):
+    state, flags = colls
+    state.insert_one(patterns.new_state("u1"))
+    patterns.detect(state, flags, [expense(0)])
+    assert state.find_one({"user_id": "u1"})["version"] == 1
+
+
+@pytest.mark.parametrize("limit, expected", [("abc", 3), ("0", 1), ("-4", 1), ("2", 2), ("5000", 3)])
+def test_flags_limit_is_parsed_and_clamped(backend_app, db, make_user, limit, expected):
+    uid, auth = make_user()
+    db.flag_patterns.insert_many([{"user_id": uid, "type": "spike", "key": str(i), "level": 2.0, "day": DAY,
+                                   "created_at": DAY + timedelta(minutes=i)} for i in range(3)])
+    r = backend_app.app.test_client().get(f"/flags?limit={limit}", headers=auth)
+    assert r.status_code == 200 and len(r.get_json()["items"]) == expected
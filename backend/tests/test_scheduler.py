@@ -0,0 +1,146 @@
+# backend/tests/test_scheduler.py
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from scheduler import ChangeFeed, FakeClock, Scheduler, ensure_indexes
+
+START = datetime(2024, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def mdb():
+    db = mongomock.MongoClient().scheduler_test
+    ensure_indexes(db)
+    return db
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(START)
+
+
+def add_bill(db, name="Rent", due="2024-05-06", **extra):
+    doc = {"user_id": "u1", "name": name, "amt": 900.0, "next_due": due, "status": "active", "cadence": "monthly", **extra}
+    doc["_id"] = db.bills.insert_one(doc).inserted_id
+    return doc
+
+
+def change(op, doc):
+    return {"operationType": op, "documentKey": {"_id": doc["_id"]}, "fullDocument": doc}
+
+
+def test_fires_once_when_the_reminder_comes_due(mdb, clock):
+    add_bill(mdb)
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    assert s.load() == 1
+    assert s.next_wakeup() == datetime(2024, 5, 4)
+    assert s.fire_due() == 0
+    clock.advance(days=3)
+    assert s.fire_due() == 1
+    assert s.fire_due() == 0
+    n = mdb.notifications.find_one()
+    assert n["next_due"] == "2024-05-06" and n["message"] == "Rent (900.00) due in 2 days"
+
+
+def test_reschedule_drops_the_old_entry_lazily(mdb, clock):
+    bill = add_bill(mdb)
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    s.apply_change(change("update", {**bill, "next_due": "2024-05-20"}))
+    assert len(s.heap) == 2  # the old entry stays until it surfaces
+    assert s.next_wakeup() == datetime(2024, 5, 18)
+    assert len(s.heap) == 1
+    clock.advance(days=5)
+    assert s.fire_due() == 0
+    clock.advance(days=12)
+    assert s.fire_due() == 1
+    assert mdb.notifications.find_one()["next_due"] == "2024-05-20"
+
+
+def test_delete_and_pause_cancel_the_reminder(mdb, clock):
+    rent, phone = add_bill(mdb), add_bill(mdb, "Phone", "2024-05-03")
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    s.apply_change({"operationType": "delete", "documentKey": {"_id": rent["_id"]}})
+    s.apply_change(change("update", {**phone, "status": "pause"}))
+    clock.advance(days=10)
+    assert s.fire_due() == 0 and s.next_wakeup() is None
+
+
+def test_update_of_an_unqueued_bill_without_next_due(mdb, clock):
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    bill = add_bill(mdb, due=None)
+    s.apply_change(change("update", bill))  # used to raise KeyError
+    assert bill["_id"] not in s.live
+    s.apply_change(change("update", {**bill, "next_due": "2024-05-02"}))
+    assert s.fire_due() == 1
+
+
+def test_same_due_date_refreshes_without_requeueing(mdb, clock):
+    bill = add_bill(mdb)
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    s.apply_change(change("update", {**bill, "name": "Rent (flat)", "amt": 950.0}))
+    assert len(s.heap) == 1 and s.live[bill["_id"]][1]["name"] == "Rent (flat)"
+    clock.advance(days=3)
+    s.fire_due()
+    assert mdb.notifications.find_one()["message"].startswith("Rent (flat) (950.00)")
+
+
+def test_restart_does_not_repeat_a_reminder(mdb, clock):
+    add_bill(mdb, due="2024-05-02")
+    assert Scheduler(mdb.bills, mdb.notifications, clock).load() == 1
+    first = Scheduler(mdb.bills, mdb.notifications, clock)
+    first.load()
+    assert first.fire_due() == 1
+    again = Scheduler(mdb.bills, mdb.notifications, clock)
+    again.load()
+    assert again.fire_due() == 0
+    assert mdb.notifications.count_documents({}) == 1
+
+
+def test_run_sleeps_until_each_reminder(mdb, clock):
+    add_bill(mdb, due="2024-05-06")
+    add_bill(mdb, "Phone", due="2024-05-10")
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    assert s.run(until=START + timedelta(days=14)) == 2
+    assert [n["created_at"] for n in mdb.notifications.find().sort("created_at", 1)] == [datetime(2024, 5, 4), datetime(2024, 5, 8)]
+
+
+class ArrivingClock(FakeClock):
+    """FakeClock whose sleeps deliver changes to `feed` at their arrival times."""
+    def __init__(self, start, feed, arrivals):
+        super().__init__(start)
+        self.feed, self.arrivals = feed, sorted(arrivals, key=lambda a: a[0])
+
+    def sleep(self, seconds, wake=None):
+        if self.arrivals and self.arrivals[0][0] <= self.t + timedelta(seconds=max(0.0, seconds)):
+            at, doc = self.arrivals.pop(0)
+            self.t = max(self.t, at)
+            self.feed.push(doc)
+        super().sleep(seconds, wake)
+
+
+def test_a_change_wakes_the_sleep(mdb):
+    feed = ChangeFeed()
+    bill = {"_id": "b1", "user_id": "u1", "name": "Gym", "amt": 30.0, "next_due": "2024-05-02", "status": "active"}
+    clock = ArrivingClock(START, feed, [(START + timedelta(seconds=10), change("insert", bill))])
+    s = Scheduler(mdb.bills, mdb.notifications, clock, lead_days=2)
+    s.load()
+    assert s.run(feed, until=START + timedelta(minutes=5)) == 1
+    # sent when the insert arrived, not at the end of an IDLE_POLL_SECONDS sleep
+    assert mdb.notifications.find_one()["created_at"] == START + timedelta(seconds=10)
+
+
+def test_change_feed_reads_the_stream_on_a_thread():
+    events = [{"operationType": "delete", "documentKey": {"_id": i}} for i in range(3)]
+    feed = ChangeFeed(iter(events)).start()
+    feed.thread.join(5)
+    assert feed.changed.is_set()
+    assert [feed.try_next() for _ in events] == events
+    with pytest.raises(RuntimeError):
+        feed.try_next()  # the stream ended: fail loudly instead of sleeping through changes
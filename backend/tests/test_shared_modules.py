@@ -0,0 +1,20 @@
+# backend/tests/test_shared_modules.py
+"""Modules copied into the other backends must stay byte-identical to the originals here."""
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+COPIES = sorted(BACKEND.parent.glob("*/backend"))
+SHARED = ["recurrence.py", "forecast.py", "cashflow.py"]
+
+
+@pytest.mark.parametrize("name", SHARED)
+def test_copies_are_identical(name):
+    original = (BACKEND / name).read_bytes()
+    copies = [d / name for d in COPIES if (d / name).exists()]
+    assert all(c.read_bytes() == original for c in copies), [str(c) for c in copies if c.read_bytes() != original]
+
+
+def test_recurrence_is_shared_by_every_backend():
+    assert {d.parent.name for d in COPIES if (d / "recurrence.py").exists()} >= {"huping", "smartspend", "SmartSpend_Full_Stack"}
@@ -8,7 +8,10 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import func
 
 from models import db, User, Transaction, Bill, Achievement, Goal
+import numpy as np
+
 from ml import predict_next7_burn, compute_runway
+from scenarios import spend_by_nwg, bill_schedule, expand_grid, evaluate_scenarios, NWG
 
 def create_app():
     app = Flask(__name__)
@@ -86,12 +89,20 @@ def create_app():
         return jsonify({"message": "Updated"})
 
     # ---------------------- DASHBOARD SNAPSHOT ----------------------
-    @app.get("/api/dashboard")
-    def dashboard():
+    def current_balance():
         # total balance = sum(income) - sum(expense)
         inc = db.session.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(Transaction.type=="income").scalar()
         exp = db.session.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(Transaction.type=="expense").scalar()
-        balance = float(inc) - float(exp)
+        return float(inc) - float(exp)
+
+    def spend_days(since):
+        # days with at least one expense since `since` (the burn-rate denominator)
+        return db.session.query(func.count(func.distinct(func.date(Transaction.occurred_at))))\
+            .filter(Transaction.type=="expense", Transaction.occurred_at>=since).scalar() or 0
+
+    @app.get("/api/dashboard")
+    def dashboard():
+        balance = current_balance()
         # Burn rate = average daily expense in last N days (default 30)
         days = int(request.args.get("days", 30))
         since = datetime.utcnow() - timedelta(days=days)
@@ -100,8 +111,8 @@ def create_app():
             .group_by(func.date(Transaction.occurred_at)).all()
         burn_rate = round((sum([float(s or 0) for _, s in day_expenses]) / max(len(day_expenses), 1)), 2)
 
-        goal = Goal.query.first()
-        current_regular, power_save = compute_runway(balance, burn_rate, goal.goal_days if goal else 30)
+        bills = Bill.query.filter_by(active=True).all()
+        current_regular, power_save = compute_runway(balance, bills)
         next7 = predict_next7_burn()
 
         return jsonify({
@@ -112,6 +123,59 @@ def create_app():
             "next7_burn": next7
         })
 
+    # ---------------------- RUNWAY SCENARIOS ----------------------
+    @app.post("/api/runway/scenarios")
+    def runway_scenarios():
+        """
+        Body: {"scenarios": [{"name", "cuts": {"Want": 30, "Guilt": 100}, "pause_bills": [bill ids], "extra_income": per month}],
+               "grid": {"Want": [0, 25, 50], "extra_income": [0, 200]},   # optional, expanded to every combination
+               "horizon": 90, "days": 30, "balances": true}
+        Row 0 of the result is always the baseline (no changes).
+        """
+        data = request.get_json(force=True, silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "body must be a JSON object"}), 400
+        try:
+            horizon = min(max(int(data.get("horizon", 90)), 1), 730)
+            days = min(max(int(data.get("days", 30)), 1), 3650)  # a huge lookback overflows timedelta
+            if not isinstance(data.get("scenarios") or [], list):
+                raise ValueError("scenarios must be a list")
+            scenarios = [{"name": "baseline"}] + list(data.get("scenarios") or []) + expand_grid(data.get("grid") or {})
+            balance = current_balance()
+            since = datetime.utcnow() - timedelta(days=days)
+            # average spend per spending day, split by NWG; bills are charged on their due dates instead,
+            # so their average daily cost is taken out of the observed spend (it usually includes them)
+            bills = Bill.query.filter_by(active=True).order_by(Bill.id).all()
+            bill_matrix = bill_schedule(bills, date.today(), horizon)
+            by_nwg = spend_by_nwg(since) / max(spend_days(since), 1)
+            observed = by_nwg.sum()
+            discretionary = max(observed - bill_matrix.sum() / horizon, 0.0)
+            daily_spend = by_nwg * (discretionary / observed if observed > 0 else 0.0)
+            goal = Goal.query.first()
+            goal_days = goal.goal_days if goal else 30
+            result = evaluate_scenarios(balance, daily_spend, bill_matrix, [b.id for b in bills], scenarios, goal_days)
+        except (TypeError, ValueError, OverflowError) as e:  # OverflowError: int() of an Infinity literal
+            return jsonify({"error": str(e)}), 400
+
+        rows = [{"name": s.get("name") or f"scenario {i}", "runway_days": result["runway_days"][i],
+                 "meets_goal": result["meets_goal"][i], "daily_spend": result["daily_spend"][i],
+                 "min_balance": result["min_balance"][i], "end_balance": result["end_balance"][i],
+                 "cuts": s.get("cuts") or {}, "pause_bills": s.get("pause_bills") or [], "extra_income": s.get("extra_income") or 0}
+                for i, s in enumerate(scenarios)]
+        out = {
+            "balance": round(balance, 2),
+            "goal_days": goal_days,
+            "horizon": horizon,
+            "daily_spend": dict(zip(NWG, np.round(daily_spend, 2).tolist())),
+            "bills": [{"id": b.id, "name": b.name, "amount": b.amount, "cadence": b.cadence} for b in bills],
+            "baseline": rows[0],
+            "scenarios": rows[1:],
+            "runway_days": result["runway_days"],
+        }
+        if data.get("balances", True):
+            out["balances"] = result["balances"].tolist()  # scenarios x horizon, end-of-day balance
+        return jsonify(out)
+
     # ---------------------- TRANSACTIONS ----------------------
     @app.get("/api/transactions")
     def list_tx():
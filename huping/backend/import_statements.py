@@ -0,0 +1,195 @@
+# backend/import_statements.py
+"""Stream a CSV or OFX bank statement into the transaction table.
+
+    python import_statements.py statement.csv
+    python import_statements.py export.ofx --chunk 1000
+    python import_statements.py bank.csv --map amount=Amount --map occurred_at="Posted Date" --date-format %m/%d/%Y
+
+Rows are read lazily and written one chunk at a time with a single executemany INSERT, so memory
+stays flat however large the file is. Every row gets a dedupe_key, which makes re-importing the
+same statement a no-op.
+"""
+import argparse
+import csv
+import hashlib
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import insert, select
+
+from app import app
+from models import db, Transaction
+
+# Transaction field -> CSV column; override per bank with --map field=Column
+DEFAULT_CSV_MAP = {
+    "type": "type", "amount": "amount", "merchant": "merchant", "nwg": "nwg", "mood": "mood",
+    "late_night": "late_night", "note": "note", "occurred_at": "occurred_at", "id": "id",
+}
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+# YYYYMMDD[HHMMSS][.xxx][[+-N[.N]:TZ]], e.g. 20240105, 20240105093000.000[-5:EST], 20240105[+5.5:IST]
+OFX_WHEN = re.compile(r"(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::[^\]]*)?\])?")
+
+
+def parse_local(value, date_format=None):
+    """Parse a statement timestamp into (wall-clock datetime, UTC offset in hours or None)."""
+    value = (value or "").strip()
+    if not value:
+        raise ValueError("missing date")
+    if date_format:
+        return datetime.strptime(value, date_format), None
+    m = OFX_WHEN.fullmatch(value)
+    if m:
+        day, clock, offset = m.groups()
+        when = datetime.strptime(day + (clock or ""), "%Y%m%d%H%M%S" if clock else "%Y%m%d")
+        return when, float(offset) if offset else None
+    when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        return when, None
+    return when.replace(tzinfo=None), when.utcoffset().total_seconds() / 3600
+
+
+def parse_when(value, date_format=None):
+    """Parse a statement timestamp to naive UTC: ISO-8601, OFX (YYYYMMDD[HHMMSS][.xxx][[+-N:TZ]]) or --date-format."""
+    when, offset = parse_local(value, date_format)
+    return when - timedelta(hours=offset) if offset else when
+
+
+def to_row(raw, date_format=None):
+    """Map one raw statement record to Transaction column values."""
+    amount = float(str(raw.get("amount", "")).replace(",", "").strip())
+    tx_type = (raw.get("type") or "").strip().lower()
+    if tx_type not in ("income", "expense"):
+        # bank exports sign the amount: debits are negative
+        tx_type = "expense" if amount < 0 else "income"
+    local, offset = parse_local(raw.get("occurred_at"), date_format)
+    occurred_at = local - timedelta(hours=offset) if offset else local
+    late_night = raw.get("late_night")
+    if late_night in (None, ""):
+        # judged on the statement's own clock; date-only statements land on midnight, so only trust the hour
+        # when there is a time part
+        has_time = (local.hour, local.minute, local.second) != (0, 0, 0)
+        late_night = has_time and (local.hour >= 22 or local.hour < 5)
+    else:
+        late_night = str(late_night).strip().lower() in ("1", "true", "yes", "y")
+    return {
+        "type": tx_type,
+        "amount": abs(amount),
+        "merchant": (raw.get("merchant") or "").strip() or None,
+        "nwg": raw.get("nwg") or None,
+        "mood": raw.get("mood") or None,
+        "late_night": late_night,
+        "note": raw.get("note") or None,
+        "occurred_at": occurred_at,
+    }
+
+
+def iter_csv(fh, mapping):
+    """Yield raw records from a CSV file, renamed to Transaction fields."""
+    for rec in csv.DictReader(fh):
+        yield {field: rec.get(col) for field, col in mapping.items() if col in rec}
+
+
+def iter_ofx(fh):
+    """Yield raw records from the <STMTTRN> blocks of an OFX file (SGML or XML flavour)."""
+    cur = None
+    for line in fh:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and cur is not None:
+                    yield {
+                        "id": cur.get("FITID"),
+                        "amount": cur.get("TRNAMT"),
+                        "occurred_at": cur.get("DTPOSTED"),
+                        "merchant": cur.get("NAME") or cur.get("PAYEE"),
+                        "note": cur.get("MEMO"),
+                    }
+                cur = None if closing else {}
+            elif cur is not None and not closing:
+                cur[tag] = value.strip()
+
+
+def with_dedupe_keys(rows):
+    """Attach a stable dedupe_key to each (line_no, row, source_id) triple.
+
+    The key comes from the bank's own transaction id when the statement carries one, otherwise from
+    the row contents. Identical back-to-back rows (two coffees in the same minute) are told apart by
+    their position within the run, which keeps the state constant-size.
+    """
+    prev, run = None, 0
+    for line_no, row, source_id in rows:
+        if source_id:
+            base = f"id|{source_id}"
+        else:
+            base = "|".join([row["type"], f"{row['amount']:.2f}", row["occurred_at"].isoformat(), row["merchant"] or "", row["note"] or ""])
+        run = run + 1 if base == prev else 0
+        prev = base
+        row["dedupe_key"] = hashlib.sha1(f"{base}|{run}".encode()).hexdigest()
+        yield line_no, row
+
+
+def chunked(it, size):
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_file(path, fmt=None, chunk_size=500, mapping=None, date_format=None, out=sys.stderr):
+    """Import one statement file; returns counts of read/inserted/duplicate/bad rows."""
+    fmt = fmt or ("ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv")
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "bad": 0}
+    started = time.perf_counter()
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as fh:
+        records = iter_ofx(fh) if fmt == "ofx" else iter_csv(fh, {**DEFAULT_CSV_MAP, **(mapping or {})})
+
+        def parsed():
+            for line_no, raw in enumerate(records, start=1):
+                stats["read"] += 1
+                try:
+                    yield line_no, to_row(raw, date_format), raw.get("id")
+                except (TypeError, ValueError) as ex:
+                    stats["bad"] += 1
+                    print(f"[IMPORT] record {line_no} skipped: {ex}", file=out)
+
+        for chunk in chunked(with_dedupe_keys(parsed()), chunk_size):
+            rows = {row["dedupe_key"]: row for _, row in chunk}
+            existing = set(db.session.execute(
+                select(Transaction.dedupe_key).where(Transaction.dedupe_key.in_(list(rows)))).scalars())
+            fresh = [row for key, row in rows.items() if key not in existing]
+            if fresh:
+                db.session.execute(insert(Transaction), fresh)
+            db.session.commit()
+            stats["inserted"] += len(fresh)
+            stats["duplicates"] += len(chunk) - len(fresh)
+    elapsed = time.perf_counter() - started
+    stats["rows_per_sec"] = round(stats["read"] / elapsed, 1) if elapsed else None
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import a CSV/OFX statement into SmartSpend transactions.")
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=["csv", "ofx"], help="defaults to the file extension")
+    ap.add_argument("--chunk", type=int, default=500, help="rows per INSERT batch (default 500)")
+    ap.add_argument("--map", action="append", default=[], metavar="FIELD=COLUMN",
+                    help="CSV column for a Transaction field, e.g. amount=Amount")
+    ap.add_argument("--date-format", help="strptime format for the date column, e.g. %%m/%%d/%%Y")
+    args = ap.parse_args(argv)
+    mapping = dict(m.split("=", 1) for m in args.map)
+    unknown = set(mapping) - set(DEFAULT_CSV_MAP)
+    if unknown:
+        ap.error(f"unknown field(s): {', '.join(sorted(unknown))}")
+    with app.app_context():
+        stats = import_file(args.path, args.format, max(1, args.chunk), mapping, args.date_format)
+    print(f"[IMPORT] {stats['read']} read, {stats['inserted']} inserted, {stats['duplicates']} duplicates, "
+          f"{stats['bad']} bad ({stats['rows_per_sec']} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
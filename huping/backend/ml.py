@@ -1,25 +1,55 @@
 # backend/ml.py
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+import numpy as np
 from sqlalchemy import func
 from models import db, Transaction
+from forecast import forecast
+from cashflow import daily_amounts, simulate, runway_days
 
-def predict_next7_burn():
-    """Simple moving-average baseline: mean of last 7 daily expenses as 'next 7 days burn rate'"""
-    since = datetime.utcnow() - timedelta(days=7)
-    day_expenses = db.session.query(func.date(Transaction.occurred_at), func.sum(Transaction.amount))\
-        .filter(Transaction.type=="expense", Transaction.occurred_at>=since)\
+FORECAST_HISTORY_DAYS = 364
+RUNWAY_HORIZON = 90
+POWER_SAVE = 0.7  # power-save mode keeps 70% of discretionary spend
+
+def daily_expenses(start: date, days: int):
+    """Dense length-`days` array of expense totals per day from `start`."""
+    rows = db.session.query(func.date(Transaction.occurred_at), func.sum(Transaction.amount))\
+        .filter(Transaction.type=="expense", Transaction.occurred_at>=datetime.combine(start, datetime.min.time()))\
         .group_by(func.date(Transaction.occurred_at)).all()
-    if not day_expenses:
-        return 0.0
-    avg = sum([float(v or 0) for _, v in day_expenses]) / len(day_expenses)
-    return round(avg, 2)
+    out = np.zeros(days)
+    for day, total in rows:
+        i = (date.fromisoformat(str(day)) - start).days
+        if 0 <= i < days:
+            out[i] += float(total or 0)
+    return out
+
+def spend_forecast(today: date, horizon: int, history_days: int = FORECAST_HISTORY_DAYS):
+    """(horizon,) expected spend per day from `today`, from the shared SES + day-of-week model (forecast.py)
+    fitted on daily expense totals since the first recorded expense, up to yesterday."""
+    start = today - timedelta(days=history_days)
+    history = daily_expenses(start, history_days)
+    spent = np.flatnonzero(history)
+    if not spent.size:
+        return np.zeros(horizon)
+    first = start + timedelta(days=int(spent[0]))
+    return forecast(history[spent[0]:], horizon, first.weekday())["mean"]
+
+def predict_next7_burn(today: date = None, history_days: int = FORECAST_HISTORY_DAYS):
+    """Expected average daily spend over the next 7 days."""
+    today = today or datetime.utcnow().date()
+    return round(float(spend_forecast(today, 7, history_days).mean()), 2)
+
+def bill_docs(bills):
+    """Bill rows as the dicts recurrence.py and cashflow.py work on."""
+    return [{"next_due": b.next_due, "cadence": b.cadence or "monthly", "amt": float(b.amount or 0)} for b in bills]
 
-def compute_runway(balance: float, burn_rate: float, goal_days: int):
-    """Compute current runway and a hypothetical power-save runway (+30% improvement)."""
-    if burn_rate <= 0:
-        current = goal_days
-        power = goal_days + 10
-    else:
-        current = int(balance / burn_rate) if balance > 0 else 0
-        power = int(balance / (burn_rate * 0.7)) if balance > 0 else 0  # 30% saving
-    return current, power
+def compute_runway(balance: float, bills, today: date = None, horizon: int = RUNWAY_HORIZON):
+    """(regular, power-save) days until the simulated balance goes negative (cashflow.py).
+    Bills are charged on their due dates, overdue ones today; the rest of the forecast spend, less the
+    bills' average daily cost (expenses usually include bill payments), is spent every day. Power save
+    cuts that discretionary spend by 30%."""
+    today = today or datetime.utcnow().date()
+    due = daily_amounts(bill_docs(bills), today, horizon)
+    spend = np.maximum(spend_forecast(today, horizon) - due.sum() / horizon, 0.0)
+    sim = simulate(balance, np.zeros(horizon), due, np.stack([spend, spend * POWER_SAVE]))
+    regular, power = runway_days(sim).tolist()
+    return regular, power
@@ -21,6 +21,7 @@ class Transaction(db.Model):
     late_night = db.Column(db.Boolean, default=False)
     note = db.Column(db.Text)
     occurred_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dedupe_key = db.Column(db.String(40), unique=True)  # set by import_statements.py; NULL for manual entries
 
     def to_dict(self):
         return {
@@ -0,0 +1,174 @@
+# backend/recurrence.py
+"""Bill cadence math shared by every backend in this repo, so they all agree on due dates.
+
+backend/recurrence.py is the original; huping/backend/, smartspend/backend/ and SmartSpend_Full_Stack/backend/
+carry byte-identical copies (backend/tests/test_shared_modules.py checks). Edit this file and copy it over.
+
+Cadences: "weekly", "biweekly", "monthly", "quarterly", "yearly" or a whole number of days ("10"). Anything
+else is treated as monthly. A bill's k-th occurrence is computed directly from its next_due
+(k = 0), never by stepping one cycle at a time:
+
+- day cadences:   next_due + k * N days
+- month cadences: the month k * (1, 3 or 12) months after next_due, on the anchor day clamped to the
+                  month's length. The anchor is the bill's `anchor_day` (the day of month it was
+                  created on), so a bill anchored on the 31st falls on Feb 28/29, Apr 30 and May 31.
+                  It is never pulled back to the 28th for good. Without an anchor_day, next_due's own day is used.
+
+Everything is vectorised over bills with NumPy datetime64[D]. `expand` projects all occurrences
+of many bills over a range in one call, and `catch_up` says how many cycles an overdue bill is behind.
+"""
+from datetime import date, datetime
+
+import numpy as np
+
+CADENCES = {"weekly": ("D", 7), "biweekly": ("D", 14), "monthly": ("M", 1), "quarterly": ("M", 3), "yearly": ("M", 12)}
+
+
+def parse_cadence(cadence):
+    """(unit, step): unit "D" for day steps, "M" for month steps."""
+    if cadence in CADENCES:
+        return CADENCES[cadence]
+    try:
+        n = int(str(cadence).strip())
+        if n > 0:
+            return "D", n
+    except (TypeError, ValueError):
+        pass
+    return CADENCES["monthly"]
+
+
+def _as_day(value):
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]")
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return np.datetime64(value, "D")
+    return np.datetime64(str(value)[:10], "D")
+
+
+class Schedule:
+    """Column arrays describing a set of bills, ready for vectorised occurrence math."""
+
+    def __init__(self, due, cadences, anchor_days=None):
+        self.due = _days(due)
+        parsed = {c: parse_cadence(c) for c in set(cadences)}
+        self.monthly = np.array([parsed[c][0] == "M" for c in cadences], dtype=bool)
+        self.step = np.array([parsed[c][1] for c in cadences], dtype=np.int64)
+        # plain int64 day / month numbers since 1970; calendar conversions of big datetime64 arrays are slow
+        self.day_no = self.due.astype(np.int64)
+        self.month_no = self.due.astype("datetime64[M]").astype(np.int64)
+        first, length = _month_bounds(self.month_no)
+        day = self.day_no - first + 1
+        anchor = day if anchor_days is None else np.array([a or 0 for a in anchor_days], dtype=np.int64)
+        # trust anchor_day only if next_due is where that anchor lands this month (next_due may have been edited)
+        consistent = np.minimum(anchor, length) == day
+        self.anchor = np.where(consistent & (anchor > 0), anchor, day)
+
+    @classmethod
+    def from_bills(cls, bill_docs):
+        docs = list(bill_docs)
+        try:
+            due = _days([b.get("next_due") for b in docs])
+        except (TypeError, ValueError):
+            docs = [b for b in docs if _valid_due(b.get("next_due"))]
+            due = _days([b["next_due"] for b in docs])
+        return docs, cls(due, [b.get("cadence") for b in docs], [b.get("anchor_day") for b in docs])
+
+    def occurrence(self, k, rows=None):
+        """Date of occurrence k (0 = next_due) for each bill, or for the bills at index `rows`."""
+        sel = slice(None) if rows is None else rows
+        k = np.asarray(k, dtype=np.int64)
+        by_day = self.day_no[sel] + k * self.step[sel]
+        first, length = _month_bounds(self.month_no[sel] + k * self.step[sel])
+        by_month = first + np.minimum(self.anchor[sel], length) - 1
+        return np.where(self.monthly[sel], by_month, by_day).astype("datetime64[D]")
+
+    def first_index(self, target, rows=None, past=False):
+        """Smallest k >= 0 whose occurrence falls on or after `target` (a date or per-bill array).
+        With past=True k may be negative: the schedule is projected back before next_due."""
+        sel = slice(None) if rows is None else rows
+        t = np.asarray(target, dtype="datetime64[D]")
+        step = self.step[sel]
+        by_day = -((self.day_no[sel] - t.astype(np.int64)) // step)                  # ceil((t - due) / step)
+        months = t.astype("datetime64[M]").astype(np.int64) - self.month_no[sel]
+        by_month = -(-months // step)
+        k = np.where(self.monthly[sel], by_month, by_day)
+        if not past:
+            k = np.maximum(k, 0)
+        # a month cadence can land earlier in t's month than t itself
+        return k + (self.occurrence(k, rows) < t)
+
+
+def _days(values):
+    # one vectorised parse for the usual case of ISO strings; raises ValueError on a bad value
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[D]")
+    if all(isinstance(v, str) for v in values):
+        return np.array([v[:10] for v in values], dtype="datetime64[D]")
+    return np.array([_as_day(v) for v in values], dtype="datetime64[D]")
+
+
+def _month_bounds(month_no):
+    """(first day number, length in days) of each month number, via a table over the months spanned."""
+    month_no = np.asarray(month_no, dtype=np.int64)
+    if month_no.size == 0:
+        return month_no, month_no
+    lo = int(month_no.min())
+    starts = np.arange(lo, int(month_no.max()) + 2).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    i = month_no - lo
+    return starts[i], starts[i + 1] - starts[i]
+
+
+def _valid_due(value):
+    try:
+        _as_day(value)
+        return value is not None
+    except (TypeError, ValueError):
+        return False
+
+
+def expand(bill_docs, start, end, past=False):
+    """All occurrences in [start, end) of many bills at once.
+
+    Returns (docs, rows, dates): the bills with a usable next_due, and for every occurrence the row
+    of its bill in `docs` and its datetime64[D] date, ordered by bill and then date. Occurrences
+    before next_due are only included with past=True (replaying history).
+    """
+    docs, s = Schedule.from_bills(bill_docs)
+    start, end = _as_day(start), _as_day(end)
+    if not docs:
+        return docs, np.zeros(0, dtype=np.int64), np.zeros(0, dtype="datetime64[D]")
+    lo, hi = s.first_index(start, past=past), s.first_index(end, past=past)
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(docs)), counts)
+    # k = lo[row] + position within that bill's run
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return docs, rows, s.occurrence(lo[rows] + offsets, rows)
+
+
+def catch_up(bill_docs, today):
+    """Per bill: how many cycles before `today` are still unpaid, and the first due date on or after today."""
+    docs, s = Schedule.from_bills(bill_docs)
+    behind = s.first_index(_as_day(today))
+    return docs, behind, s.occurrence(behind)
+
+
+def cycles_behind(bill, today):
+    """(cycles behind, next due ISO date on or after today) for one bill."""
+    docs, behind, due = catch_up([bill], today)
+    if not docs:
+        return 0, None
+    return int(behind[0]), str(due[0])
+
+
+def next_due_from(cadence, date_iso, anchor_day=None):
+    """The due date one cycle after `date_iso`, as an ISO date."""
+    s = Schedule([date_iso], [cadence], [anchor_day])
+    return str(s.occurrence(1)[0])
+
+
+def bill_events(bill_docs, start, horizon):
+    """(due day, amt) for every occurrence of the given bills in [start, start + horizon); start is a midnight datetime."""
+    docs, rows, dates = expand(bill_docs, start, _as_day(start) + horizon)
+    return [(datetime.fromisoformat(str(d)), float(docs[r].get("amt", 0))) for r, d in zip(rows.tolist(), dates)]
@@ -0,0 +1,108 @@
+# backend/scenarios.py
+"""What-if runway scenarios, evaluated together in one vectorised pass (POST /api/runway/scenarios).
+
+A scenario cuts discretionary spend per NWG bucket by a percentage, pauses some bills and/or adds
+monthly income. Every scenario becomes a row of a (scenarios x NWG) cut matrix and a (scenarios x bills)
+keep mask; against the (bills x days) due-date matrix from bill_schedule that gives a
+(scenarios x days) flow matrix, which cashflow.simulate turns into balances and runways.
+"""
+import math
+from datetime import date
+from itertools import product
+
+import numpy as np
+from sqlalchemy import func
+
+from cashflow import bill_matrix, simulate, runway_days
+from ml import bill_docs
+from models import db, Transaction
+
+NWG = ("Need", "Want", "Guilt", "Other")  # "Other" = expenses without an nwg tag
+MAX_SCENARIOS = 500
+
+def spend_by_nwg(since):
+    """Expense total per NWG bucket since `since`, as an array ordered like NWG."""
+    rows = db.session.query(Transaction.nwg, func.sum(Transaction.amount))\
+        .filter(Transaction.type=="expense", Transaction.occurred_at>=since)\
+        .group_by(Transaction.nwg).all()
+    out = np.zeros(len(NWG))
+    for nwg, total in rows:
+        key = (nwg or "").capitalize()
+        out[NWG.index(key) if key in NWG else NWG.index("Other")] += float(total or 0)
+    return out
+
+def bill_schedule(bills, start: date, horizon: int):
+    """(bills, horizon) matrix of the amount each bill charges on each day from `start` (recurrence.py cadences).
+    An overdue next_due is charged once on day 0."""
+    return bill_matrix(bill_docs(bills), start, horizon)
+
+def _scenario(spec, bill_ids):
+    """(cuts per NWG as fractions, bill keep mask, extra monthly income) for one scenario dict."""
+    if not isinstance(spec, dict):
+        raise ValueError("each scenario must be an object")
+    raw_cuts, paused = spec.get("cuts") or {}, spec.get("pause_bills") or []
+    if not isinstance(raw_cuts, dict):
+        raise ValueError("cuts must be an object of NWG category -> percentage")
+    if not isinstance(paused, list):
+        raise ValueError("pause_bills must be a list of bill ids")
+    cuts = np.zeros(len(NWG))
+    for key, pct in raw_cuts.items():
+        key = str(key).capitalize()
+        if key not in NWG:
+            raise ValueError(f"unknown NWG category '{key}'")
+        pct = float(pct)
+        if not 0 <= pct <= 100:
+            raise ValueError("cuts are percentages between 0 and 100")
+        cuts[NWG.index(key)] = pct / 100.0
+    paused = {int(b) for b in paused}
+    unknown = paused - set(bill_ids)
+    if unknown:
+        raise ValueError(f"unknown or inactive bills: {sorted(unknown)}")
+    keep = np.array([bid not in paused for bid in bill_ids], dtype=float)
+    extra = float(spec.get("extra_income") or 0)
+    if not math.isfinite(extra):
+        raise ValueError("extra_income must be a finite number")
+    return cuts, keep, extra
+
+def expand_grid(grid):
+    """Cartesian product of {"Need": [...], "Want": [...], "Guilt": [...], "extra_income": [...], "pause_bills": [[...], ...]}."""
+    if not isinstance(grid, dict):
+        raise ValueError("grid must be an object of axis -> list of values")
+    axes = [(k, v if isinstance(v, list) else [v]) for k, v in grid.items()]
+    if not axes:
+        return []  # product() of no axes is one empty combination, which would add a spurious baseline
+    if np.prod([len(vals) for _, vals in axes]) > MAX_SCENARIOS:
+        raise ValueError(f"at most {MAX_SCENARIOS} scenarios per request")
+    specs = []
+    for combo in product(*[vals for _, vals in axes]):
+        spec = {"cuts": {}}
+        for (key, _), val in zip(axes, combo):
+            if key in ("extra_income", "pause_bills"):
+                spec[key] = val
+            else:
+                spec["cuts"][key] = val
+        specs.append(spec)
+    return specs
+
+def evaluate_scenarios(balance: float, daily_spend, bill_matrix, bill_ids, scenarios, goal_days: int):
+    """Evaluate every scenario in one pass.
+    daily_spend: (len(NWG),) average discretionary spend per day; bill_matrix: (bills, horizon) from bill_schedule.
+    Returns the (scenarios, horizon) end-of-day balance matrix plus per-scenario runway (cashflow.runway_days)."""
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"at most {MAX_SCENARIOS} scenarios per request")
+    parsed = [_scenario(s, bill_ids) for s in scenarios]
+    cuts = np.array([p[0] for p in parsed]).reshape(len(parsed), len(NWG))     # S x NWG
+    keep = np.array([p[1] for p in parsed]).reshape(len(parsed), len(bill_ids))  # S x B
+    extra = np.array([p[2] for p in parsed])                                     # S, per month
+
+    spend = (1.0 - cuts) @ daily_spend                                           # S
+    sim = simulate(balance, (extra * 12 / 365.25)[:, None], keep @ bill_matrix, spend[:, None])
+    runway = runway_days(sim)
+    return {
+        "runway_days": runway.tolist(),
+        "meets_goal": (runway >= goal_days).tolist(),
+        "daily_spend": np.round(spend, 2).tolist(),
+        "min_balance": np.round(sim["min_balance"], 2).tolist(),
+        "end_balance": np.round(sim["balance"][:, -1], 2).tolist(),
+        "balances": np.round(sim["balance"], 2),
+    }
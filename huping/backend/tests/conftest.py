@@ -0,0 +1,20 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+import pytest
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+    from models import db
+    with flask_app.app_context():
+        yield flask_app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
@@ -0,0 +1,30 @@
+# backend/tests/test_import_statements.py
+from datetime import datetime
+
+import pytest
+
+from import_statements import parse_when, to_row
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("20240105", datetime(2024, 1, 5)),
+    ("20240105[-5:EST]", datetime(2024, 1, 5, 5)),
+    ("20240105093000.000[-5:EST]", datetime(2024, 1, 5, 14, 30)),
+    ("20240105230000[+5.5:IST]", datetime(2024, 1, 5, 17, 30)),
+    ("20240105093000[0:GMT]", datetime(2024, 1, 5, 9, 30)),
+    ("2024-01-05T10:00:00Z", datetime(2024, 1, 5, 10)),
+    ("2024-01-05T10:00:00+02:00", datetime(2024, 1, 5, 8)),
+])
+def test_parse_when_returns_naive_utc(value, expected):
+    assert parse_when(value) == expected
+
+
+def test_late_night_uses_the_statement_clock():
+    assert to_row({"amount": "-3", "occurred_at": "20240105230000[+5.5:IST]"})["late_night"] is True
+    assert to_row({"amount": "-3", "occurred_at": "20240105[+3:MSK]"})["late_night"] is False
+
+
+def test_bad_dates_raise():
+    for value in ("", "2024-13-40", "20240105[EST]x"):
+        with pytest.raises(ValueError):
+            parse_when(value)
@@ -0,0 +1,70 @@
+# backend/tests/test_ml.py
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from ml import predict_next7_burn, compute_runway
+from models import db, Transaction, Bill
+
+TODAY = date(2024, 3, 4)  # a Monday
+
+
+def spend(day, amount, type="expense"):
+    db.session.add(Transaction(type=type, amount=amount, occurred_at=datetime.combine(day, datetime.min.time()) + timedelta(hours=12)))
+
+
+def test_next7_follows_the_weekly_pattern(app):
+    for d in range(1, 57):
+        day = TODAY - timedelta(days=d)
+        spend(day, 40.0 if day.weekday() >= 5 else 10.0)
+    spend(TODAY - timedelta(days=3), 500.0, type="income")
+    db.session.commit()
+    assert predict_next7_burn(TODAY) == pytest.approx((5 * 10 + 2 * 40) / 7, abs=0.01)
+
+
+def test_leading_days_without_data_are_ignored(app):
+    for d in range(1, 15):
+        spend(TODAY - timedelta(days=d), 20.0)
+    db.session.commit()
+    assert predict_next7_burn(TODAY) == 20.0
+
+
+def test_no_expenses(app):
+    assert predict_next7_burn(TODAY) == 0.0
+
+
+def bill(amount, next_due, cadence="monthly"):
+    b = Bill(name="b", amount=amount, cadence=cadence, next_due=next_due, active=True)
+    db.session.add(b)
+    return b
+
+
+def test_runway_with_nothing_to_spend(app):
+    assert compute_runway(100.0, [], TODAY) == (365.0, 365.0)
+
+
+def test_runway_charges_bills_on_their_due_dates(app):
+    for d in range(1, 29):
+        spend(TODAY - timedelta(days=d), 10.0)
+    rent = bill(200.0, "2024-03-10")
+    db.session.commit()
+    regular, power = compute_runway(220.0, [rent], TODAY)
+    # rent averages 200 * 3 / 90 a day, taken out of the 10/day spend: 3.33/day is discretionary
+    assert regular == 6.0  # Mar 10: 220 - 200 - 7 * 3.33 < 0
+    assert power == 8.0  # 7 * 2.33 spent by Mar 10 leaves 3.67, gone two days later
+
+
+def test_runway_charges_overdue_bills_today(app):
+    late = bill(80.0, "2024-02-20")
+    db.session.commit()
+    assert compute_runway(50.0, [late], TODAY) == (0.0, 0.0)
+    assert compute_runway(100.0, [late], TODAY)[0] > 0
+
+
+def test_power_save_stretches_the_runway(app):
+    for d in range(1, 29):
+        spend(TODAY - timedelta(days=d), 10.0)
+    db.session.commit()
+    regular, power = compute_runway(300.0, [], TODAY)
+    assert regular == 30.0  # end of day 30 is the first below zero: 300 - 31 * 10
+    assert power == 42.0  # 300 - 43 * 7
@@ -0,0 +1,94 @@
+# backend/tests/test_scenarios.py
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models import db, Bill
+from scenarios import NWG, bill_schedule, evaluate_scenarios, expand_grid
+
+START = date(2024, 3, 15)
+
+
+def bill(amount, next_due, cadence="monthly"):
+    return Bill(name="b", amount=amount, cadence=cadence, next_due=next_due, active=True)
+
+
+def test_bill_schedule_follows_the_shared_cadences():
+    out = bill_schedule([bill(10, "2024-01-31"), bill(5, "2024-03-18", "weekly"), bill(90, "2024-04-01", "quarterly"),
+                         bill(1, None)], START, 120)
+    assert out.shape == (4, 120)
+    assert out[0, 0] == 10  # overdue since Jan 31: owed today
+    assert np.flatnonzero(out[0]).tolist() == [0, 16, 46, 77, 107]  # then Mar 31, Apr 30, May 31, Jun 30
+    assert np.flatnonzero(out[1])[:3].tolist() == [3, 10, 17]
+    assert np.flatnonzero(out[2]).tolist() == [17, 108]  # Apr 1, Jul 1
+    assert not out[3].any()
+
+
+def test_expand_grid():
+    specs = expand_grid({"Want": [0, 50], "extra_income": [0, 100], "pause_bills": [[], [1]]})
+    assert len(specs) == 8
+    assert specs[-1] == {"cuts": {"Want": 50}, "extra_income": 100, "pause_bills": [1]}
+
+
+@pytest.mark.parametrize("grid", [[1, 2], {"Want": list(range(30)), "Need": list(range(30))}])
+def test_expand_grid_rejects(grid):
+    with pytest.raises(ValueError):
+        expand_grid(grid)
+
+
+def test_every_scenario_in_one_pass():
+    bills = np.zeros((1, 30))
+    bills[0, 9] = 300.0
+    spend = np.array([5.0, 5.0, 0.0, 0.0])
+    scenarios = [{}, {"cuts": {"want": 100}}, {"pause_bills": [7]}, {"pause_bills": [7], "extra_income": 365.25 / 12 * 10}]
+    r = evaluate_scenarios(400.0, spend, bills, [7], scenarios, goal_days=60)
+    assert r["daily_spend"] == [10.0, 5.0, 10.0, 10.0]
+    assert r["balances"].shape == (4, 30)
+    assert r["runway_days"][0] == 10.0  # 400 - 300 - 10 * 11 at the end of day 10
+    assert r["runway_days"][1] == 20.0  # 400 - 300 - 5 * 21
+    assert r["runway_days"][2] == 40.0  # 400 / 10, extrapolated past the horizon
+    assert r["runway_days"][3] == 365.0  # extra income covers all spend
+    assert r["meets_goal"] == [False, False, False, True]
+    assert r["end_balance"][3] == 400.0
+
+
+@pytest.mark.parametrize("spec", [{"cuts": [10]}, {"cuts": {"Rent": 10}}, {"cuts": {"Want": 120}},
+                                  {"pause_bills": 7}, {"pause_bills": [8]}, {"extra_income": "inf"}, "cheap"])
+def test_bad_scenarios_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        evaluate_scenarios(100.0, np.zeros(len(NWG)), np.zeros((1, 10)), [7], [spec], goal_days=30)
+
+
+def test_endpoint(app):
+    db.session.add(bill(100.0, date.today().isoformat()))
+    db.session.commit()
+    r = app.test_client().post("/api/runway/scenarios", json={"grid": {"Want": [0, 50]}, "horizon": 30, "balances": False})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert len(body["scenarios"]) == 2 and body["baseline"]["runway_days"] == 0.0
+    assert "balances" not in body
+
+
+@pytest.mark.parametrize("body", [[{"cuts": {"Want": 10}}], {"scenarios": {"cuts": {}}}, {"scenarios": [{"cuts": [1]}]},
+                                  {"grid": [1]}, {"scenarios": [3]}])
+def test_endpoint_rejects_malformed_bodies(app, body):
+    r = app.test_client().post("/api/runway/scenarios", json=body)
+    assert r.status_code == 400
+    assert "error" in r.get_json()
+
+
+def test_empty_grid_adds_no_scenarios(app):
+    assert expand_grid({}) == []
+    for body in ({"scenarios": [{"name": "lean", "cuts": {"Want": 50}}]},
+                 {"scenarios": [{"name": "lean", "cuts": {"Want": 50}}], "grid": {}}):
+        r = app.test_client().post("/api/runway/scenarios", json={**body, "balances": False})
+        assert r.status_code == 200
+        assert [row["name"] for row in r.get_json()["scenarios"]] == ["lean"]
+        assert len(r.get_json()["runway_days"]) == 2
+
+
+@pytest.mark.parametrize("raw", ['{"days": 1e300}', '{"days": 100000000000}', '{"days": Infinity}', '{"horizon": -Infinity}'])
+def test_huge_days_or_horizon_is_not_a_500(app, raw):
+    r = app.test_client().post("/api/runway/scenarios", data=raw, content_type="application/json")
+    assert r.status_code in (200, 400)
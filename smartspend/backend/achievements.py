@@ -0,0 +1,111 @@
+"""
+Event-driven achievements.
+
+Routes call record_event(db, user_id, kind, event) for every expense, income and bill payment.
+Each user has one achievement_state document of counters and streaks, so an event costs one
+state read, one state write and at most one upsert per newly met rule, however long the history.
+Awards are upserted on the unique (user_id, code) index with $setOnInsert, so an award is written
+once even if the event is retried. The state carries a `version` and is only replaced if it is
+still the version that was read; when two events for a user race, the loser re-reads the state
+and applies its event again (up to STATE_RETRIES times), so no counter update is lost.
+
+    expense:   {"occurred_at", "nwg"}
+    income:    {"occurred_at", "amount"}
+    bill_paid: {"occurred_at", "due"}     # due = the next_due that was paid
+"""
+from datetime import timedelta
+from pymongo.errors import DuplicateKeyError
+from utils import generate_id, now_iso, parse_date
+
+# code -> (name, description)
+CATALOG = {
+    "first_expense": ("First expense logged", "Logged your first expense."),
+    "streak_7": ("7-day streak", "Logged spending 7 days in a row."),
+    "streak_30": ("30-day streak", "Logged spending 30 days in a row."),
+    "guilt_free_7": ("Guilt-free week", "7 days without a Guilt purchase."),
+    "first_income": ("First paycheck", "Recorded your first income."),
+    "income_1k": ("$1k earned", "Recorded $1,000 of income."),
+    "income_10k": ("$10k earned", "Recorded $10,000 of income."),
+    "first_bill_paid": ("First bill paid", "Marked your first bill paid."),
+    "on_time_3": ("On time x3", "Paid 3 bills in a row on or before their due date."),
+    "on_time_10": ("On time x10", "Paid 10 bills in a row on or before their due date."),
+}
+
+STREAKS = {7: "streak_7", 30: "streak_30"}
+INCOME_THRESHOLDS = {1000: "income_1k", 10000: "income_10k"}
+ON_TIME = {3: "on_time_3", 10: "on_time_10"}
+STATE_RETRIES = 5
+
+
+def _day(value):
+    try:
+        return parse_date(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def apply(state, kind, event):
+    """Advance `state` (mutated in place) with one event; returns the codes the event satisfies."""
+    earned = []
+    day = _day(event.get("occurred_at") or now_iso())
+    if kind == "expense":
+        state["expenses"] = state.get("expenses", 0) + 1
+        if state["expenses"] == 1:
+            earned.append("first_expense")
+        last = _day(state.get("last_expense_day"))
+        if day and (last is None or day > last):
+            state["streak"] = state.get("streak", 0) + 1 if last and day - last == timedelta(days=1) else 1
+            state["last_expense_day"] = day.isoformat()
+            earned += [code for n, code in STREAKS.items() if state["streak"] >= n]
+        if day:
+            if (event.get("nwg") or "").lower() == "guilt":
+                state["last_guilt_day"] = max(day.isoformat(), state.get("last_guilt_day") or "")
+            since = _day(state.get("last_guilt_day") or state.setdefault("first_expense_day", day.isoformat()))
+            if day - since >= timedelta(days=7):
+                earned.append("guilt_free_7")
+    elif kind == "income":
+        state["incomes"] = state.get("incomes", 0) + 1
+        state["income_total"] = state.get("income_total", 0.0) + float(event.get("amount") or 0)
+        if state["incomes"] == 1:
+            earned.append("first_income")
+        earned += [code for n, code in INCOME_THRESHOLDS.items() if state["income_total"] >= n]
+    elif kind == "bill_paid":
+        state["bills_paid"] = state.get("bills_paid", 0) + 1
+        if state["bills_paid"] == 1:
+            earned.append("first_bill_paid")
+        due = _day(event.get("due"))
+        on_time = day is not None and due is not None and day <= due
+        state["on_time_streak"] = state.get("on_time_streak", 0) + 1 if on_time else 0
+        earned += [code for n, code in ON_TIME.items() if state["on_time_streak"] >= n]
+    return [c for c in earned if c not in state.setdefault("earned", [])]
+
+
+def record_event(db, user_id, kind, event):
+    """Feed one event to the user's rule state and persist any new awards; returns the awarded docs."""
+    if not user_id:
+        return []
+    for attempt in range(STATE_RETRIES):
+        state = db.achievement_state.find_one({"user_id": user_id}, {"_id": 0}) or {"user_id": user_id}
+        if event.get("id") and event["id"] == state.get("last_event_id"):
+            return []  # retried event
+        version = state.get("version")
+        codes = apply(state, kind, event)
+        state["earned"] += codes
+        state["last_event_id"] = event.get("id")
+        state["version"] = (version or 0) + 1
+        try:
+            # a concurrent write moved the version on: the filter misses and the upsert hits the unique user_id
+            db.achievement_state.replace_one({"user_id": user_id, "version": version}, state, upsert=True)
+            break
+        except DuplicateKeyError:
+            if attempt == STATE_RETRIES - 1:
+                raise
+
+    awarded = []
+    for code in codes:
+        name, description = CATALOG[code]
+        doc = {"id": generate_id(), "user_id": user_id, "code": code, "name": name,
+               "description": description, "earned_at": (_day(event.get("occurred_at")) or _day(now_iso())).isoformat()}
+        db.achievements.update_one({"user_id": user_id, "code": code}, {"$setOnInsert": doc}, upsert=True)
+        awarded.append(doc)
+    return awarded
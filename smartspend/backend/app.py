@@ -35,6 +35,11 @@ def create_app():
     app.register_blueprint(bills_bp, url_prefix="/api/bills")
     app.register_blueprint(goals_bp, url_prefix="/api/goals")
 
+    # ---------------- INDEX COMMANDS ----------------
+    from indexes import create_indexes_cmd, check_plans_cmd
+    app.cli.add_command(create_indexes_cmd)
+    app.cli.add_command(check_plans_cmd)
+
     # ---------------- PING ROUTE ----------------
     @app.route("/api/ping")
     def ping():
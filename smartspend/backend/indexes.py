@@ -0,0 +1,128 @@
+"""
+Declarative index registry for the blueprint backend.
+
+INDEXES lists every index the routes rely on; QUERY_SHAPES lists every query the routes issue
+(with placeholder values). Two CLI commands are registered on the app:
+
+    flask create-indexes   # apply INDEXES (idempotent; run on deploy)
+    flask check-plans      # explain() each shape, exit 1 if any winning plan is a COLLSCAN
+
+tests/test_query_plans.py runs the same check under pytest.
+"""
+import sys
+import click
+from flask import current_app
+from pymongo import ASCENDING, DESCENDING
+
+from utils import after_cursor
+
+# collection -> [(keys, options)]
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"unique": True}),
+        ([("id", ASCENDING)], {"unique": True}),
+    ],
+    "transactions": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("occurred_at", DESCENDING), ("id", DESCENDING)], {}),
+    ],
+    "bills": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("next_due", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "goals": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "achievements": [
+        ([("user_id", ASCENDING), ("code", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("earned_at", DESCENDING)], {}),
+    ],
+    "achievement_state": [
+        ([("user_id", ASCENDING)], {"unique": True}),
+    ],
+}
+
+# (route, collection, sort key, direction) for every list paged with utils.keyset_page
+PAGED_LISTS = [
+    ("transactions.list", "transactions", "occurred_at", DESCENDING),
+    ("bills.list", "bills", "next_due", ASCENDING),
+    ("goals.list", "goals", "created_at", ASCENDING),
+]
+
+def _paged_shapes():
+    """First page and ?cursor page of every PAGED_LISTS entry, built with the filter keyset_page sends."""
+    for route, coll, key, direction in PAGED_LISTS:
+        sort = [(key, direction), ("id", direction)]
+        yield route, coll, {"user_id": "u"}, sort
+        yield f"{route}?cursor", coll, after_cursor({"user_id": "u"}, key, "2024-06-01", "x", direction), sort
+
+# (route, collection, filter, sort) for every query the blueprints send
+QUERY_SHAPES = list(_paged_shapes()) + [
+    ("auth.register/login", "users", {"email": "x@example.com"}, None),
+    ("auth.me", "users", {"id": "u"}, None),
+    ("transactions.list?start&end&type", "transactions",
+     {"user_id": "u", "type": "expense", "occurred_at": {"$gte": "2024-01-01", "$lte": "2024-12-31"}},
+     [("occurred_at", DESCENDING), ("id", DESCENDING)]),
+    ("transactions.list?start&end&type&cursor", "transactions",
+     after_cursor({"user_id": "u", "type": "expense", "occurred_at": {"$gte": "2024-01-01", "$lte": "2024-12-31"}},
+                  "occurred_at", "2024-06-01", "t", DESCENDING),
+     [("occurred_at", DESCENDING), ("id", DESCENDING)]),
+    ("transactions.export", "transactions", {"user_id": "u"}, [("occurred_at", ASCENDING)]),
+    ("transactions.update/delete", "transactions", {"id": "t"}, None),
+    ("bills.export", "bills", {"user_id": "u"}, [("next_due", ASCENDING)]),
+    ("bills.update/delete/mark-paid", "bills", {"id": "b"}, None),
+    ("goals.update/delete", "goals", {"id": "g"}, None),
+    ("goals.achievements", "achievements", {"user_id": "u"}, [("earned_at", DESCENDING)]),
+    ("achievements.record_event", "achievement_state", {"user_id": "u"}, None),
+    ("achievements.record_event/award", "achievements", {"user_id": "u", "code": "streak_7"}, None),
+]
+
+def ensure_indexes(db):
+    """Create every registered index; returns the index names per collection."""
+    created = {}
+    for coll, specs in INDEXES.items():
+        created[coll] = [db[coll].create_index(keys, **opts) for keys, opts in specs]
+    return created
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for v in plan.values():
+            yield from _stages(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            yield from _stages(v)
+
+def plan_stages(db, coll, q, sort=None):
+    """explain() one query shape; returns the stage names of its winning plan."""
+    cur = db[coll].find(q)
+    if sort:
+        cur = cur.sort(sort)
+    return list(_stages(cur.explain()["queryPlanner"]["winningPlan"]))
+
+def collscans(db):
+    """explain() every registered query shape; returns [(route, stages)] whose winning plan scans a collection."""
+    bad = []
+    for route, coll, q, sort in QUERY_SHAPES:
+        stages = plan_stages(db, coll, q, sort)
+        if "COLLSCAN" in stages:
+            bad.append((route, stages))
+    return bad
+
+@click.command("create-indexes")
+def create_indexes_cmd():
+    """Create the indexes declared in indexes.INDEXES."""
+    for coll, names in ensure_indexes(current_app.db).items():
+        click.echo(f"{coll}: {', '.join(names)}")
+
+@click.command("check-plans")
+def check_plans_cmd():
+    """Fail if any route query's winning plan is a COLLSCAN."""
+    bad = collscans(current_app.db)
+    for route, stages in bad:
+        click.echo(f"COLLSCAN {route}: {' <- '.join(stages)}", err=True)
+    if bad:
+        sys.exit(1)
+    click.echo(f"ok: {len(QUERY_SHAPES)} query shapes use an index")
@@ -1,18 +1,33 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils import generate_id, now_iso, next_due_from, parse_date
+from utils import generate_id, now_iso, next_due_from, parse_date, export_response, keyset_page
+from achievements import record_event
 import datetime
 
 bills_bp = Blueprint("bills_bp", __name__)
 
+BILL_FIELDS = {"id","user_id","name","amount","cadence","category","nwg","next_due","status","created_at"}
+
 @bills_bp.route("/", methods=["GET"])
+@jwt_required()
 def list_bills():
-    user_id = request.args.get("user_id")
-    q = {}
-    if user_id:
-        q["user_id"] = user_id
-    bills = list(current_app.db.bills.find(q, {"_id":0}))
-    return jsonify(bills), 200
+    # query parameters: limit, cursor, fields; scoped to the JWT identity, paged on (next_due, id)
+    user_id = get_jwt_identity()
+    try:
+        items, next_cursor = keyset_page(current_app.db.bills, {"user_id": user_id}, "next_due", request.args, BILL_FIELDS)
+    except ValueError:
+        return jsonify({"error":"invalid cursor"}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor}), 200
+
+BILL_EXPORT_FIELDS = ["id", "user_id", "name", "amount", "cadence", "category", "nwg", "next_due", "status", "created_at"]
+
+@bills_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_bills():
+    # streams the caller's bills as NDJSON (default) or CSV: ?format=csv&gzip=1
+    user_id = get_jwt_identity()
+    cur = current_app.db.bills.find({"user_id": user_id}, {"_id":0}, allow_disk_use=True).sort("next_due", 1)
+    return export_response(cur, BILL_EXPORT_FIELDS, "bills")
 
 @bills_bp.route("/", methods=["POST"])
 @jwt_required(optional=True)
@@ -89,7 +104,17 @@ def mark_paid(billid):
     # compute next due
     current_next = bill.get("next_due")
     cadence = bill.get("cadence", "monthly")
-    new_next = next_due_from(cadence, current_next)
-    current_app.db.bills.update_one({"id": billid}, {"$set": {"next_due": new_next, "status": "upcoming"}})
+    # remember the original day of month so a bill due on the 31st returns to it after short months
+    anchor = bill.get("anchor_day")
+    if not anchor:
+        try:
+            anchor = parse_date(current_next).day
+        except (AttributeError, ValueError):
+            anchor = None
+    new_next = next_due_from(cadence, current_next, anchor)
+    current_app.db.bills.update_one({"id": billid}, {"$set": {"next_due": new_next, "status": "upcoming", "anchor_day": anchor}})
+    record_event(current_app.db, tx["user_id"], "expense", tx)
+    record_event(current_app.db, tx["user_id"], "bill_paid",
+                 {"id": f"{billid}:{current_next}", "occurred_at": tx["occurred_at"], "due": current_next})
     new_bill = current_app.db.bills.find_one({"id": billid}, {"_id":0})
     return jsonify({"bill": new_bill, "transaction": tx}), 200
@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils import generate_id, now_iso
+from utils import generate_id, now_iso, keyset_page
 
 goals_bp = Blueprint("goals_bp", __name__)
 
+GOAL_FIELDS = {"id","user_id","title","target_amount","current_amount","currency","created_at"}
+
 @goals_bp.route("/", methods=["GET"])
+@jwt_required()
 def list_goals():
-    user_id = request.args.get("user_id")
-    q = {}
-    if user_id:
-        q["user_id"] = user_id
-    goals = list(current_app.db.goals.find(q, {"_id":0}))
-    return jsonify(goals), 200
+    # query parameters: limit, cursor, fields; scoped to the JWT identity, paged on (created_at, id)
+    user_id = get_jwt_identity()
+    try:
+        items, next_cursor = keyset_page(current_app.db.goals, {"user_id": user_id}, "created_at", request.args, GOAL_FIELDS)
+    except ValueError:
+        return jsonify({"error":"invalid cursor"}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor}), 200
 
 @goals_bp.route("/", methods=["POST"])
 @jwt_required(optional=True)
@@ -54,7 +58,11 @@ def delete_goal(gid):
     return jsonify({"error":"not found"}), 404
 
 @goals_bp.route("/achievements", methods=["GET"])
+@jwt_required(optional=True)
 def achievements():
-    # simple computed endpoint: returns mock achievements or derived ones
-    res = list(current_app.db.achievements.find({}, {"_id":0}))
+    # query parameters: user_id (defaults to the JWT identity); newest first, awarded by achievements.record_event
+    user_id = request.args.get("user_id") or get_jwt_identity()
+    if not user_id:
+        return jsonify({"error":"user_id required"}), 400
+    res = list(current_app.db.achievements.find({"user_id": user_id}, {"_id":0}).sort("earned_at", -1))
     return jsonify(res), 200
@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils import generate_id, now_iso
+from utils import generate_id, now_iso, export_response, keyset_page
+from achievements import record_event
 from datetime import datetime
+import math
 
 tx_bp = Blueprint("tx_bp", __name__)
 
+TX_FIELDS = {"id","user_id","type","amount","merchant","category","occurred_at","nwg","late_night","mood","note"}
+
 @tx_bp.route("/", methods=["GET"])
+@jwt_required()
 def list_transactions():
-    # optional query parameters: user_id, start, end, type
-    q = {}
-    user_id = request.args.get("user_id")
-    if user_id:
-        q["user_id"] = user_id
+    # query parameters: start, end, type, limit, cursor, fields; scoped to the JWT identity
+    # newest first, paged on (occurred_at, id)
+    user_id = get_jwt_identity()
+    q = {"user_id": user_id}
     _type = request.args.get("type")
     if _type:
         q["type"] = _type
@@ -25,8 +29,21 @@ def list_transactions():
             q.setdefault("occurred_at", {})
             q["occurred_at"]["$lte"] = end
 
-    res = list(current_app.db.transactions.find(q, {"_id":0}))
-    return jsonify(res), 200
+    try:
+        items, next_cursor = keyset_page(current_app.db.transactions, q, "occurred_at", request.args, TX_FIELDS, direction=-1)
+    except ValueError:
+        return jsonify({"error":"invalid cursor"}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor}), 200
+
+TX_EXPORT_FIELDS = ["id", "user_id", "type", "amount", "merchant", "category", "occurred_at", "nwg", "late_night", "mood", "note"]
+
+@tx_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_transactions():
+    # streams the caller's transactions as NDJSON (default) or CSV: ?format=csv&gzip=1
+    user_id = get_jwt_identity()
+    cur = current_app.db.transactions.find({"user_id": user_id}, {"_id":0}, allow_disk_use=True).sort("occurred_at", 1)
+    return export_response(cur, TX_EXPORT_FIELDS, "transactions")
 
 @tx_bp.route("/", methods=["POST"])
 @jwt_required(optional=True)
@@ -35,11 +52,17 @@ def create_transaction():
     # minimal validation
     if "amount" not in data or "type" not in data:
         return jsonify({"error":"amount and type required"}), 400
+    try:
+        amount = float(data["amount"])
+    except (TypeError, ValueError):
+        amount = math.nan
+    if not math.isfinite(amount):
+        return jsonify({"error":"amount must be a number"}), 400
     tx = {
         "id": generate_id(),
         "user_id": data.get("user_id", get_jwt_identity() or data.get("user_id")),
         "type": data.get("type"),
-        "amount": data.get("amount"),
+        "amount": amount,
         "merchant": data.get("merchant", ""),
         "category": data.get("category", ""),
         "occurred_at": data.get("occurred_at", now_iso()),
@@ -48,7 +71,9 @@ def create_transaction():
         "mood": data.get("mood"),
         "note": data.get("note")
     }
-    current_app.db.transactions.insert_one(tx)
+    current_app.db.transactions.insert_one(dict(tx))  # a copy, so the ObjectId _id stays out of the response
+    if tx["type"] in ("expense", "income"):
+        record_event(current_app.db, tx["user_id"], tx["type"], tx)
     return jsonify(tx), 201
 
 @tx_bp.route("/<txid>", methods=["PUT"])
@@ -0,0 +1,59 @@
+# backend/tests/conftest.py
+"""Tests run against TEST_MONGO_URI (default localhost) when a mongod answers there, otherwise against mongomock.
+Tests that need a real server (explain plans) take the `mongod` fixture and are skipped without one."""
+import os
+import sys
+from unittest import mock
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+os.environ["MONGO_URI"] = TEST_MONGO_URI
+os.environ["DB_NAME"] = os.getenv("TEST_DB_NAME", "smartspend_test")
+
+
+def _mongod_up():
+    try:
+        MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+MONGOD = _mongod_up()
+
+
+@pytest.fixture(scope="session")
+def mongod():
+    if not MONGOD:
+        pytest.skip(f"no mongod at {TEST_MONGO_URI}")
+    return TEST_MONGO_URI
+
+
+@pytest.fixture
+def app():
+    from app import create_app
+    if MONGOD:
+        flask_app = create_app()
+    else:
+        import mongomock
+        with mock.patch("app.MongoClient", mongomock.MongoClient):
+            flask_app = create_app()
+    yield flask_app
+    for name in flask_app.db.list_collection_names():
+        flask_app.db[name].drop()
+
+
+@pytest.fixture
+def auth(app):
+    """Authorization headers for a user id."""
+    from flask_jwt_extended import create_access_token
+
+    def headers(user_id):
+        with app.app_context():
+            return {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
+    return headers
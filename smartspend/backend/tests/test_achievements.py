@@ -0,0 +1,59 @@
+# backend/tests/test_achievements.py
+import pytest
+
+from achievements import record_event
+from indexes import ensure_indexes
+
+
+class RacingDB:
+    """db wrapper whose achievement_state read lets another event for the same user land first."""
+
+    def __init__(self, db, concurrent):
+        self.db, self.concurrent = db, list(concurrent)
+        self.achievements = db.achievements
+        self.achievement_state = self
+
+    def find_one(self, *args, **kw):
+        doc = self.db.achievement_state.find_one(*args, **kw)
+        if self.concurrent:
+            record_event(self.db, *self.concurrent.pop())
+        return doc
+
+    def replace_one(self, *args, **kw):
+        return self.db.achievement_state.replace_one(*args, **kw)
+
+
+@pytest.fixture
+def db(app):
+    ensure_indexes(app.db)
+    return app.db
+
+
+def test_concurrent_events_are_both_counted(db):
+    record_event(db, "u1", "income", {"id": "i0", "amount": 600, "occurred_at": "2024-01-01"})
+    racing = RacingDB(db, [("u1", "income", {"id": "i1", "amount": 300, "occurred_at": "2024-01-02"})])
+    awarded = record_event(racing, "u1", "income", {"id": "i2", "amount": 200, "occurred_at": "2024-01-03"})
+    state = db.achievement_state.find_one({"user_id": "u1"})
+    assert state["incomes"] == 3 and state["income_total"] == 1100.0 and state["version"] == 3
+    assert [a["code"] for a in awarded] == ["income_1k"]
+    assert db.achievement_state.count_documents({"user_id": "u1"}) == 1
+
+
+def test_first_event_race_creates_one_state(db):
+    racing = RacingDB(db, [("u1", "expense", {"id": "e1", "occurred_at": "2024-01-01"})])
+    record_event(racing, "u1", "expense", {"id": "e2", "occurred_at": "2024-01-02"})
+    state = db.achievement_state.find_one({"user_id": "u1"})
+    assert state["expenses"] == 2 and state["streak"] == 2
+
+
+@pytest.mark.parametrize("amount", ["abc", None, "nan", float("inf"), [1]])
+def test_invalid_amount_is_rejected_before_insert(app, auth, amount):
+    r = app.test_client().post("/api/transactions/", headers=auth("u1"), json={"type": "income", "amount": amount})
+    assert r.status_code == 400
+    assert app.db.transactions.count_documents({}) == 0 and app.db.achievement_state.count_documents({}) == 0
+
+
+def test_valid_amount_is_stored_as_a_number(app, auth):
+    r = app.test_client().post("/api/transactions/", headers=auth("u1"), json={"type": "income", "amount": "1200.50"})
+    assert r.status_code == 201 and r.get_json()["amount"] == 1200.5
+    assert app.db.achievement_state.find_one({"user_id": "u1"})["income_total"] == 1200.5
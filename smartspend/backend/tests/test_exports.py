@@ -0,0 +1,31 @@
+# backend/tests/test_exports.py
+import gzip
+import json
+
+
+def seed(app):
+    app.db.transactions.insert_many([
+        {"id": f"t{i}", "user_id": uid, "type": "expense", "amount": 5.0 + i, "occurred_at": f"2024-01-0{i + 1}T10:00:00"}
+        for i, uid in enumerate(["alice", "alice", "bob"])])
+
+
+def test_export_is_scoped_to_the_token(app, auth):
+    seed(app)
+    r = app.test_client().get("/api/transactions/export?user_id=bob", headers=auth("alice"))
+    rows = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+    assert r.status_code == 200 and [row["id"] for row in rows] == ["t0", "t1"]
+
+
+def test_export_requires_a_token(app):
+    seed(app)
+    assert app.test_client().get("/api/transactions/export?user_id=alice").status_code == 401
+    assert app.test_client().get("/api/bills/export?user_id=alice").status_code == 401
+
+
+def test_gzip_export_is_a_gz_file(app, auth):
+    seed(app)
+    r = app.test_client().get("/api/transactions/export?format=csv&gzip=1", headers=auth("alice"))
+    assert r.mimetype == "application/gzip" and "Content-Encoding" not in r.headers
+    assert r.headers["Content-Disposition"] == 'attachment; filename="transactions.csv.gz"'
+    lines = gzip.decompress(r.get_data()).decode().splitlines()
+    assert lines[0].startswith("id,user_id,type,amount") and len(lines) == 3
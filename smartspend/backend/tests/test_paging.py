@@ -0,0 +1,65 @@
+# backend/tests/test_paging.py
+import base64
+import json
+
+import pytest
+
+LISTS = [  # (path, collection, sort key, newest first)
+    ("/api/transactions/", "transactions", "occurred_at", True),
+    ("/api/bills/", "bills", "next_due", False),
+    ("/api/goals/", "goals", "created_at", False),
+]
+
+
+def seed(app, coll, key):
+    # seven rows for alice on four sort values (ties broken by id), one for bob
+    app.db[coll].insert_many(
+        [{"id": f"a{i}", "user_id": "alice", key: f"2024-01-0{1 + i // 2}"} for i in range(7)]
+        + [{"id": "b0", "user_id": "bob", key: "2024-01-01"}])
+
+
+def walk(client, path, headers, limit):
+    pages, cursor = [], None
+    while True:
+        url = f"{path}?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        body = r.get_json()
+        pages.append([row["id"] for row in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("path,coll,key,desc", LISTS)
+@pytest.mark.parametrize("limit", [1, 3, 7, 200])
+def test_pages_cover_every_row_once(app, auth, path, coll, key, desc, limit):
+    seed(app, coll, key)
+    pages = walk(app.test_client(), path, auth("alice"), limit)
+    expected = sorted((f"2024-01-0{1 + i // 2}", f"a{i}") for i in range(7))
+    expected = [row_id for _, row_id in (expected[::-1] if desc else expected)]
+    assert [row for page in pages for row in page] == expected
+    assert all(len(page) == limit for page in pages[:-1]) and 0 < len(pages[-1]) <= limit
+    # an exact multiple of the limit still ends on a null cursor, not on an empty page
+    assert len(pages) == -(-7 // limit)
+
+
+@pytest.mark.parametrize("path,coll,key,desc", LISTS)
+def test_lists_are_scoped_to_the_token(app, auth, path, coll, key, desc):
+    seed(app, coll, key)
+    client = app.test_client()
+    r = client.get(f"{path}?user_id=alice", headers=auth("bob"))
+    assert r.status_code == 200 and [row["id"] for row in r.get_json()["items"]] == ["b0"]
+    assert client.get(f"{path}?user_id=alice").status_code == 401
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("path", [p for p, *_ in LISTS])
+@pytest.mark.parametrize("bad", ["not-base64!", cursor({"a": 1}), cursor(["2024-01-01"]),
+                                 cursor([{"$ne": None}, "a0"]), cursor(["2024-01-01", ["a0"]])])
+def test_bad_cursor_is_400(app, auth, path, bad):
+    r = app.test_client().get(f"{path}?cursor={bad}", headers=auth("alice"))
+    assert r.status_code == 400 and r.get_json() == {"error": "invalid cursor"}
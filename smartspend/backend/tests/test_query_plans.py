@@ -0,0 +1,38 @@
+# backend/tests/test_query_plans.py
+import pytest
+
+from indexes import INDEXES, QUERY_SHAPES, ensure_indexes, plan_stages
+
+
+@pytest.fixture
+def indexed_db(mongod, app):
+    ensure_indexes(app.db)
+    return app.db
+
+
+@pytest.mark.parametrize("route, coll, q, sort", QUERY_SHAPES, ids=[shape[0] for shape in QUERY_SHAPES])
+def test_query_shape_uses_an_index(indexed_db, route, coll, q, sort):
+    stages = plan_stages(indexed_db, coll, q, sort)
+    assert "COLLSCAN" not in stages, f"{route}: {' <- '.join(stages)}"
+
+
+def test_every_queried_collection_has_indexes():
+    assert {coll for _, coll, _, _ in QUERY_SHAPES} <= set(INDEXES)
+
+
+def test_paged_lists_match_the_routes(app, auth, monkeypatch):
+    import utils
+    from indexes import PAGED_LISTS
+    from routes import bills, goals, transactions
+    seen = set()
+
+    def spy(coll, query, sort_key, args, allowed_fields, direction=1):
+        seen.add((coll.name, sort_key, direction))
+        return utils.keyset_page(coll, query, sort_key, args, allowed_fields, direction)
+
+    for module in (bills, goals, transactions):
+        monkeypatch.setattr(module, "keyset_page", spy)
+    client = app.test_client()
+    for path in ("/api/transactions/", "/api/bills/", "/api/goals/"):
+        assert client.get(path, headers=auth("alice")).status_code == 200
+    assert seen == {(coll, key, direction) for _, coll, key, direction in PAGED_LISTS}
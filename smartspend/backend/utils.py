@@ -1,7 +1,13 @@
 import os
+import csv
+import io
+import json
+import zlib
+import base64
 from datetime import datetime, timedelta, date
 import uuid
 from dotenv import load_dotenv
+import recurrence
 
 load_dotenv()
 
@@ -20,42 +26,107 @@ def parse_date(s):
     except Exception:
         return datetime.strptime(s, "%Y-%m-%d").date()
 
-def next_due_from(cadence: str, current_due: str):
+def next_due_from(cadence: str, current_due: str, anchor_day=None):
     """
     cadence: one of 'monthly','weekly','biweekly','yearly' or a day count 'N' (string)
-    current_due: 'YYYY-MM-DD' or ISO date
+    current_due: 'YYYY-MM-DD' or ISO date; today when missing or unparseable
+    anchor_day: day of month monthly/yearly bills fall on (clamped to short months)
     returns next_due string 'YYYY-MM-DD'
     """
-    d = parse_date(current_due)
-    if not d:
-        d = date.today()
-    if cadence == "monthly":
-        month = d.month + 1
-        year = d.year + (month - 1) // 12
-        month = ((month - 1) % 12) + 1
-        day = min(d.day, 28)  # safe default
-        try:
-            nd = date(year, month, d.day)
-        except Exception:
-            nd = date(year, month, day)
-    elif cadence == "weekly":
-        nd = d + timedelta(weeks=1)
-    elif cadence == "biweekly":
-        nd = d + timedelta(weeks=2)
-    elif cadence == "yearly":
-        nd = date(d.year + 1, d.month, d.day)
-    else:
-        # try parse integer days
-        try:
-            days = int(cadence)
-            nd = d + timedelta(days=days)
-        except Exception:
-            # fallback to monthly
-            month = d.month + 1
-            year = d.year + (month - 1) // 12
-            month = ((month - 1) % 12) + 1
-            try:
-                nd = date(year, month, d.day)
-            except Exception:
-                nd = date(year, month, 1)
-    return nd.isoformat()
+    d = None
+    try:
+        d = parse_date(current_due)
+    except ValueError:
+        pass
+    return recurrence.next_due_from(cadence, (d or date.today()).isoformat(), anchor_day)
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    # a tampered cursor must not smuggle query operators ({"$ne": ...}) into the keyset filter
+    if not isinstance(values, list) or len(values) != 2 or \
+            not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("bad cursor")
+    return values
+
+def after_cursor(query, sort_key, value, last_id, direction=1):
+    """query narrowed to the rows that sort after (value, last_id) on (sort_key, id)."""
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$and": [query, {"$or": [{sort_key: {op: value}}, {sort_key: value, "id": {op: last_id}}]}]}
+
+def keyset_page(coll, query, sort_key, args, allowed_fields, direction=1):
+    """
+    One page of coll ordered on (sort_key, id), read straight off the (user_id, sort_key, id) index.
+    args: request.args -> limit (capped at PAGE_SIZE_MAX), cursor (next_cursor of the previous page),
+          fields (comma-separated projection; sort_key and id are always returned).
+    returns (items, next_cursor); raises ValueError on a malformed cursor.
+    """
+    limit = max(1, min(args.get("limit", PAGE_SIZE_DEFAULT, type=int), PAGE_SIZE_MAX))
+    cursor = args.get("cursor")
+    if cursor:
+        query = after_cursor(query, sort_key, *decode_cursor(cursor), direction=direction)
+    fields = [f.strip() for f in (args.get("fields") or "").split(",") if f.strip() in allowed_fields]
+    projection = {"_id": 0}
+    if fields:
+        projection.update({f: 1 for f in fields + [sort_key, "id"]})
+    docs = list(coll.find(query, projection).sort([(sort_key, direction), ("id", direction)]).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(sort_key), docs[-1].get("id")])
+    return docs, next_cursor
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def export_rows(cursor, fmt, fields, gzip=False):
+    """
+    Generator for streaming exports: walks a pymongo cursor and yields NDJSON or CSV
+    chunks of roughly EXPORT_CHUNK_BYTES, gzip-compressed on the fly when gzip=True.
+    Only one chunk is held in memory at a time, whatever the row count.
+    """
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits=31 -> gzip container
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+
+    def drain():
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return gz.compress(data) if gz else data
+
+    for doc in cursor:
+        if writer:
+            writer.writerow(doc)
+        else:
+            buf.write(json.dumps(doc, default=str))
+            buf.write("\n")
+        if buf.tell() >= EXPORT_CHUNK_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
+    chunk = drain()
+    if gz:
+        chunk += gz.flush()
+    if chunk:
+        yield chunk
+
+def export_response(cursor, fields, name):
+    """Wraps export_rows in a streaming Flask response driven by ?format=ndjson|csv&gzip=1."""
+    from flask import Response, request, stream_with_context
+    fmt = request.args.get("format", "ndjson")
+    gzip = request.args.get("gzip") in ("1", "true")
+    ext, mimetype = ("csv", "text/csv") if fmt == "csv" else ("ndjson", "application/x-ndjson")
+    if gzip:
+        # a .gz file download, not a transfer encoding: clients must not unpack it on the way in
+        ext, mimetype = ext + ".gz", "application/gzip"
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{ext}"'}
+    return Response(stream_with_context(export_rows(cursor.batch_size(EXPORT_BATCH_SIZE), fmt, fields, gzip)),
+                    mimetype=mimetype, headers=headers)